@@ -0,0 +1,32 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'priority',
+        'attempts',
+        'progress_display',
+        'run_at',
+        'finished_at',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('=idempotency_key',)
+    readonly_fields = (
+        'created', 'locked_at', 'finished_at', 'last_error', 'progress',
+        'total',
+    )
+    empty_value_display = '-пусто-'
+
+    def progress_display(self, obj):
+        if obj.total is None:
+            return obj.progress or None
+        return f'{obj.progress} / {obj.total}'
+    progress_display.short_description = 'Прогресс'
+
+
+admin.site.register(Job, JobAdmin)
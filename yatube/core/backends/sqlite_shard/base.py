@@ -0,0 +1,19 @@
+"""SQLite для шардов постов: без проверки внешних ключей.
+
+Посты на шарде ссылаются на пользователей и группы из default,
+которых в этой БД нет (см. posts/sharding.py).
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        conn.execute('PRAGMA foreign_keys = OFF')
+        return conn
+
+    def enable_constraint_checking(self):
+        pass
+
+    def check_constraints(self, table_names=None):
+        pass
@@ -0,0 +1,427 @@
+"""Двухуровневый кэш: LRU внутри процесса перед общим SQLite-файлом.
+
+LocMemCache у каждого воркера свой, поэтому инвалидация в одном воркере
+не видна остальным. TieredCache держит небольшой L1 в памяти процесса
+и общий для всех воркеров L2 в файле SQLite на той же машине.
+
+Межворкерная инвалидация делается версионированными пространствами
+имён: ключи вида ``ns:<имя>`` никогда не попадают в L1, поэтому
+invalidate_namespace() сразу меняет ключи всех зависимых записей
+во всех воркерах.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+NAMESPACE_PREFIX: str = 'ns:'
+LOCAL_MAX_ENTRIES: int = 1000
+LOCAL_TIMEOUT: int = 5
+CULL_EVERY: int = 100
+
+
+class SQLiteStore:
+    """Ключ-значение с временем жизни в файле SQLite.
+
+    Соединения открываются отдельно в каждом потоке и после fork,
+    журнал WAL позволяет читать параллельно с записью.
+    """
+
+    def __init__(self, path, max_entries=None, cull_frequency=3):
+        self.path = path
+        self.max_entries = max_entries
+        self.cull_frequency = cull_frequency
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=10, isolation_level=None,
+                check_same_thread=False,
+            )
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS store ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+            )
+            self._local.conn = conn
+            self._local.pid = pid
+        return self._local.conn
+
+    def _execute(self, sql, params=()):
+        return self._connection().execute(sql, params)
+
+    def _write(self, func):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = func(conn)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return result
+
+    def get(self, key):
+        """Возвращает (pickle значения, expires) или None."""
+        row = self._execute(
+            'SELECT value, expires FROM store WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or _expired(row[1]):
+            return None
+        return row
+
+    def get_many(self, keys):
+        keys = list(keys)
+        result = {}
+        # Ограничение SQLite на число параметров запроса.
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._execute(
+                'SELECT key, value, expires FROM store WHERE key IN (%s)'
+                % ', '.join('?' * len(chunk)), chunk
+            )
+            for key, value, expires in rows:
+                if not _expired(expires):
+                    result[key] = value, expires
+        return result
+
+    def set(self, key, pickled, expires):
+        self.set_many({key: pickled}, expires)
+
+    def set_many(self, data, expires):
+        rows = [(key, pickled, expires) for key, pickled in data.items()]
+        self._write(lambda conn: conn.executemany(
+            'INSERT OR REPLACE INTO store (key, value, expires) '
+            'VALUES (?, ?, ?)', rows
+        ))
+        self._maybe_cull(len(rows))
+
+    def add(self, key, pickled, expires):
+        def add(conn):
+            conn.execute(
+                'DELETE FROM store WHERE key = ? AND expires <= ?',
+                (key, time.time())
+            )
+            return conn.execute(
+                'INSERT OR IGNORE INTO store (key, value, expires) '
+                'VALUES (?, ?, ?)', (key, pickled, expires)
+            ).rowcount == 1
+
+        added = self._write(add)
+        if added:
+            self._maybe_cull(1)
+        return added
+
+    def touch(self, key, expires):
+        return self._write(lambda conn: conn.execute(
+            'UPDATE store SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (expires, key, time.time())
+        ).rowcount == 1)
+
+    def incr(self, key, delta):
+        def incr(conn):
+            row = conn.execute(
+                'SELECT value, expires FROM store WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or _expired(row[1]):
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            conn.execute(
+                'UPDATE store SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key)
+            )
+            return value
+
+        return self._write(incr)
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            self._write(lambda conn: conn.execute(
+                'DELETE FROM store WHERE key IN (%s)'
+                % ', '.join('?' * len(chunk)), chunk
+            ))
+
+    def clear(self):
+        self._write(lambda conn: conn.execute('DELETE FROM store'))
+
+    def _maybe_cull(self, written):
+        self._writes += written
+        if self.max_entries is None or self._writes < CULL_EVERY:
+            return
+        self._writes = 0
+        self._write(self._cull)
+
+    def _cull(self, conn):
+        conn.execute(
+            'DELETE FROM store WHERE expires <= ?', (time.time(),)
+        )
+        count = conn.execute('SELECT COUNT(*) FROM store').fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # Бессрочные ключи (версии пространств имён) удаляются последними.
+        conn.execute(
+            'DELETE FROM store WHERE key IN (SELECT key FROM store '
+            'ORDER BY expires IS NULL, expires LIMIT ?)',
+            (count // self.cull_frequency,)
+        )
+
+
+class LocalLRU:
+    """Потокобезопасный LRU с временем жизни записей."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if _expired(item[1]):
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item
+
+    def set(self, key, value, expires):
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache(BaseCache):
+    """Общий кэш всех воркеров в одном файле SQLite."""
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._store = SQLiteStore(
+            location, self._max_entries, self._cull_frequency
+        )
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _dumps(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._store.add(
+            self._key(key, version), self._dumps(value),
+            self.get_backend_timeout(timeout),
+        )
+
+    def get(self, key, default=None, version=None):
+        item = self._store.get(self._key(key, version))
+        return default if item is None else pickle.loads(item[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        found = self._store.get_many(keys)
+        return {
+            keys[key]: pickle.loads(item[0]) for key, item in found.items()
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store.set(
+            self._key(key, version), self._dumps(value),
+            self.get_backend_timeout(timeout),
+        )
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store.set_many(
+            {
+                self._key(key, version): self._dumps(value)
+                for key, value in data.items()
+            },
+            self.get_backend_timeout(timeout),
+        )
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._store.touch(
+            self._key(key, version), self.get_backend_timeout(timeout)
+        )
+
+    def incr(self, key, delta=1, version=None):
+        return self._store.incr(self._key(key, version), delta)
+
+    def delete(self, key, version=None):
+        self._store.delete_many([self._key(key, version)])
+
+    def delete_many(self, keys, version=None):
+        self._store.delete_many(self._key(key, version) for key in keys)
+
+    def clear(self):
+        self._store.clear()
+
+
+class TieredCache(SQLiteCache):
+    """SQLiteCache с небольшим LRU-кэшем L1 в памяти процесса.
+
+    L1 хранит pickle значений, как и LocMemCache, и отдаёт каждому
+    вызову свою копию. Запись из L1 живёт не дольше LOCAL_TIMEOUT
+    секунд, так что прямые ``delete``/``set`` из другого воркера видны
+    здесь с этой задержкой; версии пространств имён всегда читаются
+    из общего L2.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        options = params.get('OPTIONS', {})
+        self._local = LocalLRU(
+            int(options.get('LOCAL_MAX_ENTRIES', LOCAL_MAX_ENTRIES))
+        )
+        self._local_timeout = int(
+            options.get('LOCAL_TIMEOUT', LOCAL_TIMEOUT)
+        )
+
+    def _remember(self, key, raw_key, pickled, expires):
+        if str(key).startswith(NAMESPACE_PREFIX):
+            return
+        local_expires = time.time() + self._local_timeout
+        if expires is not None:
+            local_expires = min(local_expires, expires)
+        self._local.set(raw_key, pickled, local_expires)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        raw_key = self._key(key, version)
+        pickled = self._dumps(value)
+        expires = self.get_backend_timeout(timeout)
+        added = self._store.add(raw_key, pickled, expires)
+        if added:
+            self._remember(key, raw_key, pickled, expires)
+        return added
+
+    def get(self, key, default=None, version=None):
+        raw_key = self._key(key, version)
+        item = self._local.get(raw_key)
+        if item is None:
+            item = self._store.get(raw_key)
+            if item is None:
+                return default
+            self._remember(key, raw_key, *item)
+        return pickle.loads(item[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        result = {}
+        missing = []
+        for raw_key, key in keys.items():
+            item = self._local.get(raw_key)
+            if item is None:
+                missing.append(raw_key)
+            else:
+                result[key] = pickle.loads(item[0])
+        for raw_key, item in self._store.get_many(missing).items():
+            self._remember(keys[raw_key], raw_key, *item)
+            result[keys[raw_key]] = pickle.loads(item[0])
+        return result
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        raw_key = self._key(key, version)
+        pickled = self._dumps(value)
+        expires = self.get_backend_timeout(timeout)
+        self._store.set(raw_key, pickled, expires)
+        self._remember(key, raw_key, pickled, expires)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        rows = {
+            key: (self._key(key, version), self._dumps(value))
+            for key, value in data.items()
+        }
+        expires = self.get_backend_timeout(timeout)
+        self._store.set_many(dict(rows.values()), expires)
+        for key, (raw_key, pickled) in rows.items():
+            self._remember(key, raw_key, pickled, expires)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._local.delete(self._key(key, version))
+        return super().touch(key, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        self._local.delete(self._key(key, version))
+        return super().incr(key, delta, version)
+
+    def delete(self, key, version=None):
+        self._local.delete(self._key(key, version))
+        super().delete(key, version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        for key in keys:
+            self._local.delete(self._key(key, version))
+        super().delete_many(keys, version)
+
+    def clear(self):
+        self._local.clear()
+        super().clear()
+
+
+def _expired(expires):
+    return expires is not None and expires <= time.time()
+
+
+def namespace_keys(*namespaces):
+    return [NAMESPACE_PREFIX + namespace for namespace in namespaces]
+
+
+def namespaced_key(key, *namespaces, cache=default_cache):
+    """Ключ, который меняется при инвалидации любого из namespaces."""
+    keys = namespace_keys(*namespaces)
+    versions = cache.get_many(keys)
+    missing = {
+        version_key: _initial_version()
+        for version_key in keys if version_key not in versions
+    }
+    for version_key, version in missing.items():
+        if not cache.add(version_key, version, None):
+            missing[version_key] = cache.get(version_key, version)
+    versions.update(missing)
+    suffix = '.'.join(str(versions[version_key]) for version_key in keys)
+    return f'{key}:{suffix}'
+
+
+def invalidate_namespace(*namespaces, cache=default_cache):
+    for version_key in namespace_keys(*namespaces):
+        try:
+            cache.incr(version_key)
+        except ValueError:
+            cache.set(version_key, _initial_version(), None)
+
+
+def _initial_version():
+    # Версия от текущего времени: если счётчик вытеснен из кэша,
+    # новый не совпадёт ни с одной из прежних версий.
+    return int(time.time() * 1000)
@@ -0,0 +1,16 @@
+from django.utils.functional import SimpleLazyObject
+
+from posts.follow_feed import POLL_INTERVAL, label, unread_count
+
+
+def follow_feed(request):
+    """Значок новых постов подписок; считается, только если выведен."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {
+        'follow_unread': SimpleLazyObject(
+            lambda: label(unread_count(user.pk))
+        ),
+        'follow_poll_interval': POLL_INTERVAL,
+    }
@@ -0,0 +1,15 @@
+from django.utils.functional import SimpleLazyObject
+
+from posts.notifications import unread_count
+
+
+def notifications(request):
+    """Число непрочитанных уведомлений; считается, только если выведено."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {
+        'unread_notifications': SimpleLazyObject(
+            lambda: unread_count(user.pk)
+        )
+    }
@@ -0,0 +1,288 @@
+"""Очередь фоновых задач в базе данных, без брокера.
+
+Задача — обычная функция, зарегистрированная декоратором @job
+в модуле tasks.py любого приложения:
+
+    @job('posts.make_thumbnail')
+    def make_thumbnail(post_id):
+        ...
+
+    make_thumbnail.enqueue(post.pk, idempotency_key=f'thumb:{post.pk}')
+
+Периодические задачи регистрируются через @periodic('*/5 * * * *')
+и ставятся в очередь воркером (manage.py runjobs) по расписанию
+в формате cron, время — UTC. Аргументы задач хранятся в JSON.
+
+Выполняемая задача отмечается живой (locked_at) из report_progress()
+и pause(), поэтому долгие задачи должны вызывать их между пачками.
+Задача без отметки дольше LOCK_TIMEOUT считается брошенной упавшим
+воркером и возвращается в очередь, сколько бы она ни шла.
+"""
+import json
+import logging
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE: int = 10
+RETRY_MAX: int = 3600
+# Как часто pause() обновляет отметку выполняемой задачи.
+HEARTBEAT_INTERVAL = timedelta(minutes=1)
+# Задача RUNNING без отметки дольше этого считается брошенной.
+LOCK_TIMEOUT = timedelta(minutes=15)
+
+CHUNK_PAUSE: float = 0.05
+
+registry = {}
+schedule = []
+_current = threading.local()
+
+
+def job(name, max_attempts=5, priority=0):
+    """Регистрирует функцию как фоновую задачу с именем name."""
+    def decorator(func):
+        registry[name] = func
+
+        def enqueue_func(*args, **options):
+            options.setdefault('max_attempts', max_attempts)
+            options.setdefault('priority', priority)
+            return enqueue(name, *args, **options)
+
+        func.job_name = name
+        func.enqueue = enqueue_func
+        return func
+    return decorator
+
+
+def periodic(cron, name=None, **options):
+    """Регистрирует задачу без аргументов, запускаемую по cron."""
+    def decorator(func):
+        func = job(name or f'{func.__module__}.{func.__name__}',
+                   **options)(func)
+        schedule.append((CronSchedule(cron), func.job_name))
+        return func
+    return decorator
+
+
+def enqueue(name, *args, priority=0, run_at=None, delay=None,
+            idempotency_key=None, max_attempts=5):
+    """Ставит задачу в очередь и возвращает Job.
+
+    С idempotency_key повторная постановка возвращает уже существующую
+    задачу, в каком бы статусе она ни была.
+    """
+    if name not in registry:
+        raise KeyError(f'Неизвестная задача: {name}')
+    if run_at is None:
+        run_at = timezone.now()
+    if delay is not None:
+        run_at += timedelta(seconds=delay)
+    fields = {
+        'name': name,
+        'payload': json.dumps(args),
+        'priority': priority,
+        'run_at': run_at,
+        'max_attempts': max_attempts,
+    }
+    if idempotency_key is None:
+        return Job.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Job.objects.get_or_create(
+                idempotency_key=idempotency_key, defaults=fields
+            )[0]
+    except IntegrityError:
+        return Job.objects.get(idempotency_key=idempotency_key)
+
+
+def claim(worker=None):
+    """Забирает одну готовую к запуску задачу или возвращает None."""
+    now = timezone.now()
+    ready = Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).order_by('-priority', 'run_at', 'pk')
+    for pk in ready.values_list('pk', flat=True)[:5]:
+        # Условный UPDATE: задачу получает только один воркер.
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            locked_at=now,
+            locked_by=worker or '',
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run(job_obj):
+    func = registry.get(job_obj.name)
+    job_obj.attempts += 1
+    _current.job = job_obj
+    try:
+        if func is None:
+            raise KeyError(f'Неизвестная задача: {job_obj.name}')
+        func(*json.loads(job_obj.payload))
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Задача %s упала', job_obj)
+        _fail(job_obj, error)
+    else:
+        job_obj.status = Job.DONE
+        job_obj.finished_at = timezone.now()
+        job_obj.last_error = ''
+        job_obj.save(update_fields=[
+            'status', 'attempts', 'finished_at', 'last_error'
+        ])
+    finally:
+        _current.job = None
+
+
+def report_progress(done, total=None):
+    """Сохраняет прогресс выполняемой задачи; вне воркера ничего не делает."""
+    job_obj = getattr(_current, 'job', None)
+    if job_obj is None:
+        return
+    job_obj.progress = done
+    fields = {'progress': done}
+    if total is not None:
+        job_obj.total = fields['total'] = total
+    _heartbeat(job_obj, **fields)
+
+
+def pause():
+    """Пауза между пачками, чтобы другие писатели успевали в БД."""
+    job_obj = getattr(_current, 'job', None)
+    if job_obj is not None and (
+            job_obj.locked_at is None
+            or timezone.now() - job_obj.locked_at >= HEARTBEAT_INTERVAL):
+        _heartbeat(job_obj)
+    time.sleep(CHUNK_PAUSE)
+
+
+def _heartbeat(job_obj, **fields):
+    job_obj.locked_at = fields['locked_at'] = timezone.now()
+    Job.objects.filter(pk=job_obj.pk).update(**fields)
+
+
+def in_chunks(items, size):
+    """Делит список на пачки по size, делая паузу между ними."""
+    for start in range(0, len(items), size):
+        if start:
+            pause()
+        yield items[start:start + size]
+
+
+def _fail(job_obj, error):
+    job_obj.last_error = error
+    if job_obj.attempts >= job_obj.max_attempts:
+        job_obj.status = Job.FAILED
+        job_obj.finished_at = timezone.now()
+    else:
+        job_obj.status = Job.QUEUED
+        job_obj.run_at = timezone.now() + backoff(job_obj.attempts)
+    job_obj.save(update_fields=[
+        'status', 'attempts', 'run_at', 'finished_at', 'last_error'
+    ])
+
+
+def backoff(attempts):
+    """Экспоненциальная задержка повтора со случайным разбросом."""
+    seconds = min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX)
+    return timedelta(seconds=seconds * random.uniform(0.5, 1.0))
+
+
+def requeue_abandoned():
+    """Возвращает в очередь задачи, пропустившие отметки LOCK_TIMEOUT."""
+    abandoned = Job.objects.filter(
+        status=Job.RUNNING, locked_at__lt=timezone.now() - LOCK_TIMEOUT
+    )
+    for job_obj in abandoned:
+        job_obj.attempts += 1
+        _fail(job_obj, 'Воркер не завершил задачу вовремя')
+
+
+def run_pending(limit=None, worker=None):
+    """Выполняет готовые задачи, пока они есть; возвращает их число."""
+    done = 0
+    while limit is None or done < limit:
+        job_obj = claim(worker)
+        if job_obj is None:
+            break
+        run(job_obj)
+        close_old_connections()
+        done += 1
+    return done
+
+
+def schedule_periodic(since, until):
+    """Ставит периодические задачи за минуты из (since, until]."""
+    minute = since.replace(second=0, microsecond=0)
+    until = until.replace(second=0, microsecond=0)
+    while minute < until:
+        minute += timedelta(minutes=1)
+        for cron, name in schedule:
+            if cron.matches(minute):
+                key = f'{name}@{minute.isoformat()}'
+                enqueue(name, idempotency_key=key)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{random.getrandbits(32):08x}'
+
+
+class CronSchedule:
+    """Расписание в формате cron: минута час день месяц день_недели."""
+
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f'Ожидается 5 полей cron: {expression!r}')
+        self.expression = expression
+        self.sets = [
+            self._parse(field, low, high)
+            for field, (low, high) in zip(fields, self.RANGES)
+        ]
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for part in field.split(','):
+            part, _, step = part.partition('/')
+            step = int(step) if step else 1
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = map(int, part.split('-'))
+            else:
+                start = end = int(part)
+                if step > 1:
+                    end = high
+            if not low <= start <= end <= high:
+                raise ValueError(f'Поле cron вне диапазона: {field!r}')
+            values.update(range(start, end + 1, step))
+        return values
+
+    def matches(self, moment):
+        minutes, hours, days, months, weekdays = self.sets
+        if (moment.minute not in minutes or moment.hour not in hours
+                or moment.month not in months):
+            return False
+        day = moment.day in days
+        # В cron воскресенье — 0, в Python — 6.
+        weekday = (moment.weekday() + 1) % 7 in weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
@@ -0,0 +1,190 @@
+"""Нагрузочный прогон WSGI-приложения внутри процесса, без серверов.
+
+Виртуальные пользователи вызывают WSGI-callable напрямую из пула
+потоков и проходят сценарии, выбранные случайно по весам. Сценарий —
+функция session -> None, которая делает запросы через session.get()
+и session.post(); cookies (сессия, CSRF) session хранит сама.
+
+Итог — Report: для каждого имени URL число запросов, ошибок (статус
+>= 400 или исключение) и перцентили задержки, плюс общая пропускная
+способность. Прогоны с одинаковым --seed удобно сравнивать между
+настройками (бэкенд кэша, pragma SQLite и т. п.).
+"""
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from io import BytesIO
+from urllib.parse import urlencode, urlsplit
+
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу; values отсортированы."""
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[rank - 1]
+
+
+def url_name(path):
+    try:
+        return resolve(urlsplit(path).path).view_name
+    except Resolver404:
+        return '<404>'
+
+
+class Report:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, name, latency, ok):
+        with self._lock:
+            self.latencies[name].append(latency)
+            if not ok:
+                self.errors[name] += 1
+
+    @property
+    def total(self):
+        return sum(len(values) for values in self.latencies.values())
+
+    @property
+    def throughput(self):
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    def rows(self):
+        """(имя, запросов, ошибок, p50, p95, p99) в секундах."""
+        for name in sorted(self.latencies):
+            values = sorted(self.latencies[name])
+            yield (name, len(values), self.errors[name], *(
+                percentile(values, percent) for percent in PERCENTILES
+            ))
+
+
+class Session:
+    """Виртуальный пользователь: cookies и запись результатов в Report."""
+
+    def __init__(self, application, report, host, cookies=None, rng=None):
+        self.application = application
+        self.report = report
+        self.host = host
+        self.cookies = dict(cookies or {})
+        self.random = rng or random.Random()
+
+    def get(self, path):
+        return self.request('GET', path)
+
+    def post(self, path, data):
+        # CSRF-токен берётся из cookie, выставленной при показе формы.
+        data = {'csrfmiddlewaretoken': self.cookies.get('csrftoken', ''),
+                **data}
+        return self.request('POST', path, urlencode(data).encode())
+
+    def request(self, method, path, body=b''):
+        started = time.perf_counter()
+        try:
+            status = self._call(method, path, body)
+        except Exception:
+            status = None
+        self.report.record(
+            url_name(path), time.perf_counter() - started,
+            status is not None and status < 400,
+        )
+        return status
+
+    def _call(self, method, path, body):
+        parts = urlsplit(path)
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': parts.path,
+            'QUERY_STRING': parts.query,
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': self.host,
+            'REMOTE_ADDR': '127.0.0.1',
+            'HTTP_COOKIE': '; '.join(
+                f'{key}={value}' for key, value in self.cookies.items()
+            ),
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split()[0])
+            response['headers'] = headers
+
+        result = self.application(environ, start_response)
+        try:
+            for _ in result:
+                pass
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        for name, value in response['headers']:
+            if name.lower() == 'set-cookie':
+                for morsel in SimpleCookie(value).values():
+                    self.cookies[morsel.key] = morsel.value
+        return response['status']
+
+
+def run(application, scenarios, *, iterations, concurrency=1,
+        logins=(), host='localhost', seed=None):
+    """Выполняет iterations сценариев и возвращает Report.
+
+    scenarios — список (вес, функция, нужен_вход). logins — словари
+    cookies вошедших пользователей, по одному на виртуального
+    пользователя; без них сценарии со входом не выполняются.
+    """
+    report = Report()
+    scenarios = [
+        scenario for scenario in scenarios if logins or not scenario[2]
+    ]
+    weights = [weight for weight, _, _ in scenarios]
+    counter = iter(range(iterations))
+    counter_lock = threading.Lock()
+
+    def worker(number):
+        rng = random.Random(None if seed is None else seed + number)
+        anonymous = Session(application, report, host, rng=rng)
+        member = Session(
+            application, report, host,
+            logins[number % len(logins)] if logins else None, rng,
+        )
+        try:
+            while True:
+                with counter_lock:
+                    if next(counter, None) is None:
+                        return
+                _, function, logged_in = rng.choices(scenarios, weights)[0]
+                function(member if logged_in else anonymous)
+        finally:
+            if concurrency > 1:
+                connections.close_all()
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(worker, range(concurrency)))
+    else:
+        worker(0)
+    report.elapsed = time.perf_counter() - started
+    return report
@@ -0,0 +1,217 @@
+import secrets
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+)
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from core import loadtest
+from core.cache import invalidate_namespace
+from posts import counters, notifications
+from posts.markup import normalize
+from posts.models import Comment, Follow, Group, Notification, Post, Tag
+from posts.sharding import shards
+
+User = get_user_model()
+USER_PREFIX = 'loadtest'
+DEFAULT_MIX = 'browse=70,follow=15,comment=10,post=5'
+
+
+def session_store(session_key=None):
+    return import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+
+
+def login_cookies(user):
+    """Cookie сессии вошедшего user без прохода через форму входа."""
+    store = session_store()
+    store[SESSION_KEY] = str(user.pk)
+    store[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    store.create()
+    return {settings.SESSION_COOKIE_NAME: store.session_key}
+
+
+def load_tag():
+    return Tag.objects.filter(
+        kind=Tag.HASHTAG, name=normalize(Tag.HASHTAG, USER_PREFIX)
+    )
+
+
+def cleanup(users, logins, keep_tag):
+    """Удаляет пользователей, созданных прогоном, и всё, что они создали.
+
+    Посты, комментарии, подписки, уведомления и сессии уходят вместе
+    с ними, поэтому следующий прогон начинается с тех же данных.
+    """
+    user_ids = [user.pk for user in users]
+    for alias in shards():
+        # Пользователи в default: каскад до шардов не дойдёт.
+        Comment.objects.using(alias).filter(author_id__in=user_ids).delete()
+        Post.objects.using(alias).filter(author_id__in=user_ids).delete()
+    recipients = set(Notification.objects.filter(
+        actor_id__in=user_ids
+    ).values_list('recipient_id', flat=True))
+    User.objects.filter(pk__in=user_ids).delete()
+    invalidate_namespace(*map(notifications.namespace, recipients))
+    if not keep_tag:
+        load_tag().delete()
+    for cookies in logins:
+        session_store(cookies[settings.SESSION_COOKIE_NAME]).delete()
+
+
+class Scenarios:
+    """Сценарии поверх выборки существующих постов, групп и авторов."""
+
+    def __init__(self, sample=500):
+        self.post_ids = list(
+            Post.objects.values_list('pk', flat=True)[:sample]
+        )
+        self.slugs = list(
+            Group.objects.values_list('slug', flat=True)[:sample]
+        )
+        self.usernames = list(Post.objects.values_list(
+            'author__username', flat=True
+        ).distinct()[:sample])
+
+    def browse(self, session):
+        rng = session.random
+        session.get(reverse('posts:index'))
+        session.get(reverse('posts:index') + f'?page={rng.randint(1, 5)}')
+        if self.slugs:
+            session.get(
+                reverse('posts:group_posts', args=[rng.choice(self.slugs)])
+            )
+        if self.post_ids:
+            session.get(reverse(
+                'posts:post_detail', args=[rng.choice(self.post_ids)]
+            ))
+        if self.usernames:
+            session.get(
+                reverse('posts:profile', args=[rng.choice(self.usernames)])
+            )
+
+    def follow(self, session):
+        session.get(reverse('posts:follow_index'))
+
+    def comment(self, session):
+        if not self.post_ids:
+            return
+        post_id = session.random.choice(self.post_ids)
+        session.get(reverse('posts:post_detail', args=[post_id]))
+        session.post(reverse('posts:add_comment', args=[post_id]),
+                     {'text': 'Нагрузочный комментарий'})
+
+    def post(self, session):
+        session.get(reverse('posts:post_create'))
+        session.post(reverse('posts:post_create'),
+                     {'text': f'Нагрузочный пост #{USER_PREFIX}'})
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон: вызывает WSGI-приложение напрямую '
+            'из пула потоков по взвешенным сценариям.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200,
+                            help='Сколько сценариев выполнить.')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--mix', default=DEFAULT_MIX,
+            help=f'Веса сценариев, по умолчанию {DEFAULT_MIX}.'
+        )
+        parser.add_argument(
+            '--users', type=int, default=4,
+            help=f'Сколько новых пользователей {USER_PREFIX}_<прогон>_N '
+                 'создать для сценариев со входом (0 — только анонимы). '
+                 'После прогона они удаляются вместе со своими данными.'
+        )
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument(
+            '--yes', action='store_true',
+            help='Подтверждение: прогон пишет посты, комментарии и '
+                 'подписки в настроенную БД.'
+        )
+
+    def handle(self, *args, **options):
+        from yatube.wsgi import application
+
+        if not options['yes']:
+            raise CommandError(
+                'Прогон пишет посты, комментарии и подписки в БД '
+                f'{settings.DATABASES["default"]["NAME"]}; '
+                'запустите с --yes, если это не рабочая база.'
+            )
+        scenarios = Scenarios()
+        mix = self.parse_mix(options['mix'])
+        keep_tag = load_tag().exists()
+        users = self.users(options['users'])
+        logins = [login_cookies(user) for user in users]
+        plan = [
+            (weight, getattr(scenarios, name), name != 'browse')
+            for name, weight in mix.items()
+        ]
+        try:
+            with counters.disabled():
+                report = loadtest.run(
+                    application, plan,
+                    iterations=options['iterations'],
+                    concurrency=options['concurrency'],
+                    logins=logins,
+                    host=settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS
+                    else 'localhost',
+                    seed=options['seed'],
+                )
+        finally:
+            cleanup(users, logins, keep_tag)
+        self.print_report(report)
+
+    def parse_mix(self, value):
+        mix = {}
+        for part in value.split(','):
+            name, _, weight = part.partition('=')
+            if name not in ('browse', 'follow', 'comment', 'post'):
+                raise CommandError(f'Неизвестный сценарий: {name}')
+            mix[name] = int(weight or 1)
+        return mix
+
+    def users(self, count):
+        """Новые пользователи со случайным суффиксом прогона.
+
+        Существующие аккаунты не используются: cleanup() удаляет
+        пользователей вместе со всеми их данными.
+        """
+        run = secrets.token_hex(4)
+        users = []
+        authors = list(User.objects.filter(
+            pk__in=Post.objects.values('author_id')[:20]
+        ))
+        for number in range(count):
+            user = User.objects.create(
+                username=f'{USER_PREFIX}_{run}_{number}'
+            )
+            Follow.objects.bulk_create(
+                Follow(user=user, author=author) for author in authors
+            )
+            users.append(user)
+        return users
+
+    def print_report(self, report):
+        def ms(value):
+            return '-' if value is None else f'{value * 1000:.1f}'
+
+        self.stdout.write(
+            f'Запросов: {report.total} за {report.elapsed:.2f} с, '
+            f'{report.throughput:.1f} запр/с'
+        )
+        self.stdout.write(
+            f'{"URL":<28}{"запр.":>7}{"ошибок":>8}'
+            f'{"p50 мс":>9}{"p95 мс":>9}{"p99 мс":>9}'
+        )
+        for name, count, errors, p50, p95, p99 in report.rows():
+            self.stdout.write(
+                f'{name:<28}{count:>7}{errors:>8}'
+                f'{ms(p50):>9}{ms(p95):>9}{ms(p99):>9}'
+            )
@@ -0,0 +1,69 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Выполняется в отдельном процессе: старт воркера и первый запрос.
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+from yatube.wsgi import application
+ready = time.perf_counter()
+from core.loadtest import Report, Session
+if {cold!r}:
+    from django.core.cache import cache
+    cache.clear()
+session = Session(application, Report(), {host!r})
+sent = time.perf_counter()
+status = session.get({path!r})
+print(json.dumps({{
+    'startup': ready - started,
+    'first_request': time.perf_counter() - sent,
+    'status': status,
+}}))
+'''
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время старта воркера и первого запроса '
+            'с прогревом (YATUBE_WARMUP) и без него.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/')
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument(
+            '--cold-cache', action='store_true',
+            help='Очищать кэш перед первым запросом (не на проде!).'
+        )
+
+    def handle(self, *args, **options):
+        host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else (
+            'localhost'
+        )
+        probe = PROBE.format(cold=options['cold_cache'], host=host,
+                             path=options['path'])
+        for warm in (False, True):
+            runs = [self.probe(probe, warm) for _ in range(options['repeat'])]
+            label = 'с прогревом' if warm else 'без прогрева'
+            startup = statistics.median(run['startup'] for run in runs)
+            first = statistics.median(run['first_request'] for run in runs)
+            self.stdout.write(
+                f'{label}: старт {startup * 1000:.0f} мс, первый запрос '
+                f'{first * 1000:.0f} мс (медиана из {len(runs)}, '
+                f'статус {runs[-1]["status"]})'
+            )
+
+    def probe(self, code, warm):
+        env = dict(os.environ)
+        env['YATUBE_WARMUP'] = '1' if warm else '0'
+        result = subprocess.run(
+            [sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr)
+        return json.loads(result.stdout.strip().splitlines()[-1])
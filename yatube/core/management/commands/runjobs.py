@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Воркер очереди фоновых задач и планировщик периодических.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти.'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Пауза между опросами пустой очереди, секунды.'
+        )
+        parser.add_argument(
+            '--no-schedule', action='store_true',
+            help='Не ставить периодические задачи (для доп. воркеров).'
+        )
+
+    def handle(self, *args, **options):
+        worker = jobs.worker_name()
+        self.stdout.write(f'Воркер {worker}, задач: {len(jobs.registry)}')
+        last_tick = timezone.now()
+        while True:
+            now = timezone.now()
+            if not options['no_schedule']:
+                jobs.schedule_periodic(last_tick, now)
+            if now.minute != last_tick.minute or options['once']:
+                jobs.requeue_abandoned()
+            last_tick = now
+            done = jobs.run_pending(worker=worker)
+            if options['once']:
+                self.stdout.write(f'Выполнено задач: {done}')
+                return
+            if not done:
+                time.sleep(options['sleep'])
@@ -0,0 +1,162 @@
+"""Отдача файлов из MEDIA_ROOT.
+
+Django только проверяет путь и права, а сами байты по возможности
+отдаёт фронтовой сервер (settings.MEDIA_SERVE_MODE):
+
+* 'accel' — заголовок X-Accel-Redirect для nginx:
+
+      location /protected-media/ {
+          internal;
+          alias /path/to/media/;
+      }
+
+* 'sendfile' — заголовок X-Sendfile (Apache mod_xsendfile, lighttpd);
+* None — Django сам отдаёт файл через FileResponse кусками, с
+  поддержкой Range, ETag и If-None-Match.
+
+Наружу отдаются только каталоги MEDIA_PUBLIC_DIRS: в остальных лежат
+незавершённые загрузки и карантин. Картинка или миниатюра отдаётся,
+только если у неё есть пост видимого в лентах автора
+(posts.deletion.visible_file), иначе 404.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+
+from posts.deletion import visible_file
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def public_path(path):
+    """Нормализованный путь внутри MEDIA_ROOT или Http404."""
+    name = posixpath.normpath(path).lstrip('/')
+    if name.startswith('..') or '\x00' in name:
+        raise Http404('Недопустимый путь')
+    if not name.startswith(tuple(settings.MEDIA_PUBLIC_DIRS)):
+        raise Http404('Файл недоступен')
+    return name
+
+
+def etag_for(stat):
+    return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+
+def not_modified(request, etag, mtime):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [
+            tag.strip() for tag in if_none_match.split(',')
+        ]
+    since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+    )
+    return since is not None and int(mtime) <= since
+
+
+def parse_range(header, size):
+    """(начало, конец включительно), None — весь файл, False — 416."""
+    match = RANGE_RE.match(header or '')
+    if not match:
+        # Несколько диапазонов или мусор: по RFC 7233 можно отдать всё.
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+class RangeFile:
+    """Файл, из которого читается не больше length байт с позиции start."""
+
+    def __init__(self, path, start, length):
+        self.file = open(path, 'rb')
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def serve(request, path):
+    name = public_path(path)
+    if not visible_file(name):
+        raise Http404('Файл недоступен')
+    full_path = os.path.join(settings.MEDIA_ROOT, *name.split('/'))
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404('Файл не найден')
+    if not os.path.isfile(full_path):
+        raise Http404('Файл не найден')
+    etag = etag_for(stat)
+    if not_modified(request, etag, stat.st_mtime):
+        response = HttpResponse(status=304)
+    else:
+        response = _file_response(request, name, full_path, stat, etag)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = (
+        f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable'
+    )
+    return response
+
+
+def _file_response(request, name, full_path, stat, etag):
+    content_type = mimetypes.guess_type(name)[0] or (
+        'application/octet-stream'
+    )
+    mode = settings.MEDIA_SERVE_MODE
+    if mode == 'accel':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_PREFIX + quote(name)
+        )
+        return response
+    if mode == 'sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+        return response
+    size = stat.st_size
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is None or if_range.strip() == etag:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        response = FileResponse(
+            open(full_path, 'rb'), content_type=content_type
+        )
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            RangeFile(full_path, start, end - start + 1),
+            status=206, content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,59 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Ниже этого числа строк точный COUNT(*) дешёв и считается как обычно.
+EXACT_COUNT_LIMIT: int = 10000
+
+
+def estimate_count(model, using='default'):
+    """Оценка числа строк таблицы без полного COUNT(*) или None."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [table],
+            )
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None
+        if connection.vendor != 'sqlite':
+            return None
+        # sqlite_stat1 появляется после ANALYZE; без неё берём MAX(pk),
+        # это дёшево по индексу первичного ключа и не меньше числа строк.
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        )
+        if cursor.fetchone():
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table]
+            )
+            row = cursor.fetchone()
+            if row:
+                return int(row[0].split()[0])
+        cursor.execute(
+            'SELECT MAX(%s) FROM %s' % (
+                connection.ops.quote_name(model._meta.pk.column),
+                connection.ops.quote_name(table),
+            )
+        )
+        return cursor.fetchone()[0] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для больших таблиц: без фильтров число строк оценивается.
+
+    Для отфильтрованного queryset и небольших таблиц считается точно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is None or query.where or query.distinct:
+            return super().count
+        estimate = estimate_count(queryset.model, queryset.db)
+        if estimate is None or estimate < EXACT_COUNT_LIMIT:
+            return super().count
+        return estimate
@@ -0,0 +1,123 @@
+"""Защита дорогих кэшируемых значений от лавинного пересчёта.
+
+Вместе со значением хранится время мягкого истечения и длительность
+последнего пересчёта. После мягкого истечения пересчитывает только
+воркер, захвативший блокировку в кэше, остальные отдают устаревшее
+значение. Незадолго до истечения пересчёт запускается заранее
+с вероятностью, растущей к сроку (probabilistic early expiration,
+XFetch), поэтому горячие ключи обычно обновляются до того,
+как устареют.
+"""
+import math
+import random
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.core.cache import cache as default_cache
+
+# Сколько секунд после мягкого истечения можно отдавать старое значение.
+STALE_TIMEOUT: int = 60
+# Блокировка пересчёта снимается сама, если воркер упал.
+LOCK_TIMEOUT: int = 10
+# Сколько ждать чужого пересчёта, когда отдавать вообще нечего.
+LOCK_WAIT: float = 2.0
+LOCK_POLL: float = 0.05
+BETA: float = 1.0
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(name, event):
+    with _stats_lock:
+        _stats[name, event] += 1
+
+
+def stats():
+    """Счётчики процесса: {(имя, событие): количество}.
+
+    События: hit, early (досрочный пересчёт), stale (отдано устаревшее),
+    recompute, wait (дождались чужого пересчёта).
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def cached(key, compute, timeout, *, name=None, stale_timeout=STALE_TIMEOUT,
+           lock_timeout=LOCK_TIMEOUT, beta=BETA, cache=default_cache):
+    """Значение из кэша по key, пересчитываемое compute() в одном воркере."""
+    name = name or key
+    lock_key = f'{key}:lock'
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expires = entry
+        # -log(u) при u из (0, 1] даёт экспоненциальный сдвиг срока.
+        early = delta * beta * -math.log(1.0 - random.random())
+        if time.time() + early < expires:
+            _count(name, 'hit')
+            return value
+        if not cache.add(lock_key, True, lock_timeout):
+            _count(name, 'stale')
+            return value
+        _count(name, 'early' if time.time() < expires else 'recompute')
+    elif not cache.add(lock_key, True, lock_timeout):
+        value = _wait(cache, key, lock_key)
+        if value is not None:
+            _count(name, 'wait')
+            return value[0]
+        # Держатель блокировки не успел: считаем сами, без блокировки.
+        _count(name, 'recompute')
+        return _store(cache, key, compute, timeout, stale_timeout)
+    else:
+        _count(name, 'recompute')
+    try:
+        return _store(cache, key, compute, timeout, stale_timeout)
+    finally:
+        cache.delete(lock_key)
+
+
+def _store(cache, key, compute, timeout, stale_timeout):
+    started = time.time()
+    value = compute()
+    finished = time.time()
+    cache.set(
+        key,
+        (value, finished - started, finished + timeout),
+        timeout + stale_timeout,
+    )
+    return value
+
+
+def _wait(cache, key, lock_key):
+    deadline = time.time() + LOCK_WAIT
+    while time.time() < deadline:
+        time.sleep(LOCK_POLL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if cache.get(lock_key) is None:
+            break
+    return None
+
+
+def single_flight(timeout, key_func, **options):
+    """Декоратор для cached(): key_func получает аргументы вызова.
+
+    Если key_func вернул None, результат не кэшируется.
+    """
+    def decorator(func):
+        cached_options = {'name': func.__qualname__, **options}
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = key_func(*args, **kwargs)
+            if key is None:
+                return func(*args, **kwargs)
+            return cached(
+                key, lambda: func(*args, **kwargs), timeout,
+                **cached_options
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .jobs import periodic
+from .models import Job
+
+KEEP_FINISHED = timedelta(days=7)
+PURGE_BATCH: int = 1000
+
+
+@periodic('17 3 * * *', name='core.purge_finished_jobs')
+def purge_finished_jobs():
+    """Удаляет старые завершённые задачи небольшими пачками."""
+    finished = Job.objects.filter(
+        status__in=(Job.DONE, Job.FAILED),
+        finished_at__lt=timezone.now() - KEEP_FINISHED,
+    )
+    while True:
+        pks = list(finished.values_list('pk', flat=True)[:PURGE_BATCH])
+        if not pks:
+            return
+        Job.objects.filter(pk__in=pks).delete()
@@ -0,0 +1,68 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core.cache import namespaced_key
+from core.stampede import cached
+
+register = template.Library()
+
+NAMESPACE_ARG: str = 'namespace='
+
+
+class CacheFragmentNode(template.Node):
+    def __init__(self, nodelist, timeout, fragment_name, vary_on,
+                 namespaces):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+        self.namespaces = namespaces
+
+    def render(self, context):
+        timeout = self.timeout.resolve(context)
+        try:
+            timeout = int(timeout)
+        except (ValueError, TypeError):
+            raise template.TemplateSyntaxError(
+                f'"cache_fragment" tag got a non-integer timeout '
+                f'value: {timeout!r}'
+            )
+        key = make_template_fragment_key(
+            self.fragment_name,
+            [var.resolve(context) for var in self.vary_on],
+        )
+        namespaces = [ns.resolve(context) for ns in self.namespaces]
+        if namespaces:
+            key = namespaced_key(key, *namespaces)
+        return cached(
+            key, lambda: self.nodelist.render(context), timeout,
+            name=self.fragment_name,
+        )
+
+
+@register.tag('cache_fragment')
+def do_cache_fragment(parser, token):
+    """Как {% cache %}, но с защитой от лавинного пересчёта.
+
+    {% cache_fragment 20 index_page page_obj.number namespace='posts' %}
+    Фрагмент сбрасывается при инвалидации любого из namespace.
+    """
+    nodelist = parser.parse(('endcache_fragment',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' tag requires at least 2 arguments."
+        )
+    namespaces = [
+        parser.compile_filter(bit[len(NAMESPACE_ARG):])
+        for bit in bits[3:] if bit.startswith(NAMESPACE_ARG)
+    ]
+    vary_on = [
+        parser.compile_filter(bit)
+        for bit in bits[3:] if not bit.startswith(NAMESPACE_ARG)
+    ]
+    return CacheFragmentNode(
+        nodelist, parser.compile_filter(bits[1]), bits[2], vary_on,
+        namespaces,
+    )
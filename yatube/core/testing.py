@@ -0,0 +1,47 @@
+"""Окружение тестов: кэш и метаданные миниатюр во временном каталоге.
+
+Иначе manage.py test и pytest писали бы в файлы SQLite сервера
+разработки (settings.CACHE_DIR) и видели бы оставленные им записи.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+@contextmanager
+def temp_cache_dir():
+    directory = tempfile.mkdtemp(prefix='yatube-cache-')
+    caches = {
+        alias: dict(config, LOCATION=os.path.join(
+            directory, os.path.basename(config['LOCATION'])
+        )) if config.get('LOCATION') else config
+        for alias, config in settings.CACHES.items()
+    }
+    try:
+        with override_settings(
+            CACHES=caches,
+            THUMBNAIL_KVSTORE_PATH=os.path.join(
+                directory, os.path.basename(settings.THUMBNAIL_KVSTORE_PATH)
+            ),
+        ):
+            yield directory
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner с temp_cache_dir() на время прогона."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_dir = temp_cache_dir()
+        self._cache_dir.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_dir.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.cache import TieredCache, invalidate_namespace, namespaced_key
+
+
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = TieredCache(location, {})
+        # Второй экземпляр на том же файле — как кэш другого воркера.
+        self.other = TieredCache(location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_shared_between_instances(self):
+        self.cache.set('key', {'a': 1})
+        self.assertEqual(self.other.get('key'), {'a': 1})
+        self.assertTrue(self.other.add('new', 1))
+        self.assertFalse(self.cache.add('new', 2))
+        self.assertEqual(self.cache.get_many(['key', 'new', 'nope']),
+                         {'key': {'a': 1}, 'new': 1})
+
+    def test_local_copy_is_not_shared(self):
+        self.cache.set('list', [1])
+        self.cache.get('list').append(2)
+        self.assertEqual(self.cache.get('list'), [1])
+
+    def test_incr_and_expiry(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.other.incr('counter', 2), 3)
+        self.assertEqual(self.other.get('counter'), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.set('gone', 1, 0)
+        self.assertIsNone(self.cache.get('gone'))
+
+    def test_namespace_invalidation_reaches_other_instance(self):
+        key = namespaced_key('feed', 'posts', cache=self.cache)
+        self.assertEqual(namespaced_key('feed', 'posts', cache=self.other),
+                         key)
+        self.cache.set(key, 'old page')
+        invalidate_namespace('posts', cache=self.other)
+        new_key = namespaced_key('feed', 'posts', cache=self.cache)
+        self.assertNotEqual(new_key, key)
+        self.assertIsNone(self.cache.get(new_key))
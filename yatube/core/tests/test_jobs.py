@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+calls = []
+
+
+@jobs.job('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@jobs.job('tests.explode', max_attempts=2)
+def explode():
+    raise RuntimeError('boom')
+
+
+@jobs.job('tests.long')
+def long_running():
+    # Задача идёт дольше LOCK_TIMEOUT, но отмечается между пачками.
+    later = timezone.now() + jobs.LOCK_TIMEOUT * 2
+    with mock.patch.object(jobs, 'CHUNK_PAUSE', 0), \
+            mock.patch('django.utils.timezone.now', return_value=later):
+        jobs.pause()
+        jobs.requeue_abandoned()
+    calls.append(Job.objects.get(name='tests.long').status)
+
+
+@jobs.periodic('*/15 * * * *', name='tests.tick')
+def tick():
+    calls.append('tick')
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_jobs_run_by_priority(self):
+        record.enqueue('low')
+        record.enqueue('high', priority=10)
+        record.enqueue('later', delay=3600)
+        self.assertEqual(jobs.run_pending(), 2)
+        self.assertEqual(calls, ['high', 'low'])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+
+    def test_failed_job_retried_with_backoff(self):
+        job_obj = explode.enqueue()
+        jobs.run_pending()
+        job_obj.refresh_from_db()
+        self.assertEqual(job_obj.status, Job.QUEUED)
+        self.assertGreater(job_obj.run_at, timezone.now())
+        Job.objects.filter(pk=job_obj.pk).update(run_at=timezone.now())
+        jobs.run_pending()
+        job_obj.refresh_from_db()
+        self.assertEqual(job_obj.status, Job.FAILED)
+        self.assertIn('boom', job_obj.last_error)
+
+    def test_only_jobs_without_heartbeat_requeued(self):
+        long_running.enqueue()
+        abandoned = record.enqueue('lost')
+        Job.objects.filter(pk=abandoned.pk).update(
+            status=Job.RUNNING,
+            locked_at=timezone.now() - jobs.LOCK_TIMEOUT * 3,
+        )
+        jobs.run_pending()
+        self.assertEqual(calls, [Job.RUNNING])
+        abandoned.refresh_from_db()
+        self.assertEqual(abandoned.status, Job.QUEUED)
+        self.assertEqual(abandoned.attempts, 1)
+
+    def test_idempotency_key(self):
+        first = record.enqueue('once', idempotency_key='once')
+        second = record.enqueue('once', idempotency_key='once')
+        self.assertEqual(first.pk, second.pk)
+        jobs.run_pending()
+        self.assertEqual(calls, ['once'])
+
+    def test_periodic_jobs_scheduled_once_per_slot(self):
+        since = datetime(2026, 1, 1, 10, 0, 30, tzinfo=timezone.utc)
+        jobs.schedule_periodic(since, since + timedelta(minutes=31))
+        jobs.schedule_periodic(since, since + timedelta(minutes=31))
+        self.assertEqual(Job.objects.filter(name='tests.tick').count(), 2)
+
+    def test_password_reset_mail_sent_by_worker(self):
+        from django.contrib.auth import get_user_model
+        get_user_model().objects.create_user(
+            username='reset', email='reset@example.com', password='pass'
+        )
+        self.client.post('/auth/password_reset/',
+                         {'email': 'reset@example.com'})
+        self.assertEqual(len(mail.outbox), 0)
+        jobs.run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class CronScheduleTest(TestCase):
+    def test_matches(self):
+        cron = jobs.CronSchedule('30 4 * * 1-5')
+        monday = datetime(2026, 10, 19, 4, 30)
+        self.assertTrue(cron.matches(monday))
+        self.assertFalse(cron.matches(monday + timedelta(days=6)))
+        self.assertFalse(cron.matches(monday + timedelta(minutes=1)))
+
+    def test_invalid_expression(self):
+        with self.assertRaises(ValueError):
+            jobs.CronSchedule('61 * * * *')
@@ -0,0 +1,100 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import CommandError, call_command
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.test import TestCase
+
+from core import loadtest
+from core.management.commands import loadtest as loadtest_command
+from posts.models import Comment, Group, Notification, Post, Tag
+
+User = get_user_model()
+original_cleanup = loadtest_command.cleanup
+
+
+class LoadTestTest(TestCase):
+    def setUp(self):
+        # Как в django.test.Client: иначе конец запроса закроет
+        # соединение посреди транзакции теста.
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+        author = User.objects.create_user(username='author')
+        # Настоящий аккаунт с «нагрузочным» именем прогон не трогает.
+        self.namesake = User.objects.create_user(username='loadtest0')
+        Post.objects.create(author=self.namesake, text='Свой пост')
+        group = Group.objects.create(title='Группа', slug='group',
+                                     description='Описание')
+        for i in range(3):
+            Post.objects.create(author=author, group=group, text=f'Пост {i}')
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(values, 50), 50)
+        self.assertEqual(loadtest.percentile(values, 99), 99)
+        self.assertEqual(loadtest.percentile([7], 95), 7)
+        self.assertIsNone(loadtest.percentile([], 50))
+
+    def test_run_reports_per_url(self):
+        def broken(session):
+            session.get('/no-such-page/')
+
+        def browse(session):
+            session.get('/')
+
+        report = loadtest.run(
+            WSGIHandler(), [(1, browse, False), (1, broken, False),
+                            (5, browse, True)],
+            iterations=10, seed=1,
+        )
+        rows = {row[0]: row for row in report.rows()}
+        self.assertEqual(report.total, 10)
+        self.assertEqual(rows['posts:index'][2], 0)
+        self.assertEqual(rows['<404>'][1], rows['<404>'][2])
+
+    def test_command_requires_confirmation(self):
+        with self.assertRaises(CommandError):
+            call_command('loadtest', '--iterations', '1', stdout=StringIO())
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_command_posts_and_comments(self):
+        written = {}
+
+        def cleanup(*args):
+            written['comments'] = Comment.objects.count()
+            written['posts'] = Post.objects.filter(
+                author__username__startswith='loadtest_'
+            ).count()
+            original_cleanup(*args)
+
+        out = StringIO()
+        with mock.patch.object(loadtest_command, 'cleanup', cleanup):
+            call_command('loadtest', '--iterations', '20',
+                         '--concurrency', '1', '--users', '2', '--seed', '3',
+                         '--mix', 'browse=1,follow=1,comment=1,post=1',
+                         '--yes', stdout=out)
+        output = out.getvalue()
+        self.assertIn('posts:add_comment', output)
+        self.assertIn('posts:post_create', output)
+        self.assertTrue(written['comments'])
+        self.assertTrue(written['posts'])
+        for line in output.splitlines()[2:]:
+            self.assertEqual(line.split()[2], '0', line)
+        # Прогон убирает за собой всё созданное.
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertEqual(list(Post.objects.values_list('views', flat=True)),
+                         [0, 0, 0, 0])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(Tag.objects.exists())
+        self.assertFalse(Session.objects.exists())
+        self.assertEqual(
+            list(User.objects.order_by('pk').values_list(
+                'username', flat=True
+            )),
+            ['author', 'loadtest0'],
+        )
@@ -0,0 +1,112 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from posts.models import Deletion, Post
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = bytes(range(256)) * 4
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_SERVE_MODE=None)
+class MediaViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in ('posts/a.gif', 'posts/b.gif', 'uploads/a.gif',
+                     'cache/t.gif'):
+            path = os.path.join(MEDIA_ROOT, *name.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        Post.objects.create(author=self.author, text='Пост',
+                            image='posts/a.gif')
+
+    def test_full_file_with_cache_headers(self):
+        response = self.client.get('/media/posts/a.gif')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/gif')
+        self.assertIn('max-age=', response['Cache-Control'])
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        response = self.client.get('/media/posts/a.gif',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_ranges(self):
+        response = self.client.get('/media/posts/a.gif',
+                                   HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content),
+                         CONTENT[10:20])
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        response = self.client.get('/media/posts/a.gif',
+                                   HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[-4:])
+        response = self.client.get('/media/posts/a.gif',
+                                   HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        response = self.client.get('/media/posts/a.gif',
+                                   HTTP_RANGE='bytes=0-1',
+                                   HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_private_and_missing(self):
+        for path in ('/media/uploads/a.gif', '/media/posts/../uploads/a.gif',
+                     '/media/posts/missing.gif', '/media/posts/b.gif',
+                     '/media/cache/t.gif'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+        self.assertEqual(self.client.post('/media/posts/a.gif').status_code,
+                         405)
+
+    def test_thumbnail_of_visible_post(self):
+        source = ImageFile('posts/a.gif', default.storage)
+        KVStoreModel.objects.create(
+            key=add_prefix(source.key),
+            value=json.dumps({'name': source.name, 'size': [1, 1]}),
+        )
+        KVStoreModel.objects.create(
+            key=add_prefix(source.key, 'thumbnails'),
+            value=json.dumps([ImageFile('cache/t.gif', default.storage).key]),
+        )
+        response = self.client.get('/media/cache/t.gif')
+        self.assertEqual(response.status_code, 200)
+
+    def test_hidden_author(self):
+        Deletion.objects.create(kind=Deletion.USER, target_id=self.author.pk)
+        cache.clear()
+        self.assertEqual(self.client.get('/media/posts/a.gif').status_code,
+                         404)
+
+    @override_settings(MEDIA_SERVE_MODE='accel')
+    def test_accel_redirect(self):
+        response = self.client.get('/media/posts/a.gif')
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-media/posts/a.gif')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_SERVE_MODE='sendfile')
+    def test_sendfile(self):
+        response = self.client.get('/media/posts/a.gif')
+        self.assertEqual(response['X-Sendfile'],
+                         os.path.join(MEDIA_ROOT, 'posts', 'a.gif'))
@@ -0,0 +1,37 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core import paginator
+from posts.models import Post
+
+User = get_user_model()
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'пост {i}') for i in range(5)
+        )
+        Post.objects.filter(text='пост 0').delete()
+
+    @mock.patch.object(paginator, 'EXACT_COUNT_LIMIT', 0)
+    def test_unfiltered_count_is_estimated(self):
+        pages = paginator.EstimatedCountPaginator(Post.objects.all(), 2)
+        # Оценка по MAX(pk) не меньше настоящего числа строк.
+        self.assertGreaterEqual(pages.count, 4)
+        self.assertEqual(pages.count, Post.objects.latest('pk').pk)
+
+    @mock.patch.object(paginator, 'EXACT_COUNT_LIMIT', 0)
+    def test_filtered_count_is_exact(self):
+        posts = Post.objects.filter(text__startswith='пост')
+        self.assertEqual(
+            paginator.EstimatedCountPaginator(posts, 2).count, 4
+        )
+
+    def test_small_table_counted_exactly(self):
+        pages = paginator.EstimatedCountPaginator(Post.objects.all(), 2)
+        self.assertEqual(pages.count, 4)
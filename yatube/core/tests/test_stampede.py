@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from core.cache import TieredCache
+from core.stampede import cached, single_flight, stats
+
+
+class StampedeTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = TieredCache(
+            os.path.join(self.directory, 'cache.sqlite3'), {}
+        )
+        self.calls = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def compute(self):
+        self.calls += 1
+        return f'value {self.calls}'
+
+    def test_fresh_value_is_not_recomputed(self):
+        for _ in range(3):
+            value = cached('key', self.compute, 60, cache=self.cache,
+                           name='fresh')
+        self.assertEqual(value, 'value 1')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(stats()['fresh', 'hit'], 2)
+
+    def test_stale_value_served_while_locked(self):
+        self.cache.set('key', ('old', 0.1, time.time() - 1), 60)
+        self.cache.add('key:lock', True, 10)
+        value = cached('key', self.compute, 60, cache=self.cache,
+                       name='stale')
+        self.assertEqual(value, 'old')
+        self.assertEqual(self.calls, 0)
+        self.assertEqual(stats()['stale', 'stale'], 1)
+
+    def test_expired_value_recomputed_by_lock_holder(self):
+        self.cache.set('key', ('old', 0.1, time.time() - 1), 60)
+        value = cached('key', self.compute, 60, cache=self.cache)
+        self.assertEqual(value, 'value 1')
+        self.assertIsNone(self.cache.get('key:lock'))
+
+    def test_single_flight_decorator(self):
+        @single_flight(60, lambda number: f'square:{number}',
+                       cache=self.cache)
+        def square(number):
+            self.calls += 1
+            return number * number
+
+        self.assertEqual(square(3), 9)
+        self.assertEqual(square(3), 9)
+        self.assertEqual(self.calls, 1)
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.test import TestCase
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from ..thumbnails import STORE_TIMEOUT, KVStore
+
+
+class ThumbnailKVStoreTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def store(self, name='host.sqlite3'):
+        return KVStore(os.path.join(self.directory, name), max_entries=10)
+
+    def test_local_file_shared_between_workers(self):
+        self.store()._set_raw(add_prefix('a'), '{"size": [1, 2]}')
+        self.assertTrue(KVStoreModel.objects.filter(
+            key=add_prefix('a')
+        ).exists())
+        other = self.store()
+        with self.assertNumQueries(0):
+            self.assertEqual(other._get_raw(add_prefix('a')),
+                             '{"size": [1, 2]}')
+            self.assertEqual(other._get_raw(add_prefix('a')),
+                             '{"size": [1, 2]}')
+
+    def test_other_host_reads_database_once(self):
+        self.store()._set_raw(add_prefix('a'), 'a')
+        other_host = self.store('other.sqlite3')
+        with self.assertNumQueries(1):
+            self.assertEqual(other_host._get_raw(add_prefix('a')), 'a')
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.store('other.sqlite3')._get_raw(add_prefix('a')), 'a'
+            )
+
+    def test_prefetch_is_one_query(self):
+        writer = self.store()
+        for key in 'abc':
+            writer._set_raw(add_prefix(key), key)
+        reader = self.store('other.sqlite3')
+        with self.assertNumQueries(1):
+            reader.prefetch(['a', 'b', 'c', 'missing'])
+        with self.assertNumQueries(0):
+            reader.prefetch(['a', 'b', 'c', 'missing'])
+            self.assertEqual(reader._get_raw(add_prefix('b')), 'b')
+            self.assertIsNone(reader._get_raw(add_prefix('missing')))
+
+    def test_delete_and_clear(self):
+        store = self.store()
+        store._set_raw(add_prefix('a'), 'a')
+        store._delete_raw(add_prefix('a'))
+        self.assertIsNone(self.store()._get_raw(add_prefix('a')))
+        store._set_raw(add_prefix('b'), 'b')
+        store.clear()
+        self.assertFalse(KVStoreModel.objects.exists())
+        self.assertIsNone(store._get_raw(add_prefix('b')))
+
+    def test_delete_on_other_host_expires(self):
+        writer = self.store()
+        writer._set_raw(add_prefix('a'), 'a')
+        reader = self.store('other.sqlite3')
+        self.assertEqual(reader._get_raw(add_prefix('a')), 'a')
+        # reaper удалил картинку, имя заняла новая загрузка.
+        writer._delete_raw(add_prefix('a'))
+        self.assertEqual(reader._get_raw(add_prefix('a')), 'a')
+        later = time.time() + STORE_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertIsNone(reader._get_raw(add_prefix('a')))
+            self.assertIsNone(
+                self.store('other.sqlite3')._get_raw(add_prefix('a'))
+            )
@@ -0,0 +1,37 @@
+from unittest import mock
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.template import engines
+from django.test import TestCase
+
+from core import warmup
+
+
+class WarmUpTest(TestCase):
+    def test_template_names(self):
+        names = warmup.template_names()
+        self.assertIn('base.html', names)
+        self.assertIn('posts/index.html', names)
+        self.assertIn('includes/header.html', names)
+
+    def test_templates_stay_in_cached_loader(self):
+        loader = engines['django'].engine.template_loaders[0]
+        loader.reset()
+        warmup.compile_templates()
+        self.assertIn(loader.cache_key('posts/index.html'),
+                      loader.get_template_cache)
+
+    def test_steps_timed_and_failures_contained(self):
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+        with mock.patch.object(warmup, 'setup_thumbnails',
+                               side_effect=RuntimeError('boom')), \
+                mock.patch.object(warmup.logger, 'exception') as logged:
+            timings = warmup.warm_up(WSGIHandler())
+        self.assertEqual(
+            list(timings),
+            ['urls', 'templates', 'database', 'thumbnails', 'feeds']
+        )
+        logged.assert_called_once()
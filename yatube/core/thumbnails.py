@@ -0,0 +1,159 @@
+"""Хранилище метаданных sorl-thumbnail для THUMBNAIL_KVSTORE.
+
+Стандартный cached_db KVStore на каждый {% thumbnail %} ходит в кэш,
+а при промахе — в БД. Здесь три уровня:
+
+* LocalLRU в памяти процесса (THUMBNAIL_LOCAL_MAX_ENTRIES записей);
+* SQLiteStore в файле на этой машине (THUMBNAIL_KVSTORE_PATH),
+  общий для всех её воркеров и переживающий перезапуск;
+* таблица sorl-thumbnail в БД — общая для всех машин; из неё
+  дочитывается то, чего ещё нет в локальном файле.
+
+Ключ зависит только от имени файла, а reaper (posts/reaper.py)
+удаляет картинки с миниатюрами, после чего имя может занять новая
+загрузка. _delete_raw() чистит только свой процесс и свою машину,
+поэтому записи на остальных живут ограниченное время: LOCAL_TIMEOUT
+в LRU и STORE_TIMEOUT в файле, после чего перечитываются из БД.
+Отсутствие ключа запоминается ещё короче, чтобы миниатюра, созданная
+другим воркером, была видна быстро.
+
+prefetch() поднимает ключи целой страницы одним запросом к каждому
+уровню, после чего {% thumbnail %} в шаблоне попадает в LRU.
+"""
+import time
+
+from django.conf import settings
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import KVStoreBase, add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .cache import LocalLRU, SQLiteStore
+
+LOCAL_MAX_ENTRIES: int = 10000
+# Сколько секунд запись живёт в LRU процесса и в файле машины.
+LOCAL_TIMEOUT: int = 60
+STORE_TIMEOUT: int = 10 * 60
+# Сколько секунд помнить, что ключа нет.
+MISSING_TIMEOUT: int = 5
+MISSING = object()
+
+
+class KVStore(KVStoreBase):
+    def __init__(self, path=None, max_entries=None):
+        super().__init__()
+        self._local = LocalLRU(max_entries or getattr(
+            settings, 'THUMBNAIL_LOCAL_MAX_ENTRIES', LOCAL_MAX_ENTRIES
+        ))
+        self._store = SQLiteStore(path or settings.THUMBNAIL_KVSTORE_PATH)
+        self._local_timeout = getattr(
+            settings, 'THUMBNAIL_LOCAL_TIMEOUT', LOCAL_TIMEOUT
+        )
+        self._store_timeout = getattr(
+            settings, 'THUMBNAIL_KVSTORE_TIMEOUT', STORE_TIMEOUT
+        )
+
+    def _store_expires(self):
+        return time.time() + self._store_timeout
+
+    def prefetch(self, keys):
+        """Загружает в LRU ключи изображений одним запросом на уровень."""
+        wanted = {add_prefix(key) for key in keys}
+        missing = [key for key in wanted if self._local.get(key) is None]
+        if not missing:
+            return
+        found = self._store.get_many(missing)
+        rest = [key for key in missing if key not in found]
+        if rest:
+            shared = dict(KVStoreModel.objects.filter(
+                key__in=rest
+            ).values_list('key', 'value'))
+            if shared:
+                expires = self._store_expires()
+                self._store.set_many(shared, expires)
+                found.update(
+                    (key, (value, expires)) for key, value in shared.items()
+                )
+        for key in missing:
+            self._remember(key, *found.get(key, (MISSING, None)))
+
+    def _remember(self, key, value, expires=None):
+        """Кладёт value в LRU не дольше, чем оно живёт в файле."""
+        timeout = MISSING_TIMEOUT if value is MISSING else self._local_timeout
+        local_expires = time.time() + timeout
+        if expires is not None:
+            local_expires = min(local_expires, expires)
+        self._local.set(key, value, local_expires)
+
+    def _get_raw(self, key):
+        item = self._local.get(key)
+        if item is not None:
+            value = item[0]
+            return None if value is MISSING else value
+        row = self._store.get(key)
+        if row is None:
+            value = KVStoreModel.objects.filter(key=key).values_list(
+                'value', flat=True
+            ).first()
+            row = value, self._store_expires()
+            if value is not None:
+                self._store.set(key, *row)
+        value = row[0]
+        self._remember(key, MISSING if value is None else value, row[1])
+        return value
+
+    def _set_raw(self, key, value):
+        KVStoreModel.objects.update_or_create(
+            key=key, defaults={'value': value}
+        )
+        expires = self._store_expires()
+        self._store.set(key, value, expires)
+        self._remember(key, value, expires)
+
+    def _delete_raw(self, *keys):
+        KVStoreModel.objects.filter(key__in=keys).delete()
+        self._store.delete_many(keys)
+        for key in keys:
+            self._local.delete(key)
+
+    def _find_keys_raw(self, prefix):
+        return KVStoreModel.objects.filter(
+            key__startswith=prefix
+        ).values_list('key', flat=True)
+
+    def clear(self, delete_thumbnails=False):
+        if delete_thumbnails:
+            self.delete_all_thumbnail_files()
+        KVStoreModel.objects.filter(
+            key__startswith=sorl_settings.THUMBNAIL_KEY_PREFIX
+        ).delete()
+        self._store.clear()
+        self._local.clear()
+
+
+def thumbnail_key(file_, geometry, **options):
+    """Ключ миниатюры, которую вернёт {% thumbnail file_ geometry ... %}.
+
+    Повторяет вычисление имени из ThumbnailBackend.get_thumbnail.
+    """
+    backend = default.backend
+    source = ImageFile(file_)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage).key
+
+
+def prefetch(keys):
+    """prefetch() текущего хранилища, если оно его поддерживает."""
+    keys = list(keys)
+    if keys and hasattr(default.kvstore, 'prefetch'):
+        default.kvstore.prefetch(keys)
@@ -1,4 +1,7 @@
 from django.shortcuts import render
+from django.views.decorators.http import require_safe
+
+from . import media as media_files
 
 
 def page_not_found(request, exception):
@@ -15,3 +18,8 @@ def permission_denied(request, reason=''):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@require_safe
+def media(request, path):
+    return media_files.serve(request, path)
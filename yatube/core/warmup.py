@@ -0,0 +1,118 @@
+"""Прогрев воркера перед первым запросом.
+
+Вызывается при загрузке yatube/wsgi.py, если не задано YATUBE_WARMUP=0.
+Первые запросы после деплоя иначе платят за заполнение резолвера URL,
+компиляцию шаблонов, настройку sorl-thumbnail, соединения с БД и пустые
+кэши лент. Скомпилированные шаблоны остаются в cached loader, который
+явно задан в TEMPLATES['OPTIONS']['loaders'].
+
+Замерить эффект: manage.py measure_startup.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.template.loader import get_template
+from django.urls import URLResolver, get_resolver
+
+logger = logging.getLogger(__name__)
+
+NAMESPACES = ('posts', 'users', 'about')
+TEMPLATE_PREFIXES = ('posts/', 'users/', 'about/', 'includes/', 'core/')
+# Страницы, которые прогреваются запросом: заполняют кэши фрагментов.
+WARM_PATHS = ('/', '/?page=2', '/groups/')
+WARM_GROUPS: int = 5
+
+
+def template_names():
+    """Имена шаблонов base.html и приложений из всех каталогов шаблонов."""
+    names = {'base.html'}
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            for root, _, files in os.walk(directory):
+                for filename in files:
+                    name = os.path.relpath(
+                        os.path.join(root, filename), directory
+                    ).replace(os.sep, '/')
+                    if name.endswith('.html') and name.startswith(
+                            TEMPLATE_PREFIXES):
+                        names.add(name)
+    return sorted(names)
+
+
+def compile_templates():
+    for name in template_names():
+        get_template(name)
+
+
+def populate_urls():
+    resolver = get_resolver()
+    resolver.reverse_dict
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver) and (
+                pattern.namespace in NAMESPACES):
+            pattern.reverse_dict
+            for route in pattern.url_patterns:
+                route.pattern.regex
+
+
+def open_connections():
+    from posts.sharding import shards
+
+    for alias in {'default', *shards()}:
+        connections[alias].ensure_connection()
+
+
+def setup_thumbnails():
+    from sorl.thumbnail import default
+
+    default.kvstore
+    default.engine
+    default.storage
+
+
+def prefill_feeds(application):
+    from core.loadtest import Report, Session
+    from posts.models import Group
+
+    host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else (
+        'localhost'
+    )
+    session = Session(application, Report(), host)
+    paths = list(WARM_PATHS) + [
+        f'/group/{slug}/' for slug in Group.objects.order_by(
+            'pk'
+        ).values_list('slug', flat=True)[:WARM_GROUPS]
+    ]
+    for path in paths:
+        session.get(path)
+
+
+def warm_up(application=None):
+    """Выполняет шаги прогрева; возвращает {шаг: секунды}.
+
+    Ошибка шага только логируется: прогрев не должен мешать старту.
+    """
+    steps = [
+        ('urls', populate_urls),
+        ('templates', compile_templates),
+        ('database', open_connections),
+        ('thumbnails', setup_thumbnails),
+    ]
+    if application is not None:
+        steps.append(('feeds', lambda: prefill_feeds(application)))
+    timings = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception('Прогрев: шаг %s не удался', name)
+        timings[name] = time.perf_counter() - started
+    logger.info('Прогрев воркера: %s', ', '.join(
+        f'{name} {seconds * 1000:.0f} мс' for name, seconds in timings.items()
+    ))
+    return timings
@@ -1,5 +1,36 @@
-from django.contrib import admin
-from .models import Post, Group
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.utils.html import format_html
+
+from core.paginator import EstimatedCountPaginator
+from core.querysets import IndexedDatesQuerySet
+from . import deletion, images, tasks
+from .models import (
+    Comment, Deletion, Follow, Group, Notification, Post, Tag
+)
+
+
+class ReassignGroupForm(forms.Form):
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.all(),
+        required=False,
+        label='Новая группа',
+        help_text='Оставьте пустым, чтобы убрать посты из групп.',
+        widget=AutocompleteSelect(
+            Post._meta.get_field('group').remote_field, admin.site
+        ),
+    )
+
+
+def message_job(request, job_obj, text):
+    url = reverse('admin:core_job_change', args=[job_obj.pk])
+    messages.info(request, format_html(
+        '{}: <a href="{}">задача #{}</a>.', text, url, job_obj.pk
+    ))
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -9,13 +40,150 @@ class PostAdmin(admin.ModelAdmin):
         'pub_date',
         'author',
         'group',
+        'views',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    # Вместо <select> со всеми группами в каждой строке.
+    autocomplete_fields = ('group',)
+    raw_id_fields = ('author',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
+    actions = ('reassign_group', 'delete_by_author', 'purge_comments')
 
+    def reassign_group(self, request, queryset):
+        form = ReassignGroupForm(
+            request.POST if 'apply' in request.POST else None
+        )
+        selected = list(queryset.values_list('pk', flat=True))
+        if form.is_valid():
+            group = form.cleaned_data['group']
+            job_obj = tasks.reassign_group.enqueue(
+                selected, group and group.pk
+            )
+            message_job(
+                request, job_obj, f'Перенос {len(selected)} постов начат'
+            )
+            return None
+        return TemplateResponse(
+            request, 'admin/posts/post/reassign_group.html', {
+                **self.admin_site.each_context(request),
+                'title': 'Перенести посты в группу',
+                'opts': self.model._meta,
+                'form': form,
+                'selected': selected,
+                'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            }
+        )
+    reassign_group.short_description = 'Перенести в группу'
+    reassign_group.allowed_permissions = ('change',)
 
-admin.site.register(Post, PostAdmin)
+    def delete_by_author(self, request, queryset):
+        author_ids = list(
+            queryset.values_list('author_id', flat=True).distinct()
+        )
+        job_obj = tasks.delete_author_posts.enqueue(author_ids)
+        message_job(request, job_obj, 'Удаление постов авторов начато')
+    delete_by_author.short_description = 'Удалить все посты их авторов'
+    delete_by_author.allowed_permissions = ('delete',)
+
+    def purge_comments(self, request, queryset):
+        job_obj = tasks.purge_comments.enqueue(
+            list(queryset.values_list('pk', flat=True))
+        )
+        message_job(request, job_obj, 'Удаление комментариев начато')
+    purge_comments.short_description = 'Удалить комментарии к постам'
+    purge_comments.allowed_permissions = ('delete',)
+
+    def save_model(self, request, obj, form, change):
+        if 'image' in form.changed_data:
+            images.fill(obj, form.cleaned_data['image'])
+        if change:
+            obj.save(update_fields=obj.edit_fields())
+        else:
+            super().save_model(request, obj, form, change)
+        if 'image' in form.changed_data:
+            tasks.schedule_thumbnail(obj)
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return IndexedDatesQuerySet(
+            queryset.model, queryset.query, queryset.db
+        )
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug')
+    search_fields = ('title', '=slug')
+    prepopulated_fields = {'slug': ('title',)}
+    actions = ('soft_delete',)
+
+    def soft_delete(self, request, queryset):
+        for group in queryset:
+            deletion.schedule(Deletion.GROUP, group)
+        messages.info(request, 'Группы скрыты и будут удалены в фоне.')
+    soft_delete.short_description = 'Скрыть и удалить в фоне'
+    soft_delete.allowed_permissions = ('delete',)
+
+
+class DeletionAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'kind', 'target_id', 'stage', 'processed', 'created',
+        'finished',
+    )
+    list_filter = ('kind', 'stage')
+    readonly_fields = list_display
+    empty_value_display = '-пусто-'
+
+
+class CommentAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    list_select_related = ('author', 'post')
+    raw_id_fields = ('author', 'post')
+    search_fields = ('text',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+class FollowAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
-admin.site.register(Group)
+
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'recipient', 'actor', 'kind', 'post_id', 'created', 'read',
+        'emailed',
+    )
+    list_select_related = ('recipient', 'actor')
+    list_filter = ('kind', 'read', 'emailed')
+    raw_id_fields = ('recipient', 'actor')
+    search_fields = ('=recipient__username',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'kind', 'name')
+    list_filter = ('kind',)
+    search_fields = ('name',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+admin.site.register(Post, PostAdmin)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
+admin.site.register(Deletion, DeletionAdmin)
+admin.site.register(Tag, TagAdmin)
+admin.site.register(Notification, NotificationAdmin)
@@ -0,0 +1,84 @@
+"""Перенос старых постов с комментариями в архивные таблицы.
+
+Ленты читают почти только свежие посты, а индексы posts_post растут
+вечно. archive_older_than() переносит посты старше срока вместе
+с комментариями в posts_archivedpost/posts_archivedcomment короткими
+транзакциями по batch_size постов; post_detail находит такие посты
+в архиве по прежнему id.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.jobs import pause
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+from .sharding import shards
+
+BATCH_SIZE: int = 200
+POST_FIELDS = (
+    'id', 'text', 'text_html', 'text_html_version', 'pub_date',
+    'author_id', 'group_id', 'image', 'views',
+)
+COMMENT_FIELDS = (
+    'id', 'post_id', 'author_id', 'text', 'text_html', 'text_html_version',
+    'created',
+)
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = settings.POSTS_ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def archive_older_than(cutoff, batch_size=BATCH_SIZE, limit=None):
+    """Архивирует посты с pub_date < cutoff; возвращает их число."""
+    archived = 0
+    for alias in shards():
+        archived += _archive_shard(
+            alias, cutoff, batch_size,
+            None if limit is None else limit - archived
+        )
+    return archived
+
+
+def _archive_shard(alias, cutoff, batch_size, limit):
+    old = Post.objects.using(alias).filter(
+        pub_date__lt=cutoff
+    ).order_by('pub_date')
+    archived = 0
+    while limit is None or archived < limit:
+        size = batch_size if limit is None else min(
+            batch_size, limit - archived
+        )
+        pks = list(old.values_list('pk', flat=True)[:size])
+        if not pks:
+            break
+        archive_batch(alias, pks)
+        archived += len(pks)
+        pause()
+    return archived
+
+
+def archive_batch(alias, pks):
+    posts = Post.objects.using(alias).filter(pk__in=pks)
+    comments = Comment.objects.using(alias).filter(post_id__in=pks)
+    with transaction.atomic(using=alias), transaction.atomic():
+        ArchivedPost.objects.bulk_create(
+            ArchivedPost(**row) for row in posts.values(*POST_FIELDS)
+        )
+        ArchivedComment.objects.bulk_create(
+            ArchivedComment(**row)
+            for row in comments.values(*COMMENT_FIELDS)
+        )
+        comments.delete()
+        posts.delete()
+
+
+def vacuum():
+    """Возвращает освобождённые страницы SQLite файловой системе."""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM')
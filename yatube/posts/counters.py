@@ -0,0 +1,116 @@
+"""Счётчик просмотров постов с записью в БД пачками.
+
+Запись в БД на каждый просмотр post_detail заняла бы единственного
+писателя SQLite. Поэтому record() только увеличивает счётчик в памяти
+процесса, а flush() раз в FLUSH_INTERVAL секунд (или когда накопилось
+MAX_PENDING постов) пишет всё накопленное одним UPDATE ... CASE на
+шард. Сбрасывает буфер первый запрос после истечения интервала и
+выход процесса (atexit).
+
+При падении воркера теряется только несброшенное: не больше
+FLUSH_INTERVAL секунд просмотров и не больше MAX_PENDING постов.
+Если UPDATE не прошёл, счётчики возвращаются в буфер до следующей
+попытки. Сброс не трогает кэш лент: просмотры в них не выводятся.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import DatabaseError, connections
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL: int = 10
+MAX_PENDING: int = 1000
+# Постов в одном UPDATE: по три параметра на пост (IN и CASE).
+UPDATE_BATCH_SIZE: int = 300
+
+_lock = threading.Lock()
+# (алиас БД, имя БД, id поста) -> просмотры.
+_pending = Counter()
+_last_flush = time.monotonic()
+_enabled = True
+
+
+def _database(alias):
+    # Имя БД в ключе: накопленное для тестовой БД не попадёт в рабочую.
+    return alias, connections[alias].settings_dict['NAME']
+
+
+@contextmanager
+def disabled():
+    """Просмотры внутри блока не засчитываются (нагрузочный прогон)."""
+    global _enabled
+    _enabled = False
+    try:
+        yield
+    finally:
+        _enabled = True
+
+
+def record(post):
+    """Засчитывает просмотр post; при необходимости сбрасывает буфер."""
+    if not _enabled:
+        return
+    with _lock:
+        _pending[(*_database(post._state.db), post.pk)] += 1
+        due = (len(_pending) >= MAX_PENDING
+               or time.monotonic() - _last_flush >= FLUSH_INTERVAL)
+    if due:
+        flush()
+
+
+def pending(post):
+    """Просмотры post, ещё не записанные в БД этим процессом."""
+    with _lock:
+        return _pending.get((*_database(post._state.db), post.pk), 0)
+
+
+def flush():
+    """Пишет накопленные просмотры в БД; возвращает число постов."""
+    global _last_flush
+    with _lock:
+        counts = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    by_alias = {}
+    for (alias, name, pk), views in counts.items():
+        if _database(alias)[1] == name:
+            by_alias.setdefault(alias, []).append((pk, views))
+    written = 0
+    for alias, items in by_alias.items():
+        for start in range(0, len(items), UPDATE_BATCH_SIZE):
+            chunk = items[start:start + UPDATE_BATCH_SIZE]
+            try:
+                _update(alias, chunk)
+            except DatabaseError:
+                logger.exception('Не удалось записать просмотры')
+                _restore(alias, chunk)
+            else:
+                written += len(chunk)
+    return written
+
+
+def _update(alias, items):
+    Post.objects.using(alias).filter(
+        pk__in=[pk for pk, _ in items]
+    ).update(views=F('views') + Case(
+        *[When(pk=pk, then=Value(views)) for pk, views in items],
+        default=Value(0),
+        output_field=IntegerField(),
+    ))
+
+
+def _restore(alias, items):
+    with _lock:
+        for pk, views in items:
+            _pending[(*_database(alias), pk)] += views
+
+
+atexit.register(flush)
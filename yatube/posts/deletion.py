@@ -0,0 +1,171 @@
+"""Мягкое удаление пользователей и групп с фоновой дочисткой.
+
+Удаление пользователя каскадом проходит по постам, комментариям
+и подпискам, удаление группы обнуляет group у всех её постов. Для
+больших аккаунтов это одна долгая транзакция, поэтому объект сначала
+только скрывается, а зависимые строки удаляются задачей
+posts.reap_deletion пачками по CHUNK_SIZE. Каждый шаг идемпотентен:
+прерванное удаление продолжает периодическая задача
+posts.reap_pending_deletions.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.cache import invalidate_namespace, namespaced_key
+from core.jobs import pause, report_progress
+from core.stampede import cached
+from .images import thumbnail_source
+from .models import (
+    ArchivedPost, Comment, Deletion, Follow, Group, Post, User
+)
+from .sharding import shards
+from .signals import FEED_NAMESPACE
+
+CHUNK_SIZE: int = 500
+NAMESPACE: str = 'deletions'
+HIDDEN_TIMEOUT: int = 300
+# Блокировка от параллельной дочистки одного удаления двумя воркерами.
+REAP_LOCK_TIMEOUT: int = 600
+# Сколько помнить авторов постов с картинкой (core/media.py).
+FILE_OWNERS_TIMEOUT: int = 300
+IMAGE_DIR: str = 'posts/'
+THUMBNAIL_DIR: str = 'cache/'
+
+
+def hidden_ids(kind):
+    """id пользователей или групп, ожидающих удаления."""
+    return cached(
+        namespaced_key(f'deletions:{kind}', NAMESPACE),
+        lambda: frozenset(Deletion.objects.filter(
+            kind=kind, finished=None
+        ).values_list('target_id', flat=True)),
+        HIDDEN_TIMEOUT,
+        name='hidden_ids',
+    )
+
+
+def visible(posts):
+    """Посты без тех, чьи авторы удаляются."""
+    authors = hidden_ids(Deletion.USER)
+    if authors:
+        posts = posts.exclude(author_id__in=authors)
+    return posts
+
+
+def file_owners(name):
+    """id авторов постов, включая архивные, с картинкой name.
+
+    Для миниатюры — авторы постов с её исходной картинкой.
+    """
+    if name.startswith(THUMBNAIL_DIR):
+        name = thumbnail_source(name)
+    if not name or not name.startswith(IMAGE_DIR):
+        return frozenset()
+    querysets = [
+        Post.objects.using(alias) for alias in shards()
+    ] + [ArchivedPost.objects.all()]
+    return frozenset(
+        author_id for queryset in querysets
+        for author_id in queryset.filter(image=name).values_list(
+            'author_id', flat=True
+        )
+    )
+
+
+def visible_file(name):
+    """Есть ли у файла name пост автора, который не удаляется."""
+    owners = cached(
+        f'file_owners:{name}', lambda: file_owners(name),
+        FILE_OWNERS_TIMEOUT, name='file_owners',
+    )
+    return bool(owners - hidden_ids(Deletion.USER))
+
+
+def schedule(kind, target):
+    """Скрывает объект и ставит в очередь удаление зависимых строк."""
+    from .tasks import reap_deletion
+
+    with transaction.atomic():
+        deletion, _ = Deletion.objects.get_or_create(
+            kind=kind, target_id=target.pk
+        )
+        if kind == Deletion.USER and target.is_active:
+            target.is_active = False
+            target.save(update_fields=['is_active'])
+    invalidate_namespace(NAMESPACE, FEED_NAMESPACE)
+    reap_deletion.enqueue(
+        deletion.pk, idempotency_key=f'reap:{deletion.pk}'
+    )
+    return deletion
+
+
+def _delete_in_chunks(deletion, stage, queryset):
+    deletion.stage = stage
+    while True:
+        chunk = list(queryset.values_list('pk', flat=True)[:CHUNK_SIZE])
+        if not chunk:
+            return
+        with transaction.atomic(using=queryset.db), transaction.atomic():
+            queryset.filter(pk__in=chunk).delete()
+            deletion.processed += len(chunk)
+            deletion.save(update_fields=['stage', 'processed'])
+        report_progress(deletion.processed)
+        pause()
+
+
+def _ungroup_in_chunks(deletion, posts):
+    deletion.stage = 'posts'
+    while True:
+        chunk = list(posts.values_list('pk', flat=True)[:CHUNK_SIZE])
+        if not chunk:
+            return
+        with transaction.atomic(using=posts.db), transaction.atomic():
+            posts.filter(pk__in=chunk).update(group=None)
+            deletion.processed += len(chunk)
+            deletion.save(update_fields=['stage', 'processed'])
+        report_progress(deletion.processed)
+        pause()
+
+
+def reap(deletion):
+    """Доводит удаление до конца; безопасно вызывать повторно."""
+    if deletion.finished is not None:
+        return
+    lock_key = f'deletions:lock:{deletion.pk}'
+    if not cache.add(lock_key, True, REAP_LOCK_TIMEOUT):
+        return
+    try:
+        _reap(deletion)
+    finally:
+        cache.delete(lock_key)
+
+
+def _reap(deletion):
+    if deletion.kind == Deletion.USER:
+        user_id = deletion.target_id
+        for alias in shards():
+            _delete_in_chunks(deletion, 'comments', Comment.objects.using(
+                alias
+            ).filter(author_id=user_id))
+        _delete_in_chunks(deletion, 'follows', Follow.objects.filter(
+            Q(user_id=user_id) | Q(author_id=user_id)
+        ))
+        for alias in shards():
+            _delete_in_chunks(deletion, 'posts', Post.objects.using(
+                alias
+            ).filter(author_id=user_id))
+        target = User.objects.filter(pk=user_id)
+    else:
+        for alias in shards():
+            _ungroup_in_chunks(deletion, Post.objects.using(alias).filter(
+                group_id=deletion.target_id
+            ))
+        target = Group.objects.filter(pk=deletion.target_id)
+    with transaction.atomic():
+        target.delete()
+        deletion.stage = 'done'
+        deletion.finished = timezone.now()
+        deletion.save(update_fields=['stage', 'finished'])
+    invalidate_namespace(NAMESPACE, FEED_NAMESPACE)
@@ -0,0 +1,70 @@
+"""Каталог групп со статистикой постов.
+
+Страница каталога — это GROUPS_PER_PAGE групп по возрастанию pk после
+курсора ?after=<pk>: OFFSET по сотням тысяч групп не нужен. Статистика
+страницы считается одним агрегирующим запросом по индексу
+posts_post(group_id) на каждом шарде; посты автора лежат на одном
+шарде, поэтому число авторов можно суммировать. Посты удаляемых
+авторов не считаются, как и в лентах (deletion.visible). Страница
+кэшируется до изменения групп, удалений или состава постов в группах
+(DIRECTORY_NAMESPACE): правка текста поста кэш не сбрасывает.
+"""
+from django.db.models import Count, Max
+
+from core.cache import namespaced_key
+from core.stampede import cached
+from .deletion import NAMESPACE as DELETIONS_NAMESPACE, hidden_ids, visible
+from .models import Deletion, Group, Post
+from .sharding import shards
+from .signals import DIRECTORY_NAMESPACE, GROUPS_NAMESPACE
+
+GROUPS_PER_PAGE: int = 50
+DIRECTORY_TIMEOUT: int = 300
+
+
+def directory_page(after=0, limit=GROUPS_PER_PAGE):
+    """(группы со статистикой, курсор следующей страницы или None)."""
+    key = namespaced_key(
+        f'groups:directory:{after}:{limit}',
+        GROUPS_NAMESPACE, DIRECTORY_NAMESPACE, DELETIONS_NAMESPACE,
+    )
+    return cached(
+        key, lambda: _directory_page(after, limit), DIRECTORY_TIMEOUT,
+        name='group_directory',
+    )
+
+
+def _directory_page(after, limit):
+    groups = list(
+        Group.objects.exclude(pk__in=hidden_ids(Deletion.GROUP))
+        .filter(pk__gt=after).order_by('pk')[:limit + 1]
+    )
+    next_after = groups[limit - 1].pk if len(groups) > limit else None
+    groups = groups[:limit]
+    stats = group_stats([group.pk for group in groups])
+    for group in groups:
+        group.post_count, group.latest_post, group.author_count = stats.get(
+            group.pk, (0, None, 0)
+        )
+    return groups, next_after
+
+
+def group_stats(group_ids):
+    """{group_id: (постов, дата последнего, авторов)} по всем шардам."""
+    stats = {}
+    for alias in shards():
+        rows = visible(Post.objects.using(alias).filter(
+            group_id__in=group_ids
+        )).order_by().values('group_id').annotate(
+            posts=Count('pk'),
+            latest=Max('pub_date'),
+            authors=Count('author_id', distinct=True),
+        )
+        for row in rows:
+            posts, latest, authors = stats.get(row['group_id'], (0, None, 0))
+            if latest is None or row['latest'] > latest:
+                latest = row['latest']
+            stats[row['group_id']] = (
+                posts + row['posts'], latest, authors + row['authors']
+            )
+    return stats
@@ -0,0 +1,76 @@
+"""Число новых постов в ленте подписок для вкладки «Избранные авторы».
+
+FollowFeedMarker хранит, когда пользователь последний раз открывал
+первую страницу follow_index. Посты подписок новее отметки считаются
+одним запросом на шард по индексу (author, -pub_date), не дальше
+UNREAD_LIMIT строк, и число кэшируется в пространствах имён ленты,
+подписок пользователя и его отметки: новый пост, подписка или отписка
+и просмотр ленты сбрасывают кэш, а перезагрузка вкладки и опрос
+follow_unread читают кэш, не выполняя запрос ленты.
+"""
+from django.utils import timezone
+
+from core.cache import invalidate_namespace, namespaced_key
+from core.stampede import cached
+from .deletion import NAMESPACE as DELETIONS_NAMESPACE, visible
+from .models import Follow, FollowFeedMarker, Post
+from .sharding import materialize, shards
+from .signals import FEED_NAMESPACE
+
+UNREAD_TIMEOUT: int = 5 * 60
+# Дальше не считаем: на вкладке будет «99+».
+UNREAD_LIMIT: int = 100
+# Как часто вкладка спрашивает число, секунд.
+POLL_INTERVAL: int = 60
+
+
+def namespace(user_id):
+    return f'follow_feed:{user_id}'
+
+
+def seen(user_id):
+    """Отметка пользователя; первая ставится при первом подсчёте."""
+    marker, _ = FollowFeedMarker.objects.get_or_create(
+        user_id=user_id, defaults={'seen': timezone.now()}
+    )
+    return marker.seen
+
+
+def count_unread(user_id):
+    authors = materialize(
+        Follow.objects.filter(user_id=user_id).values('author_id')
+    )
+    posts = visible(Post.objects.filter(
+        author_id__in=authors, pub_date__gt=seen(user_id)
+    ))
+    return min(UNREAD_LIMIT, sum(
+        posts.using(alias)[:UNREAD_LIMIT].count() for alias in shards()
+    ))
+
+
+def unread_count(user_id):
+    key = namespaced_key(
+        f'follow_unread:{user_id}', FEED_NAMESPACE, DELETIONS_NAMESPACE,
+        f'author:{user_id}', namespace(user_id),
+    )
+    return cached(key, lambda: count_unread(user_id), UNREAD_TIMEOUT,
+                  name='follow_unread')
+
+
+def label(count):
+    """Текст значка: '' без новых постов."""
+    if not count:
+        return ''
+    return f'{UNREAD_LIMIT - 1}+' if count >= UNREAD_LIMIT else str(count)
+
+
+def mark_seen(user_id):
+    """Отмечает ленту просмотренной, если в ней было новое."""
+    if not unread_count(user_id):
+        return
+    now = timezone.now()
+    if not FollowFeedMarker.objects.filter(user_id=user_id).update(seen=now):
+        FollowFeedMarker.objects.get_or_create(
+            user_id=user_id, defaults={'seen': now}
+        )
+    invalidate_namespace(namespace(user_id))
@@ -1,4 +1,5 @@
 from django import forms
+from . import images
 from .models import Post, Comment
 
 
@@ -14,6 +15,16 @@ class PostForm(forms.ModelForm):
             raise forms.ValidationError('Заполните поле')
         return text
 
+    def save(self, commit=True):
+        if 'image' in self.changed_data:
+            images.fill(self.instance, self.cleaned_data['image'])
+        if not commit or self.instance._state.adding:
+            return super().save(commit)
+        post = super().save(commit=False)
+        post.save(update_fields=post.edit_fields())
+        self.save_m2m()
+        return post
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,85 @@
+"""Следующие карточки ленты для бесконечной прокрутки.
+
+Страница ленты отдаёт в шаблон курсор последнего поста (next_cursor).
+Скрипт из posts/includes/more.html по нему запрашивает у фрагментного
+эндпоинта только следующие карточки и новый курсор — без base.html,
+шапки и паджинатора. Курсор — (pub_date, pk) последнего поста, поэтому
+выборка идёт по индексу без OFFSET, а ответ кэшируется по курсору
+в пространствах имён ленты.
+"""
+import re
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q, prefetch_related_objects
+from django.template.loader import render_to_string
+
+from core.cache import namespaced_key
+from core.stampede import cached
+from .images import prefetch_thumbnails
+from .sharding import feed
+
+CURSOR_RE = re.compile(r'^(\d{1,20})_(\d{1,20})$')
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+FRAGMENT_TIMEOUT: int = 60
+
+
+def encode(post):
+    delta = post.pub_date - EPOCH
+    microseconds = (
+        delta.days * 86400 + delta.seconds
+    ) * 1000000 + delta.microseconds
+    return f'{microseconds}_{post.pk}'
+
+
+def decode(cursor):
+    """(pub_date, pk) из курсора или None, если он испорчен."""
+    match = CURSOR_RE.match(cursor or '')
+    if not match:
+        return None
+    microseconds, pk = map(int, match.groups())
+    try:
+        return EPOCH + timedelta(microseconds=microseconds), pk
+    except OverflowError:
+        return None
+
+
+def next_cursor(page_obj):
+    """Курсор после последнего поста страницы или None на последней."""
+    if not page_obj.has_next():
+        return None
+    return encode(page_obj[len(page_obj) - 1])
+
+
+def block(posts, cursor, size):
+    """size постов после cursor и курсор следующего блока."""
+    pub_date, pk = cursor
+    posts = feed(posts.filter(
+        Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+    ).order_by('-pub_date', '-pk'))
+    found = list(posts[:size + 1])
+    page = found[:size]
+    prefetch_related_objects(page, 'author', 'group')
+    return page, encode(page[-1]) if len(found) > size else None
+
+
+def render_block(request, posts, after, size, card, namespaces, *key):
+    """{'html': карточки, 'next': URL следующего блока или None}.
+
+    after — курсор, уже проверенный decode().
+    """
+    def build():
+        page, following = block(posts, decode(after), size)
+        prefetch_thumbnails(page)
+        html = render_to_string(
+            'posts/includes/post_cards.html',
+            {'posts': page, 'card': card},
+        )
+        return {
+            'html': html,
+            'next': following and f'{request.path}?after={following}',
+        }
+
+    cache_key = namespaced_key(
+        ':'.join(map(str, ('feed_fragment', *key, after))), *namespaces
+    )
+    return cached(cache_key, build, FRAGMENT_TIMEOUT, name='feed_fragment')
@@ -0,0 +1,184 @@
+"""Адаптивные варианты картинки поста для srcset.
+
+Задача posts.make_thumbnail после загрузки картинки строит через
+sorl-thumbnail несколько ширин в WebP и JPEG и записывает их имена и
+размеры в Post.image_variants. Шаблон posts/includes/q.html берёт всё
+из этого поля и не обращается ни к файлам, ни к хранилищу sorl; пока
+вариантов нет (или они построены для прежней картинки), выводится
+обычная миниатюра 1080x444.
+
+Размеры исходной картинки, крошечная заглушка (data URI) и средний
+цвет считаются один раз при загрузке (describe()) и хранятся в полях
+Post; для старых постов их заполняет manage.py backfill_image_meta.
+"""
+import base64
+import json
+from io import BytesIO
+
+from PIL import Image, ImageOps
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix, del_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core import thumbnails
+
+# Должны совпадать с {% thumbnail %} в posts/includes/q.html.
+THUMBNAIL_GEOMETRY: str = '1080x444'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+# Ширины вариантов; пропорции те же, что у миниатюры 1080x444.
+WIDTHS = (360, 720, 1080)
+ASPECT = (1080, 444)
+# Порядок важен: браузер берёт первый поддерживаемый <source>.
+FORMATS = ('webp', 'jpeg')
+QUALITY: int = 80
+# Карточка занимает всю ширину контейнера Bootstrap (до 1110px).
+SIZES = '(max-width: 1200px) 100vw, 1110px'
+# Заглушка 16x7: браузер растягивает её, пока грузится картинка.
+PLACEHOLDER_WIDTH: int = 16
+PLACEHOLDER_QUALITY: int = 40
+# Значения полей поста без картинки или с нечитаемым файлом.
+EMPTY_META = {
+    'image_width': None,
+    'image_height': None,
+    'image_placeholder': '',
+    'image_color': '',
+}
+
+
+def geometry(width):
+    return f'{width}x{round(width * ASPECT[1] / ASPECT[0])}'
+
+
+def describe(file):
+    """Поля Post с размерами, заглушкой и цветом картинки из file."""
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            width, height = image.size
+            size = (
+                PLACEHOLDER_WIDTH,
+                round(PLACEHOLDER_WIDTH * ASPECT[1] / ASPECT[0]),
+            )
+            # JPEG декодируется сразу с уменьшением: большие фото
+            # не разворачиваются в память целиком.
+            image.draft('RGB', (size[0] * 4, size[1] * 4))
+            small = ImageOps.fit(image.convert('RGB'), size, Image.BOX)
+    except (OSError, ValueError):
+        return dict(EMPTY_META)
+    finally:
+        file.seek(0)
+    buffer = BytesIO()
+    small.save(buffer, 'JPEG', quality=PLACEHOLDER_QUALITY)
+    red, green, blue = small.resize((1, 1), Image.BOX).getpixel((0, 0))
+    return {
+        'image_width': width,
+        'image_height': height,
+        'image_placeholder': 'data:image/jpeg;base64,' + base64.b64encode(
+            buffer.getvalue()
+        ).decode(),
+        'image_color': f'#{red:02x}{green:02x}{blue:02x}',
+    }
+
+
+def fill(post, file):
+    """Заполняет поля post по новой картинке file (пустой — очищает)."""
+    meta = describe(file) if file else EMPTY_META
+    for name, value in meta.items():
+        setattr(post, name, value)
+
+
+def describe_stored(name):
+    """describe() для файла из хранилища; EMPTY_META, если его нет."""
+    try:
+        file = default.storage.open(name)
+    except OSError:
+        return dict(EMPTY_META)
+    with file:
+        return describe(file)
+
+
+def build(image):
+    """Строит варианты image; возвращает значение для image_variants."""
+    variants = []
+    for image_format in FORMATS:
+        for width in WIDTHS:
+            thumbnail = get_thumbnail(
+                image, geometry(width), crop='center', upscale=True,
+                format=image_format.upper(), quality=QUALITY,
+            )
+            variants.append({
+                'format': image_format,
+                'name': thumbnail.name,
+                'width': thumbnail.width,
+                'height': thumbnail.height,
+            })
+    return json.dumps({'source': image.name, 'variants': variants})
+
+
+def picture(value, image_name):
+    """Данные для <picture> или None, если вариантов для image_name нет."""
+    if not value or not image_name:
+        return None
+    try:
+        data = json.loads(value)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get('source') != image_name:
+        return None
+    if not data.get('variants'):
+        return None
+    by_format = {}
+    for variant in data['variants']:
+        by_format.setdefault(variant['format'], []).append(variant)
+    fallback = by_format.pop('jpeg', None)
+    if not fallback:
+        return None
+    largest = max(fallback, key=lambda variant: variant['width'])
+    return {
+        'sizes': SIZES,
+        'sources': [
+            {'type': f'image/{image_format}', 'srcset': srcset(variants)}
+            for image_format, variants in by_format.items()
+        ],
+        'srcset': srcset(fallback),
+        'src': default.storage.url(largest['name']),
+        'width': largest['width'],
+        'height': largest['height'],
+    }
+
+
+def srcset(variants):
+    return ', '.join(
+        f'{default.storage.url(variant["name"])} {variant["width"]}w'
+        for variant in sorted(variants, key=lambda variant: variant['width'])
+    )
+
+
+def thumbnail_source(name):
+    """Имя картинки, из которой построена миниатюра name, или None.
+
+    Ищет по записям sorl-thumbnail в БД: список миниатюр источника
+    хранит ключ миниатюры, а запись источника — его имя.
+    """
+    key = ImageFile(name, default.storage).key
+    record = KVStoreModel.objects.filter(
+        key__startswith=add_prefix('', 'thumbnails'),
+        value__contains=f'"{key}"',
+    ).values_list('key', flat=True).first()
+    if record is None:
+        return None
+    value = KVStoreModel.objects.filter(
+        key=add_prefix(del_prefix(record))
+    ).values_list('value', flat=True).first()
+    return json.loads(value)['name'] if value else None
+
+
+def prefetch_thumbnails(posts):
+    """Одним запросом поднимает миниатюры карточек без вариантов."""
+    thumbnails.prefetch(
+        thumbnails.thumbnail_key(
+            post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS
+        )
+        for post in posts if post.image and post.picture is None
+    )
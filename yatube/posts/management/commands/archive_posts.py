@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from posts.archive import (
+    BATCH_SIZE, archive_cutoff, archive_older_than, vacuum
+)
+from posts.models import Post
+from posts.sharding import shards
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые посты с комментариями в архивные таблицы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Возраст поста в днях (по умолчанию '
+                 'POSTS_ARCHIVE_AFTER_DAYS).'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--limit', type=int, default=None)
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument(
+            '--vacuum', action='store_true',
+            help='После переноса выполнить VACUUM (блокирует БД).'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['days'])
+        if options['dry_run']:
+            count = sum(
+                Post.objects.using(alias).filter(pub_date__lt=cutoff).count()
+                for alias in shards()
+            )
+            self.stdout.write(f'Будет перенесено постов: {count}')
+            return
+        count = archive_older_than(
+            cutoff, options['batch_size'], options['limit']
+        )
+        self.stdout.write(f'Перенесено постов: {count}')
+        if options['vacuum']:
+            vacuum()
@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import pause
+from posts import images
+from posts.models import Post
+from posts.sharding import shards
+
+FIELDS = tuple(images.EMPTY_META)
+
+
+class Command(BaseCommand):
+    help = ('Заполняет размеры, заглушку и цвет картинок старых постов; '
+            'файлы читаются параллельно в нескольких потоках.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Сколько файлов читать одновременно.'
+        )
+
+    def handle(self, *args, **options):
+        with ThreadPoolExecutor(options['workers']) as pool:
+            for alias in shards():
+                done, failed = self.backfill(
+                    pool, Post.objects.using(alias), options['batch_size']
+                )
+                self.stdout.write(
+                    f'{alias}: заполнено {done}, не прочитано {failed}'
+                )
+
+    def backfill(self, pool, posts, batch_size):
+        posts = posts.exclude(image='').filter(image_width=None).only(
+            'pk', 'image'
+        )
+        after = done = failed = 0
+        while True:
+            batch = list(posts.filter(pk__gt=after).order_by('pk')[
+                :batch_size
+            ])
+            if not batch:
+                return done, failed
+            metas = pool.map(
+                images.describe_stored, [post.image.name for post in batch]
+            )
+            for post, meta in zip(batch, metas):
+                for name, value in meta.items():
+                    setattr(post, name, value)
+            filled = [post for post in batch if post.image_width is not None]
+            # Только поля картинки: текст мог поменяться за это время.
+            Post.objects.using(posts.db).bulk_update(filled, FIELDS)
+            done += len(filled)
+            failed += len(batch) - len(filled)
+            after = batch[-1].pk
+            pause()
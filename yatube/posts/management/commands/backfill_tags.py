@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import tags
+from posts.models import Post
+from posts.sharding import shards
+
+
+class Command(BaseCommand):
+    help = 'Создаёт связи постов с хэштегами и упоминаниями пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--after', type=int, default=0,
+            help='Продолжить с постов, у которых pk больше указанного.'
+        )
+
+    def handle(self, *args, **options):
+        for alias in shards():
+            done = tags.backfill(
+                Post.objects.using(alias), options['batch_size'],
+                options['after']
+            )
+            self.stdout.write(f'{alias}: обработано постов {done}')
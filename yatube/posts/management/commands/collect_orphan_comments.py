@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+
+from posts import orphans
+from posts.sharding import shards
+
+
+def describe(space):
+    if space is None:
+        return 'нет данных'
+    used = (space.page_count - space.freelist) * space.page_size
+    free = space.freelist * space.page_size
+    return f'занято {used // 1024} КБ, свободно {free // 1024} КБ'
+
+
+class Command(BaseCommand):
+    help = 'Удаляет или архивирует комментарии удалённых постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=orphans.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--archive', action='store_true',
+            help='Переносить комментарии в ArchivedComment, а не удалять.'
+        )
+        parser.add_argument(
+            '--vacuum', type=int, default=0, metavar='PAGES',
+            help='После сборки выполнить incremental_vacuum на PAGES '
+                 'страниц (-1 — все свободные).'
+        )
+        parser.add_argument(
+            '--enable-incremental-vacuum', action='store_true',
+            help='Перевести БД в auto_vacuum=INCREMENTAL (полный VACUUM).'
+        )
+
+    def handle(self, *args, **options):
+        if options['enable_incremental_vacuum']:
+            for alias in shards():
+                orphans.enable_incremental_vacuum(alias)
+        pages = options['vacuum']
+        report = orphans.collect_all(
+            options['batch_size'], options['archive'],
+            None if pages < 0 else pages
+        )
+        for alias, (collected, before, after, vacuumed) in report.items():
+            self.stdout.write(f'{alias}: собрано комментариев {collected}')
+            self.stdout.write(f'  до:    {describe(before)}')
+            self.stdout.write(f'  после: {describe(after)}')
+            if pages and collected and not vacuumed:
+                self.stdout.write(
+                    '  incremental_vacuum недоступен: запустите '
+                    'с --enable-incremental-vacuum'
+                )
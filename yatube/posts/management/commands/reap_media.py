@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+
+from posts import reaper
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки постов, на которые больше не ссылается '
+            'ни один пост, вместе с их миниатюрами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено.'
+        )
+        parser.add_argument(
+            '--quarantine', action='store_true',
+            help=f'Переносить файлы в MEDIA_ROOT/{reaper.QUARANTINE_DIR}/, '
+                 'а не удалять.'
+        )
+        parser.add_argument(
+            '--grace-hours', type=float,
+            default=reaper.GRACE_PERIOD / 3600,
+            help='Не трогать файлы моложе стольких часов.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=reaper.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--workdir', default=None,
+            help='Каталог для временной БД со списком файлов.'
+        )
+
+    def handle(self, *args, **options):
+        def on_orphan(name, size):
+            if options['verbosity'] > 1 or options['dry_run']:
+                self.stdout.write(f'  {name} ({size // 1024} КБ)')
+
+        report = reaper.reap(
+            dry_run=options['dry_run'],
+            quarantine=options['quarantine'],
+            grace=int(options['grace_hours'] * 3600),
+            batch_size=options['batch_size'],
+            workdir=options['workdir'],
+            on_orphan=on_orphan,
+        )
+        action = 'будет удалено' if options['dry_run'] else (
+            'перенесено в карантин' if options['quarantine'] else 'удалено'
+        )
+        self.stdout.write(
+            f'Просмотрено файлов: {report.scanned}, из них свежих: '
+            f'{report.recent}'
+        )
+        self.stdout.write(
+            f'Без ссылок {action}: {report.orphans} '
+            f'({report.size // 1024} КБ)'
+        )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from posts.models import Post, User
+from posts.sharding import (
+    BATCH_SIZE, SETTLE_TIME, move_author, shard_for_author, shards
+)
+
+
+class Command(BaseCommand):
+    help = 'Переносит посты авторов между шардами без остановки сайта.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*')
+        parser.add_argument('--to', dest='target')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--settle', type=float, default=SETTLE_TIME)
+
+    def handle(self, *args, **options):
+        if not options['usernames']:
+            self.show_load()
+            return
+        target = options['target']
+        if target not in shards():
+            raise CommandError(f'Укажите --to из POST_SHARDS: {shards()}')
+        for username in options['usernames']:
+            author = User.objects.filter(username=username).first()
+            if author is None:
+                raise CommandError(f'Нет пользователя {username}')
+            source = shard_for_author(author.pk)
+            moved = move_author(
+                author.pk, target, options['batch_size'], options['settle']
+            )
+            self.stdout.write(
+                f'{username}: {source} -> {target}, постов: {moved}'
+            )
+
+    def show_load(self):
+        for alias in shards():
+            posts = Post.objects.using(alias)
+            authors = posts.values('author_id').annotate(n=Count('pk'))
+            self.stdout.write(
+                f'{alias}: постов {posts.count()}, авторов {authors.count()}'
+            )
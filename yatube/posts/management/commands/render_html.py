@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from posts.markup import RENDER_VERSION
+from posts.models import Comment, Post
+
+BATCH_SIZE: int = 500
+
+
+class Command(BaseCommand):
+    help = 'Заполняет сохранённый HTML постов и комментариев пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment):
+            count = self.render_model(model, options['batch_size'])
+            self.stdout.write(f'{model._meta.label}: {count}')
+
+    def render_model(self, model, batch_size):
+        stale = model.objects.exclude(
+            text_html_version=RENDER_VERSION
+        ).order_by('pk').only('pk', 'text')
+        count = 0
+        last_pk = 0
+        while True:
+            batch = list(stale.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return count
+            for obj in batch:
+                obj.render_html()
+            model.objects.bulk_update(
+                batch, ['text_html', 'text_html_version']
+            )
+            count += len(batch)
+            last_pk = batch[-1].pk
@@ -0,0 +1,39 @@
+import re
+
+from django.urls import reverse
+from django.utils.html import linebreaks
+
+# Увеличивайте при любом изменении render_text: сохранённый HTML
+# со старой версией будет перерисован при обращении или командой
+# render_html.
+RENDER_VERSION: int = 2
+
+# Хэштеги и упоминания, см. posts/tags.py. & перед # — это
+# HTML-сущность вроде &#39;, а не тег.
+TAG_RE = re.compile(r'(?<![\w&])([#@])(\w{1,150})')
+
+
+def normalize(kind, name):
+    # Имена пользователей в Django чувствительны к регистру.
+    return name.casefold() if kind == '#' else name
+
+
+def tag_url(kind, name):
+    if kind == '#':
+        return reverse('posts:tag_posts', args=[normalize(kind, name)])
+    return reverse('posts:mentions', args=[name])
+
+
+def link_tags(html):
+    """Заменяет теги в готовом HTML ссылками на их ленты."""
+    return TAG_RE.sub(
+        lambda match: '<a href="{}">{}</a>'.format(
+            tag_url(*match.groups()), match.group(0)
+        ),
+        html,
+    )
+
+
+def render_text(text):
+    """Готовый HTML текста поста или комментария."""
+    return link_tags(linebreaks(text, autoescape=True))
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0015_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('comment', 'Комментарий'), ('follow', 'Подписка')], max_length=10, verbose_name='Событие')),
+                ('post_id', models.IntegerField(blank=True, null=True)),
+                ('text', models.CharField(blank=True, max_length=200)),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('read', models.BooleanField(default=False)),
+                ('emailed', models.BooleanField(default=False)),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='От кого')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL, verbose_name='Кому')),
+            ],
+            options={
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'read'], name='posts_notif_recipie_2c7bd9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['emailed', 'recipient'], name='posts_notif_emailed_a4170e_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0016_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowFeedMarker',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='follow_feed_marker', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('seen', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date'], name='posts_post_author_pub_idx'),
+        ),
+    ]
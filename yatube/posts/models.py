@@ -1,10 +1,29 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils.safestring import mark_safe
+
+from . import images
+from .markup import RENDER_VERSION, render_text
 
 User = get_user_model()
 SHORT_WORD = 15
 
 
+def group_namespace(group_id):
+    """Пространство имён кэша страниц группы, см. posts/signals.py."""
+    return f'group:{group_id}'
+
+
+class ShardedQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        # Без using() шард выбирает роутер по самому объекту.
+        obj = self.model(**kwargs)
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
 class Group(models.Model):
     title = models.CharField(
         max_length=200,
@@ -21,10 +40,72 @@ class Group(models.Model):
     def __str__(self):
         return self.title
 
+    @property
+    def cache_namespace(self):
+        return group_namespace(self.pk)
+
+
+class RenderedText(models.Model):
+    text_html = models.TextField(
+        blank=True,
+        editable=False,
+    )
+    text_html_version = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+    )
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        obj = super().from_db(db, field_names, values)
+        # Текст, из которого получен сохранённый HTML, если он актуален.
+        if obj.__dict__.get('text_html_version') == RENDER_VERSION:
+            obj._rendered_text = obj.__dict__.get('text')
+        return obj
+
+    def render_html(self):
+        self.text_html = render_text(self.text)
+        self.text_html_version = RENDER_VERSION
+        self._rendered_text = self.text
+
+    def save(self, *args, **kwargs):
+        # HTML перерисовывается при любом сохранении изменённого текста,
+        # а не только из форм: админка, shell, команды.
+        update_fields = kwargs.get('update_fields')
+        saves_text = 'text' not in self.get_deferred_fields() and (
+            update_fields is None or 'text' in update_fields
+        )
+        if saves_text and self.text != getattr(self, '_rendered_text', None):
+            self.render_html()
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'text_html', 'text_html_version'
+                }
+        super().save(*args, **kwargs)
+
+    @property
+    def html(self):
+        """HTML текста; устаревшая версия перерисовывается лениво."""
+        if self.text_html_version != RENDER_VERSION:
+            self.render_html()
+            if self.pk is not None:
+                type(self).objects.using(self._state.db).filter(
+                    pk=self.pk
+                ).update(
+                    text_html=self.text_html,
+                    text_html_version=self.text_html_version,
+                )
+        return mark_safe(self.text_html)
+
+
+class Post(RenderedText):
+    objects = ShardedQuerySet.as_manager()
 
-class Post(models.Model):
     text = models.TextField()
-    pub_date = models.DateTimeField(auto_now_add=True)
+    pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -44,15 +125,76 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    # Заполняются при загрузке, см. posts/images.py. Не width_field и
+    # height_field: те открывают файл при чтении из БД каждого поста
+    # с незаполненными размерами, то есть всех старых постов.
+    image_width = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    image_placeholder = models.TextField(
+        blank=True,
+        editable=False,
+    )
+    image_color = models.CharField(
+        max_length=7,
+        blank=True,
+        editable=False,
+    )
+    # JSON с вариантами для srcset, заполняет posts.make_thumbnail.
+    image_variants = models.TextField(
+        blank=True,
+        editable=False,
+    )
+    # Пишется пачками из posts/counters.py.
+    views = models.PositiveIntegerField(
+        'Просмотры',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            # Лента подписок и счётчик новых постов в ней.
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='posts_post_author_pub_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:SHORT_WORD]
 
+    def edit_fields(self):
+        """update_fields для сохранения правки поста: все поля, кроме views.
+
+        views пишет только posts/counters.py; полное сохранение
+        в post_edit и админке затёрло бы просмотры, записанные после
+        загрузки объекта.
+        """
+        deferred = self.get_deferred_fields()
+        return [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and field.name != 'views'
+            and field.attname not in deferred
+        ]
+
+    @property
+    def picture(self):
+        """Адаптивная картинка для шаблона, см. posts/images.py."""
+        return images.picture(self.image_variants, self.image.name)
+
+
+class Comment(RenderedText):
+    objects = ShardedQuerySet.as_manager()
 
-class Comment(models.Model):
     post = models.ForeignKey(
         Post,
         on_delete=models.SET_NULL,
@@ -79,6 +221,63 @@ class Comment(models.Model):
     )
 
 
+class Tag(models.Model):
+    """Хэштег (#тема) или упоминание (@username) из текста постов."""
+    HASHTAG = '#'
+    MENTION = '@'
+    KIND_CHOICES = (
+        (HASHTAG, 'Хэштег'),
+        (MENTION, 'Упоминание'),
+    )
+
+    kind = models.CharField(
+        max_length=1,
+        choices=KIND_CHOICES,
+        verbose_name='Вид'
+    )
+    name = models.CharField(max_length=150, verbose_name='Имя')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('kind', 'name'),
+                name='unique_tag'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}{self.name}'
+
+
+class PostTag(models.Model):
+    """Связь поста с тегом; pub_date продублирован для индекса ленты тега."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='tag_links'
+    )
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='post_links'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('post', 'tag'),
+                name='unique_post_tag'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('tag', '-pub_date'),
+                name='posts_posttag_feed_idx'
+            ),
+        ]
+
+
 class Follow(models.Model):
     user = models.ForeignKey(
         User,
@@ -101,4 +300,210 @@ class Follow(models.Model):
         ]
 
     def __str__(self):
-        return self.user
+        return f'{self.user} -> {self.author}'
+
+
+class ArchivedPost(RenderedText):
+    """Старый пост, перенесённый из posts_post (см. posts/archive.py).
+
+    id совпадает с id исходного поста, чтобы старые ссылки работали.
+    """
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField()
+    pub_date = models.DateTimeField(db_index=True)
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts'
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts'
+    )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        blank=True
+    )
+    views = models.PositiveIntegerField('Просмотры', default=0)
+    archived = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-pub_date']
+
+    def __str__(self):
+        return self.text[:SHORT_WORD]
+
+
+class ArchivedComment(RenderedText):
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='comments'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments'
+    )
+    text = models.TextField()
+    created = models.DateTimeField()
+
+    class Meta:
+        ordering = ['created']
+
+    def __str__(self):
+        return self.text[:200]
+
+
+class Deletion(models.Model):
+    """Отложенное удаление пользователя или группы.
+
+    Пока удаление не завершено, объект скрыт на сайте, а зависимые
+    строки удаляются фоновой задачей пачками (см. posts/deletion.py).
+    """
+    USER = 'user'
+    GROUP = 'group'
+    KIND_CHOICES = (
+        (USER, 'Пользователь'),
+        (GROUP, 'Группа'),
+    )
+
+    kind = models.CharField(
+        max_length=10,
+        choices=KIND_CHOICES,
+        verbose_name='Что удаляем'
+    )
+    target_id = models.PositiveIntegerField(verbose_name='ID')
+    stage = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='Текущий шаг'
+    )
+    processed = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Обработано строк'
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('kind', 'target_id'),
+                name='unique_deletion'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} #{self.target_id}'
+
+
+class AuthorShard(models.Model):
+    """На какой БД из POST_SHARDS лежат посты автора (posts/sharding.py)."""
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='shard'
+    )
+    alias = models.CharField(max_length=50, verbose_name='Алиас БД')
+
+    def __str__(self):
+        return f'{self.author_id} -> {self.alias}'
+
+
+class IdSequence(models.Model):
+    """Общий для всех шардов счётчик id постов и комментариев."""
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
+
+
+class UploadSession(models.Model):
+    """Картинка, загружаемая по частям (posts/uploads.py)."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4,
+                          editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions'
+    )
+    filename = models.CharField(max_length=255, verbose_name='Имя файла')
+    size = models.BigIntegerField(verbose_name='Размер')
+    checksum = models.CharField(max_length=64, verbose_name='SHA-256')
+    received = models.BigIntegerField(default=0, verbose_name='Получено')
+    completed = models.BooleanField(default=False)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f'{self.filename}: {self.received}/{self.size}'
+
+
+class Notification(models.Model):
+    """Событие для пользователя: комментарий к его посту или подписка.
+
+    Пост хранится номером, а не внешним ключом: посты лежат на шардах.
+    """
+    COMMENT = 'comment'
+    FOLLOW = 'follow'
+    KIND_CHOICES = (
+        (COMMENT, 'Комментарий'),
+        (FOLLOW, 'Подписка'),
+    )
+
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Кому'
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='От кого'
+    )
+    kind = models.CharField(
+        max_length=10,
+        choices=KIND_CHOICES,
+        verbose_name='Событие'
+    )
+    post_id = models.IntegerField(null=True, blank=True)
+    text = models.CharField(max_length=200, blank=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    read = models.BooleanField(default=False)
+    emailed = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            models.Index(fields=['recipient', 'read']),
+            models.Index(fields=['emailed', 'recipient']),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}: {self.actor_id} -> {self.recipient_id}'
+
+
+class FollowFeedMarker(models.Model):
+    """Когда пользователь последний раз смотрел ленту подписок."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='follow_feed_marker'
+    )
+    seen = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.user_id}: {self.seen}'
@@ -0,0 +1,126 @@
+"""Уведомления о комментариях и новых подписчиках.
+
+add_comment и profile_follow пишут строку Notification (notify()).
+Число непрочитанных для шапки кэшируется в пространстве имён
+notifications:<id пользователя>; новое уведомление и прочтение его
+сбрасывают.
+
+Письмо на каждое событие не отправляется. Задача
+posts.send_notification_digests собирает неотправленные уведомления,
+группирует их по получателю в одно письмо-сводку и отправляет письма
+пачками по DIGEST_BATCH_SIZE через одно соединение EMAIL_BACKEND.
+Уведомления помечаются отправленными только после отправки пачки,
+поэтому при ошибке почты пачка уйдёт при следующем запуске.
+"""
+from itertools import groupby
+from operator import attrgetter
+
+from django.core.mail import EmailMessage, get_connection
+
+from core.cache import invalidate_namespace, namespaced_key
+from core.jobs import in_chunks
+from core.stampede import cached
+from .models import Notification
+
+NOTIFICATIONS_PER_PAGE: int = 20
+UNREAD_TIMEOUT: int = 5 * 60
+# Писем на одно соединение с почтовым сервером.
+DIGEST_BATCH_SIZE: int = 100
+# Строк в письме; об остальных сообщается числом.
+DIGEST_MAX_ITEMS: int = 20
+TEXT_LENGTH: int = 200
+
+
+def namespace(user_id):
+    return f'notifications:{user_id}'
+
+
+def notify(recipient_id, actor_id, kind, post_id=None, text=''):
+    """Создаёт уведомление; о своих действиях не уведомляем."""
+    if recipient_id == actor_id:
+        return None
+    notification = Notification.objects.create(
+        recipient_id=recipient_id, actor_id=actor_id, kind=kind,
+        post_id=post_id, text=text[:TEXT_LENGTH],
+    )
+    invalidate_namespace(namespace(recipient_id))
+    return notification
+
+
+def unread_count(user_id):
+    key = namespaced_key(f'notifications_unread:{user_id}',
+                         namespace(user_id))
+    return cached(
+        key,
+        lambda: Notification.objects.filter(
+            recipient_id=user_id, read=False
+        ).count(),
+        UNREAD_TIMEOUT,
+        name='notifications_unread',
+    )
+
+
+def mark_read(user_id, ids=None):
+    """Отмечает прочитанными уведомления ids (или все) пользователя."""
+    unread = Notification.objects.filter(recipient_id=user_id, read=False)
+    if ids is not None:
+        unread = unread.filter(pk__in=ids)
+    if unread.update(read=True):
+        invalidate_namespace(namespace(user_id))
+
+
+def describe(notification):
+    actor = notification.actor.username
+    if notification.kind == Notification.FOLLOW:
+        return f'{actor} подписан(а) на вас'
+    return (f'{actor} прокомментировал(а) пост №{notification.post_id}: '
+            f'«{notification.text}»')
+
+
+def digest(recipient, items):
+    """Письмо-сводка для recipient по уведомлениям items."""
+    lines = [f'— {describe(item)}' for item in items[:DIGEST_MAX_ITEMS]]
+    if len(items) > DIGEST_MAX_ITEMS:
+        lines.append(f'…и ещё {len(items) - DIGEST_MAX_ITEMS}')
+    body = '\n'.join([
+        f'Здравствуйте, {recipient.username}!',
+        '',
+        'Новое на Yatube:',
+        *lines,
+    ])
+    return EmailMessage(
+        f'Yatube: новые уведомления ({len(items)})', body,
+        to=[recipient.email],
+    )
+
+
+def send_digests(batch_size=DIGEST_BATCH_SIZE):
+    """Отправляет сводки по неотправленным уведомлениям.
+
+    Возвращает число отправленных писем.
+    """
+    recipients = list(Notification.objects.filter(
+        emailed=False
+    ).order_by('recipient_id').values_list(
+        'recipient_id', flat=True
+    ).distinct())
+    sent = 0
+    for chunk in in_chunks(recipients, batch_size):
+        pending = Notification.objects.filter(
+            emailed=False, recipient_id__in=chunk
+        ).select_related('recipient', 'actor').order_by(
+            'recipient_id', 'created', 'pk'
+        )
+        messages, ids = [], []
+        for _, items in groupby(pending, key=attrgetter('recipient_id')):
+            items = list(items)
+            ids.extend(item.pk for item in items)
+            # Прочитанное на сайте в письмо не попадает.
+            unread = [item for item in items if not item.read]
+            if unread and unread[0].recipient.email:
+                messages.append(digest(unread[0].recipient, unread))
+        if messages:
+            with get_connection() as connection:
+                sent += connection.send_messages(messages) or 0
+        Notification.objects.filter(pk__in=ids).update(emailed=True)
+    return sent
@@ -0,0 +1,104 @@
+"""Сборка комментариев, оставшихся без поста.
+
+Comment.post — SET_NULL, поэтому после удаления поста его комментарии
+остаются в таблице с post IS NULL. collect() удаляет их (или переносит
+в ArchivedComment) пачками по batch_size на каждом шарде и возвращает
+статистику страниц SQLite до и после, чтобы было видно, сколько места
+освобождено. Удалённые строки попадают в freelist; вернуть эти
+страницы файловой системе можно incremental_vacuum(), если БД
+переведена в auto_vacuum=INCREMENTAL (enable_incremental_vacuum()).
+"""
+from collections import namedtuple
+
+from django.db import connections, transaction
+
+from core.jobs import pause
+from .archive import COMMENT_FIELDS
+from .models import ArchivedComment, Comment
+from .sharding import shards
+
+BATCH_SIZE: int = 500
+INCREMENTAL: int = 2
+
+Space = namedtuple('Space', 'page_size page_count freelist')
+
+
+def space(alias):
+    """Страницы файла SQLite: размер, всего и свободных; иначе None."""
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        values = []
+        for pragma in ('page_size', 'page_count', 'freelist_count'):
+            cursor.execute(f'PRAGMA {pragma}')
+            values.append(cursor.fetchone()[0])
+    return Space(*values)
+
+
+def collect(alias, batch_size=BATCH_SIZE, archive=False, limit=None):
+    """Удаляет комментарии без поста на шарде alias; возвращает их число."""
+    orphans = Comment.objects.using(alias).filter(post__isnull=True)
+    collected = 0
+    while limit is None or collected < limit:
+        size = batch_size if limit is None else min(
+            batch_size, limit - collected
+        )
+        pks = list(orphans.order_by('pk').values_list('pk', flat=True)[:size])
+        if not pks:
+            break
+        batch = orphans.filter(pk__in=pks)
+        with transaction.atomic(using=alias), transaction.atomic():
+            if archive:
+                ArchivedComment.objects.bulk_create(
+                    ArchivedComment(**row)
+                    for row in batch.values(*COMMENT_FIELDS)
+                )
+            batch.delete()
+        collected += len(pks)
+        pause()
+    return collected
+
+
+def incremental_vacuum(alias, pages=None):
+    """Отдаёт файловой системе до pages свободных страниц.
+
+    Возвращает False, если БД не в режиме auto_vacuum=INCREMENTAL.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA auto_vacuum')
+        if cursor.fetchone()[0] != INCREMENTAL:
+            return False
+        cursor.execute(
+            'PRAGMA incremental_vacuum' if pages is None
+            else f'PRAGMA incremental_vacuum({int(pages)})'
+        )
+        cursor.fetchall()
+    return True
+
+
+def enable_incremental_vacuum(alias):
+    """Переводит БД в auto_vacuum=INCREMENTAL; это полный VACUUM."""
+    with connections[alias].cursor() as cursor:
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('VACUUM')
+
+
+def collect_all(batch_size=BATCH_SIZE, archive=False, vacuum_pages=0):
+    """collect() по всем шардам.
+
+    vacuum_pages: 0 — без incremental_vacuum, None — все свободные
+    страницы. Возвращает {алиас: (собрано, место до, после, vacuum)}.
+    """
+    report = {}
+    for alias in shards():
+        before = space(alias)
+        collected = collect(alias, batch_size, archive)
+        vacuumed = vacuum_pages != 0 and collected and incremental_vacuum(
+            alias, vacuum_pages
+        )
+        report[alias] = (collected, before, space(alias), bool(vacuumed))
+    return report
@@ -0,0 +1,188 @@
+"""Удаление файлов картинок, на которые не ссылается ни один пост.
+
+После замены картинки в post_edit или удаления поста файл в
+MEDIA_ROOT/posts/ и его миниатюры остаются на диске. reap():
+
+1. обходит MEDIA_ROOT/posts/ через os.scandir, не собирая список
+   в памяти, и складывает файлы старше grace секунд во временный
+   файл SQLite;
+2. туда же складывает имена картинок всех постов на всех шардах
+   и архивных постов;
+3. идёт по разнице пачками, перед удалением ещё раз проверяя пачку
+   по БД, и удаляет файлы (или переносит в MEDIA_ROOT/quarantine/)
+   вместе с миниатюрами и записями sorl-thumbnail.
+
+Файлы сканируются до чтения ссылок: картинка, загруженная во время
+прогона, моложе grace и не рассматривается, а ссылка на файл, который
+уже лежал на диске, появляется только вместе с постом — её поймает
+повторная проверка пачки.
+"""
+import os
+import sqlite3
+import tempfile
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from core.jobs import pause
+from .models import ArchivedPost, Post
+from .sharding import shards
+
+IMAGE_DIR: str = 'posts'
+QUARANTINE_DIR: str = 'quarantine'
+# Файлы моложе суток не трогаем: пост с ними мог ещё не сохраниться.
+GRACE_PERIOD: int = 24 * 60 * 60
+BATCH_SIZE: int = 500
+
+Report = namedtuple('Report', 'scanned recent orphans size')
+
+
+def scan(root, directory):
+    """Файлы каталога directory внутри root: (имя от root, stat)."""
+    stack = [os.path.join(root, directory)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    name = os.path.relpath(entry.path, root)
+                    yield (name.replace(os.sep, '/'),
+                           entry.stat(follow_symlinks=False))
+
+
+class NameSet:
+    """Файлы на диске и ссылки на них во временной БД SQLite."""
+
+    def __init__(self, directory=None):
+        descriptor, self.path = tempfile.mkstemp(
+            prefix='reap-', suffix='.sqlite3', dir=directory
+        )
+        os.close(descriptor)
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=OFF')
+        self.conn.execute('PRAGMA synchronous=OFF')
+        self.conn.execute(
+            'CREATE TABLE files (name TEXT PRIMARY KEY, size INTEGER)'
+        )
+        self.conn.execute('CREATE TABLE refs (name TEXT PRIMARY KEY)')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.conn.close()
+        os.remove(self.path)
+
+    def _insert(self, sql, rows, batch_size):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                self._insert_batch(sql, batch)
+                batch = []
+        if batch:
+            self._insert_batch(sql, batch)
+
+    def _insert_batch(self, sql, batch):
+        self.conn.execute('BEGIN')
+        self.conn.executemany(sql, batch)
+        self.conn.execute('COMMIT')
+
+    def add_files(self, rows, batch_size=BATCH_SIZE):
+        self._insert('INSERT OR IGNORE INTO files VALUES (?, ?)',
+                     rows, batch_size)
+
+    def add_refs(self, names, batch_size=BATCH_SIZE):
+        self._insert('INSERT OR IGNORE INTO refs VALUES (?)',
+                     ((name,) for name in names), batch_size)
+
+    def orphans(self, batch_size=BATCH_SIZE):
+        """Пачки [(имя, размер)] файлов без ссылок, по порядку имён."""
+        after = ''
+        while True:
+            batch = self.conn.execute(
+                'SELECT name, size FROM files WHERE name > ? AND name '
+                'NOT IN (SELECT name FROM refs) ORDER BY name LIMIT ?',
+                (after, batch_size)
+            ).fetchall()
+            if not batch:
+                return
+            yield batch
+            after = batch[-1][0]
+
+
+def referenced(names=None):
+    """Имена картинок постов со всех шардов и архива.
+
+    С names — только те из них, на которые есть ссылки.
+    """
+    querysets = [
+        Post.objects.using(alias) for alias in shards()
+    ] + [ArchivedPost.objects.all()]
+    for queryset in querysets:
+        queryset = queryset.exclude(image='')
+        if names is not None:
+            queryset = queryset.filter(image__in=names)
+        yield from queryset.values_list('image', flat=True).iterator(
+            chunk_size=BATCH_SIZE
+        )
+
+
+def remove(name, quarantine=False):
+    """Удаляет файл name с миниатюрами или переносит его в карантин."""
+    # Заодно удаляет файлы миниатюр и вариантов для srcset.
+    default.kvstore.delete(ImageFile(name, default.storage))
+    path = os.path.join(settings.MEDIA_ROOT, *name.split('/'))
+    try:
+        if quarantine:
+            target = os.path.join(
+                settings.MEDIA_ROOT, QUARANTINE_DIR, *name.split('/')
+            )
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(path, target)
+        else:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def reap(dry_run=False, quarantine=False, grace=GRACE_PERIOD,
+         batch_size=BATCH_SIZE, workdir=None, on_orphan=None):
+    """Находит и удаляет файлы без ссылок; возвращает Report."""
+    cutoff = time.time() - grace
+    counts = {'scanned': 0, 'recent': 0}
+
+    def old_files():
+        for name, stat in scan(settings.MEDIA_ROOT, IMAGE_DIR):
+            counts['scanned'] += 1
+            if stat.st_mtime > cutoff:
+                counts['recent'] += 1
+            else:
+                yield name, stat.st_size
+
+    orphans = size = 0
+    with NameSet(workdir) as names:
+        names.add_files(old_files(), batch_size)
+        names.add_refs(referenced(), batch_size)
+        for batch in names.orphans(batch_size):
+            # Ссылка могла появиться после чтения ссылок.
+            used = set(referenced([name for name, _ in batch]))
+            batch = [item for item in batch if item[0] not in used]
+            for name, file_size in batch:
+                if on_orphan is not None:
+                    on_orphan(name, file_size)
+                if not dry_run:
+                    remove(name, quarantine)
+            orphans += len(batch)
+            size += sum(file_size for _, file_size in batch)
+            if not dry_run:
+                pause()
+    return Report(counts['scanned'], counts['recent'], orphans, size)
@@ -0,0 +1,382 @@
+"""Распределение постов и комментариев по нескольким БД по автору.
+
+Все посты автора и комментарии к ним лежат на одной БД из
+settings.POST_SHARDS. Привязка хранится в AuthorShard (в default);
+авторы без записи — это авторы, писавшие до шардирования, их посты
+остаются в default. Новому автору шард назначается при первом посте.
+Пока в POST_SHARDS один алиас, роутер ничего не меняет.
+
+Ленты по всем авторам (index, group_posts, follow_index) собираются
+MergedFeed: каждый шард отдаёт свою упорядоченную выборку, и они
+сливаются heapq.merge. id постов и комментариев выдаются общим
+счётчиком IdSequence, чтобы ссылки /posts/<id>/ оставались уникальными.
+
+На шардах нет таблиц пользователей и групп, поэтому шарды работают
+на core.backends.sqlite_shard без проверки внешних ключей, а связанные
+объекты подгружаются из default через prefetch_related, а не JOIN.
+
+Автора между шардами переносит move_author() (manage.py
+rebalance_shards) без остановки сайта: копирование пачками,
+переключение привязки, докопирование изменений и удаление со старого
+шарда.
+"""
+import heapq
+import os
+import threading
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F, Max, prefetch_related_objects
+from django.http import Http404
+
+from core.jobs import pause
+from . import tags
+from .models import AuthorShard, Comment, IdSequence, Post, PostTag
+
+SHARDED_MODELS = (Post, Comment, PostTag)
+SHARD_MAP_TIMEOUT: int = 3600
+ID_BLOCK: int = 100
+BATCH_SIZE: int = 500
+# Сколько ждать после переключения, пока старая привязка истечёт
+# в локальных кэшах процессов (LOCAL_TIMEOUT в CACHES).
+SETTLE_TIME: float = 10.0
+
+_blocks = {}
+_blocks_lock = threading.Lock()
+
+
+def shards():
+    return list(settings.POST_SHARDS)
+
+
+def is_sharded():
+    return len(settings.POST_SHARDS) > 1
+
+
+def _map_key(author_id):
+    return f'shards:author:{author_id}'
+
+
+def shard_for_author(author_id):
+    """Алиас БД с постами автора."""
+    if not is_sharded() or author_id is None:
+        return DEFAULT_DB_ALIAS
+    alias = cache.get(_map_key(author_id))
+    if alias is None:
+        alias = AuthorShard.objects.filter(
+            author_id=author_id
+        ).values_list('alias', flat=True).first() or DEFAULT_DB_ALIAS
+        cache.set(_map_key(author_id), alias, SHARD_MAP_TIMEOUT)
+    return alias
+
+
+def assign_shard(author_id):
+    """Шард для нового поста: при первом посте автор получает привязку."""
+    alias = shard_for_author(author_id)
+    if alias != DEFAULT_DB_ALIAS or AuthorShard.objects.filter(
+            author_id=author_id).exists():
+        return alias
+    if Post.objects.filter(author_id=author_id).exists():
+        # Писал до шардирования: остаётся в default.
+        alias = DEFAULT_DB_ALIAS
+    else:
+        aliases = shards()
+        alias = aliases[author_id % len(aliases)]
+    alias = AuthorShard.objects.get_or_create(
+        author_id=author_id, defaults={'alias': alias}
+    )[0].alias
+    cache.set(_map_key(author_id), alias, SHARD_MAP_TIMEOUT)
+    return alias
+
+
+def next_id(model):
+    """Следующий id из блока, заранее взятого у IdSequence."""
+    label = model._meta.label_lower
+    with _blocks_lock:
+        block = _blocks.get(label)
+        # После fork блок родителя использовать нельзя.
+        if block is None or block[2] != os.getpid() or block[0] >= block[1]:
+            block = _blocks[label] = _reserve(model, label)
+        value = block[0]
+        block[0] += 1
+        return value
+
+
+def _reserve(model, label):
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        IdSequence.objects.get_or_create(
+            name=label, defaults={'value': _max_pk(model)}
+        )
+        IdSequence.objects.filter(name=label).update(
+            value=F('value') + ID_BLOCK
+        )
+        end = IdSequence.objects.values_list(
+            'value', flat=True
+        ).get(name=label)
+    return [end - ID_BLOCK + 1, end + 1, os.getpid()]
+
+
+def _max_pk(model):
+    return max(
+        model._base_manager.using(alias).aggregate(top=Max('pk'))['top'] or 0
+        for alias in shards()
+    )
+
+
+class ShardRouter:
+    """Роутер Django: посты и комментарии — на шард автора."""
+
+    def _db(self, model, hints, adding_shard):
+        if model not in SHARDED_MODELS:
+            return DEFAULT_DB_ALIAS
+        if not is_sharded():
+            return None
+        instance = hints.get('instance')
+        if isinstance(instance, Post):
+            if instance._state.adding and adding_shard:
+                return assign_shard(instance.author_id)
+            return instance._state.db
+        if isinstance(instance, (Comment, PostTag)):
+            if instance._state.adding and adding_shard:
+                post = instance._meta.get_field('post').get_cached_value(
+                    instance, None
+                )
+                if post is not None:
+                    return post._state.db
+                return shard_for_post(instance.post_id)
+            return instance._state.db
+        if model is Post and instance is not None and (
+                instance._meta.model_name == 'user'):
+            return shard_for_author(instance.pk)
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._db(model, hints, adding_shard=False)
+
+    def db_for_write(self, model, **hints):
+        return self._db(model, hints, adding_shard=True)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if isinstance(obj1, SHARDED_MODELS) or isinstance(
+                obj2, SHARDED_MODELS):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS:
+            return None
+        return app_label == 'posts' and model_name in (
+            'post', 'comment', 'posttag'
+        )
+
+
+def shard_for_post(post_id):
+    for alias in shards():
+        if Post.objects.using(alias).filter(pk=post_id).exists():
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+def find(queryset, **lookup):
+    """Первый объект по lookup с любого шарда или None."""
+    if not is_sharded():
+        return queryset.filter(**lookup).first()
+    for alias in shards():
+        obj = queryset.using(alias).filter(**lookup).first()
+        if obj is not None:
+            return obj
+    return None
+
+
+def get_or_404(queryset, **lookup):
+    obj = find(queryset, **lookup)
+    if obj is None:
+        raise Http404(f'{queryset.model._meta.object_name} не найден')
+    return obj
+
+
+def materialize(queryset):
+    """Подзапрос к default нельзя встроить в запрос к шарду."""
+    return list(queryset) if is_sharded() else queryset
+
+
+def feed(queryset):
+    """Лента по всем шардам; без шардирования — тот же queryset."""
+    return MergedFeed(queryset) if is_sharded() else queryset
+
+
+class MergedFeed:
+    """Слияние упорядоченных по -pub_date выборок со всех шардов.
+
+    Поддерживает то, что нужно Paginator: count(), len() и срезы.
+    Для страницы [a:b] каждый шард отдаёт первые b строк.
+    """
+    ordered = True
+    related = ('author', 'group')
+
+    def __init__(self, queryset):
+        self.queryset = queryset.order_by('-pub_date', '-pk')
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = sum(
+                self.queryset.using(alias).count() for alias in shards()
+            )
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self[:self.count()])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        if stop is None:
+            stop = self.count()
+        rows = [
+            list(self.queryset.using(alias)[:stop]) for alias in shards()
+        ]
+        merged = heapq.merge(
+            *rows, key=lambda post: (post.pub_date, post.pk), reverse=True
+        )
+        page = list(islice(merged, start, stop))
+        prefetch_related_objects(page, *self.related)
+        return page
+
+
+def move_author(author_id, target, batch_size=BATCH_SIZE,
+                settle=SETTLE_TIME):
+    """Переносит посты автора и комментарии к ним на шард target.
+
+    Пока идёт копирование, автор пишет в старый шард. После
+    переключения привязки ждём settle секунд, переносим удаления,
+    докопируем строки, изменившиеся за это время, и удаляем их со
+    старого шарда.
+    Возвращает число перенесённых постов.
+    """
+    source = shard_for_author(author_id)
+    if source == target:
+        return 0
+    posts = Post.objects.using(source).filter(author_id=author_id)
+    comments = Comment.objects.using(source).filter(
+        post__author_id=author_id
+    )
+    snapshots = {Post: {}, Comment: {}}
+    _sync(posts, target, snapshots[Post], batch_size)
+    _sync(comments, target, snapshots[Comment], batch_size)
+    AuthorShard.objects.update_or_create(
+        author_id=author_id, defaults={'alias': target}
+    )
+    cache.delete(_map_key(author_id))
+    time.sleep(settle)
+    skip = {
+        model: _sync_deletes(queryset, target, snapshots[model], batch_size)
+        for model, queryset in ((Post, posts), (Comment, comments))
+    }
+    moved = _sync(posts, target, snapshots[Post], batch_size, skip[Post])
+    _sync(comments, target, snapshots[Comment], batch_size, skip[Comment])
+    # Связи с тегами не копируются (их id локальны для шарда),
+    # а строятся заново по текстам постов.
+    tags.backfill(
+        Post.objects.using(target).filter(author_id=author_id), batch_size
+    )
+    _delete(comments, batch_size)
+    _delete(posts, batch_size)
+    return moved
+
+
+def _fingerprint(obj):
+    return tuple(
+        getattr(obj, field.attname) for field in obj._meta.concrete_fields
+    )
+
+
+def _sync_deletes(queryset, target, snapshot, batch_size):
+    """Сверяет скопированные строки с обоими шардами.
+
+    Удалённые на старом шарде удаляет и с target; удалённые на target
+    уже после переключения возвращает, чтобы их не скопировать снова.
+    Обе группы убирает из snapshot.
+    """
+    model = queryset.model
+    copied = sorted(snapshot)
+    deleted_on_target = set()
+    for start in range(0, len(copied), batch_size):
+        chunk = copied[start:start + batch_size]
+        on_source = set(queryset.filter(pk__in=chunk).values_list(
+            'pk', flat=True
+        ))
+        on_target = set(model.objects.using(target).filter(
+            pk__in=chunk
+        ).values_list('pk', flat=True))
+        deleted_on_source = [pk for pk in chunk if pk not in on_source]
+        if deleted_on_source:
+            with transaction.atomic(using=target):
+                model.objects.using(target).filter(
+                    pk__in=deleted_on_source
+                ).delete()
+        deleted_on_target.update(pk for pk in chunk if pk not in on_target)
+        for pk in deleted_on_source + list(deleted_on_target):
+            snapshot.pop(pk, None)
+        pause()
+    return deleted_on_target
+
+
+def _sync(queryset, target, snapshot, batch_size, skip=()):
+    """Копирует новые и изменённые с прошлого прохода строки на target.
+
+    Строки с pk из skip не копируются.
+    """
+    model = queryset.model
+    fields = [
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+    last_pk = 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size]
+        )
+        if not batch:
+            return len(snapshot)
+        last_pk = batch[-1].pk
+        changed = [
+            obj for obj in batch if obj.pk not in skip
+            and snapshot.get(obj.pk) != _fingerprint(obj)
+        ]
+        existing = set(model.objects.using(target).filter(
+            pk__in=[obj.pk for obj in changed]
+        ).values_list('pk', flat=True))
+        fingerprints = {obj.pk: _fingerprint(obj) for obj in changed}
+        with transaction.atomic(using=target):
+            model.objects.using(target).bulk_create(
+                [obj for obj in changed if obj.pk not in existing]
+            )
+            # bulk_create ставит полям auto_now_add текущее время;
+            # bulk_update записывает исходные pub_date и created.
+            for obj in changed:
+                for field, value in zip(model._meta.concrete_fields,
+                                        fingerprints[obj.pk]):
+                    setattr(obj, field.attname, value)
+            model.objects.using(target).bulk_update(changed, fields)
+        snapshot.update(fingerprints)
+        pause()
+
+
+def _delete(queryset, batch_size):
+    while True:
+        chunk = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not chunk:
+            return
+        with transaction.atomic(using=queryset.db):
+            queryset.model.objects.using(queryset.db).filter(
+                pk__in=chunk
+            ).delete()
+        pause()
@@ -0,0 +1,100 @@
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_save
+)
+from django.dispatch import receiver
+
+from core.cache import invalidate_namespace
+from . import sharding, tags
+from .models import Comment, Follow, Group, Post, group_namespace
+
+# Пространство имён общей ленты: меняется при любом изменении постов.
+FEED_NAMESPACE: str = 'posts'
+# Каталог групп: меняется при изменении самих групп.
+GROUPS_NAMESPACE: str = 'groups'
+# Счётчики каталога групп: меняются, только когда пост появляется,
+# удаляется или переходит в другую группу.
+DIRECTORY_NAMESPACE: str = 'groups:directory'
+
+
+def post_namespaces(post):
+    namespaces = [
+        FEED_NAMESPACE,
+        f'post:{post.pk}',
+        f'author:{post.author_id}',
+    ]
+    # Пост мог уйти из группы: сбрасываем и прежнюю, и новую.
+    for group_id in {post.group_id, getattr(post, '_loaded_group_id', None)}:
+        if group_id is not None:
+            namespaces.append(group_namespace(group_id))
+    return namespaces
+
+
+@receiver(post_init, sender=Post)
+def remember_loaded(sender, instance, **kwargs):
+    # Через __dict__, чтобы не подгружать отложенное поле запросом.
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+    instance._loaded_text = instance.__dict__.get('text')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, created=False, **kwargs):
+    namespaces = post_namespaces(instance)
+    if (created or kwargs['signal'] is post_delete
+            or instance.group_id != instance._loaded_group_id):
+        namespaces.append(DIRECTORY_NAMESPACE)
+    invalidate_namespace(*namespaces)
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    invalidate_namespace(GROUPS_NAMESPACE, group_namespace(instance.pk))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment(sender, instance, **kwargs):
+    if instance.post_id is None:
+        return
+    post = Comment._meta.get_field('post').get_cached_value(instance, None)
+    if post is not None:
+        author_id = post.author_id
+    else:
+        author_id = Post.objects.using(instance._state.db).filter(
+            pk=instance.post_id
+        ).values_list('author_id', flat=True).first()
+    # Комментарий меняет и статистику автора поста (posts/stats.py).
+    invalidate_namespace(f'post:{instance.post_id}', f'author:{author_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow(sender, instance, **kwargs):
+    invalidate_namespace(
+        f'author:{instance.author_id}', f'author:{instance.user_id}'
+    )
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Comment)
+def allocate_id(sender, instance, **kwargs):
+    if instance.pk is None and sharding.is_sharded():
+        instance.pk = sharding.next_id(sender)
+
+
+@receiver(post_save, sender=Post)
+def sync_tags(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    loaded = instance._loaded_text
+    if created:
+        previous = set()
+    elif loaded is None:
+        previous = None
+    else:
+        previous = tags.extract(loaded)
+    if tags.extract(instance.text) != previous:
+        tags.sync([instance], instance._state.db)
+    instance._loaded_text = instance.text
@@ -0,0 +1,106 @@
+"""Статистика автора для профиля и страницы поста.
+
+Все показатели считаются одним запросом: подзапросы к подпискам,
+постам и комментариям в аннотациях одной строки пользователя. Если
+посты автора лежат на другом шарде, подписки и посты считаются
+отдельно, по запросу на каждую БД. Результат кэшируется в пространстве
+имён author:<id>, которое сбрасывают сигналы постов, комментариев
+и подписок (posts/signals.py).
+"""
+from collections import namedtuple
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import (
+    Count, DateTimeField, IntegerField, Max, Min, OuterRef, Subquery
+)
+from django.db.models.functions import Coalesce
+
+from core.cache import namespaced_key
+from core.stampede import cached
+from .models import Comment, Follow, Post, User
+from .sharding import shard_for_author
+
+STATS_TIMEOUT: int = 600
+
+AuthorStats = namedtuple(
+    'AuthorStats',
+    'posts comments_received followers following first_post last_post',
+)
+
+
+def author_namespace(author_id):
+    return f'author:{author_id}'
+
+
+def author_stats(author_id):
+    return cached(
+        namespaced_key(f'stats:author:{author_id}',
+                       author_namespace(author_id)),
+        lambda: _author_stats(author_id),
+        STATS_TIMEOUT,
+        name='author_stats',
+    )
+
+
+def _scalar(queryset, field, aggregate, output_field=None):
+    """Подзапрос с одним агрегатом по строкам, связанным с OuterRef."""
+    return Subquery(
+        queryset.order_by().values(field).annotate(
+            value=aggregate
+        ).values('value')[:1],
+        output_field=output_field or IntegerField(),
+    )
+
+
+def _follow_annotations():
+    return {
+        'followers': Coalesce(_scalar(
+            Follow.objects.filter(author=OuterRef('pk')), 'author',
+            Count('pk')
+        ), 0),
+        'following': Coalesce(_scalar(
+            Follow.objects.filter(user=OuterRef('pk')), 'user', Count('pk')
+        ), 0),
+    }
+
+
+def _post_annotations():
+    posts = Post.objects.filter(author=OuterRef('pk'))
+    return {
+        'posts': Coalesce(_scalar(posts, 'author', Count('pk')), 0),
+        'first_post': _scalar(
+            posts, 'author', Min('pub_date'), DateTimeField()
+        ),
+        'last_post': _scalar(
+            posts, 'author', Max('pub_date'), DateTimeField()
+        ),
+        'comments_received': Coalesce(_scalar(
+            Comment.objects.filter(post__author=OuterRef('pk')),
+            'post__author', Count('pk')
+        ), 0),
+    }
+
+
+def _author_stats(author_id):
+    users = User.objects.filter(pk=author_id)
+    alias = shard_for_author(author_id)
+    annotations = _follow_annotations()
+    if alias == DEFAULT_DB_ALIAS:
+        annotations.update(_post_annotations())
+    # Префикс: у User уже есть связи с именами вроде posts.
+    row = users.annotate(**{
+        f'stats_{name}': value for name, value in annotations.items()
+    }).values(*(f'stats_{name}' for name in annotations)).first()
+    if row is None:
+        return AuthorStats(0, 0, 0, 0, None, None)
+    row = {name[len('stats_'):]: value for name, value in row.items()}
+    if alias != DEFAULT_DB_ALIAS:
+        row.update(Post.objects.using(alias).filter(
+            author_id=author_id
+        ).aggregate(
+            posts=Count('pk', distinct=True),
+            comments_received=Count('comments', distinct=True),
+            first_post=Min('pub_date'),
+            last_post=Max('pub_date'),
+        ))
+    return AuthorStats(**row)
@@ -0,0 +1,84 @@
+"""Хэштеги и упоминания из текста постов.
+
+При сохранении поста теги из текста записываются в Tag, а связи —
+в PostTag с копией pub_date: лента тега читается по индексу
+(tag, -pub_date) без сортировки всех постов. Для уже существующих
+постов связи создаёт manage.py backfill_tags.
+"""
+from django.db import transaction
+
+from core.jobs import pause
+from .markup import TAG_RE, normalize
+from .models import PostTag, Tag
+
+
+def extract(text):
+    """Множество пар (вид, имя) из текста."""
+    return {
+        (kind, normalize(kind, name)) for kind, name in TAG_RE.findall(text)
+    }
+
+
+def get_tags(pairs):
+    """Tag для каждой пары (вид, имя); недостающие создаются."""
+    tags = {}
+    for kind in (Tag.HASHTAG, Tag.MENTION):
+        names = {name for tag_kind, name in pairs if tag_kind == kind}
+        if not names:
+            continue
+        found = {
+            tag.name: tag
+            for tag in Tag.objects.filter(kind=kind, name__in=names)
+        }
+        missing = names - found.keys()
+        if missing:
+            Tag.objects.bulk_create(
+                [Tag(kind=kind, name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            found.update(
+                (tag.name, tag)
+                for tag in Tag.objects.filter(kind=kind, name__in=missing)
+            )
+        tags.update(((kind, name), tag) for name, tag in found.items())
+    return tags
+
+
+def sync(posts, using):
+    """Приводит связи PostTag постов к тегам из их текста."""
+    wanted = {post.pk: extract(post.text) for post in posts}
+    tags = get_tags(set().union(*wanted.values()))
+    links = PostTag.objects.using(using)
+    current = set(links.filter(post_id__in=list(wanted)).values_list(
+        'post_id', 'tag_id'
+    ))
+    desired = {
+        (post.pk, tags[pair].pk): post
+        for post in posts for pair in wanted[post.pk]
+    }
+    stale = current - desired.keys()
+    with transaction.atomic(using=using):
+        for post_id, tag_id in stale:
+            links.filter(post_id=post_id, tag_id=tag_id).delete()
+        links.bulk_create(
+            [
+                PostTag(post_id=post_id, tag_id=tag_id,
+                        pub_date=desired[post_id, tag_id].pub_date)
+                for post_id, tag_id in desired.keys() - current
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def backfill(posts, batch_size, after=0):
+    """Создаёт связи для постов с pk > after пачками; возвращает число."""
+    posts = posts.only('pk', 'text', 'pub_date')
+    done = 0
+    while True:
+        batch = list(posts.filter(pk__gt=after).order_by('pk')[:batch_size])
+        if not batch:
+            return done
+        sync(batch, posts.db)
+        after = batch[-1].pk
+        done += len(batch)
+        pause()
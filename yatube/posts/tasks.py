@@ -0,0 +1,140 @@
+from django.db import transaction
+from sorl.thumbnail import get_thumbnail
+
+from core.cache import invalidate_namespace
+from core.jobs import in_chunks, job, pause, periodic, report_progress
+from . import archive, deletion, images, notifications, orphans, uploads
+from .images import THUMBNAIL_GEOMETRY, THUMBNAIL_OPTIONS
+from .models import Comment, Deletion, Post, group_namespace
+from .sharding import find, shards
+from .signals import DIRECTORY_NAMESPACE, FEED_NAMESPACE, post_namespaces
+
+# Строк на одну короткую транзакцию в массовых задачах.
+CHUNK_SIZE: int = 500
+
+
+@job('posts.make_thumbnail')
+def make_thumbnail(post_id):
+    """Готовит миниатюру и варианты для srcset вне запроса."""
+    post = find(
+        Post.objects.only('image', 'image_width', 'author', 'group'),
+        pk=post_id,
+    )
+    if post is None or not post.image:
+        return
+    get_thumbnail(post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+    fields = {'image_variants': images.build(post.image)}
+    if post.image_width is None:
+        # Старый пост или файл не удалось прочитать при загрузке.
+        fields.update(images.describe_stored(post.image.name))
+    # Картинку могли заменить, пока строились варианты.
+    updated = Post.objects.using(post._state.db).filter(
+        pk=post.pk, image=post.image.name
+    ).update(**fields)
+    if updated:
+        # update() не шлёт сигналы, поэтому кэш сбрасываем сами.
+        invalidate_namespace(*post_namespaces(post))
+
+
+def schedule_thumbnail(post):
+    if post.image:
+        make_thumbnail.enqueue(
+            post.pk, idempotency_key=f'thumbnail:{post.image.name}'
+        )
+
+
+@job('posts.reassign_group')
+def reassign_group(post_ids, group_id):
+    """Переносит посты в группу (или убирает из групп при None)."""
+    report_progress(0, len(post_ids))
+    for done, chunk in enumerate(in_chunks(post_ids, CHUNK_SIZE)):
+        old_groups = set()
+        for alias in shards():
+            posts = Post.objects.using(alias).filter(pk__in=chunk)
+            with transaction.atomic(using=alias):
+                old_groups.update(posts.exclude(group_id=None).values_list(
+                    'group_id', flat=True
+                ).distinct())
+                posts.update(group_id=group_id)
+        # update() не шлёт сигналы, поэтому кэш сбрасываем сами.
+        invalidate_namespace(FEED_NAMESPACE, DIRECTORY_NAMESPACE, *(
+            group_namespace(pk) for pk in old_groups | {group_id} if pk
+        ))
+        report_progress(min((done + 1) * CHUNK_SIZE, len(post_ids)))
+
+
+def _delete_on_shards(querysets):
+    """Удаляет строки querysets пачками по CHUNK_SIZE, шард за шардом."""
+    total = sum(queryset.count() for queryset in querysets)
+    report_progress(0, total)
+    deleted = 0
+    for queryset in querysets:
+        while True:
+            chunk = list(
+                queryset.values_list('pk', flat=True)[:CHUNK_SIZE]
+            )
+            if not chunk:
+                break
+            with transaction.atomic(using=queryset.db):
+                queryset.model.objects.using(queryset.db).filter(
+                    pk__in=chunk
+                ).delete()
+            deleted += len(chunk)
+            report_progress(min(deleted, total))
+            pause()
+
+
+@job('posts.delete_author_posts')
+def delete_author_posts(author_ids):
+    """Удаляет все посты авторов со всех шардов."""
+    _delete_on_shards([
+        Post.objects.using(alias).filter(author_id__in=author_ids)
+        for alias in shards()
+    ])
+
+
+@job('posts.purge_comments')
+def purge_comments(post_ids):
+    """Удаляет все комментарии к постам со всех шардов."""
+    _delete_on_shards([
+        Comment.objects.using(alias).filter(post_id__in=post_ids)
+        for alias in shards()
+    ])
+
+
+@job('posts.reap_deletion')
+def reap_deletion(deletion_id):
+    target = Deletion.objects.filter(pk=deletion_id).first()
+    if target is not None:
+        deletion.reap(target)
+
+
+@periodic('*/10 * * * *', name='posts.reap_pending_deletions')
+def reap_pending_deletions():
+    """Продолжает удаления, прерванные падением воркера."""
+    for target in Deletion.objects.filter(finished=None).order_by('pk'):
+        deletion.reap(target)
+
+
+@periodic('30 4 * * *', name='posts.archive_old_posts')
+def archive_old_posts():
+    """Переносит посты старше POSTS_ARCHIVE_AFTER_DAYS в архив."""
+    archive.archive_older_than(archive.archive_cutoff())
+
+
+@periodic('45 3 * * *', name='posts.collect_orphan_comments')
+def collect_orphan_comments():
+    """Удаляет комментарии удалённых постов и освобождает страницы."""
+    orphans.collect_all(vacuum_pages=None)
+
+
+@periodic('15 * * * *', name='posts.expire_uploads')
+def expire_uploads():
+    """Удаляет загрузки по частям, брошенные дольше UPLOAD_SESSION_TTL."""
+    uploads.expire()
+
+
+@periodic('0 * * * *', name='posts.send_notification_digests')
+def send_notification_digests():
+    """Рассылает сводки уведомлений пачками писем."""
+    notifications.send_digests()
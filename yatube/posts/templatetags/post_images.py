@@ -0,0 +1,16 @@
+from django import template
+
+from ..images import prefetch_thumbnails as prefetch
+
+register = template.Library()
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts):
+    """Поднимает миниатюры карточек одним запросом; ничего не выводит.
+
+    Ставится внутри {% cache_fragment %}, чтобы страница постов
+    выбиралась только при пересборке фрагмента.
+    """
+    prefetch(posts)
+    return ''
@@ -0,0 +1,152 @@
+from unittest import mock
+
+from django.contrib.admin import helpers
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import jobs
+from core.models import Job
+from .. import tasks
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AdminChangelistTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        group = Group.objects.create(title='Группа', slug='group',
+                                     description='Описание')
+        for i in range(15):
+            post = Post.objects.create(author=cls.admin, group=group,
+                                       text=f'Пост {i}')
+            Comment.objects.create(post=post, author=cls.admin, text='к')
+        Follow.objects.create(
+            user=User.objects.create_user(username='reader'),
+            author=cls.admin,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelists_open(self):
+        for model in ('post', 'comment', 'follow'):
+            with self.subTest(model=model):
+                response = self.client.get(
+                    reverse(f'admin:posts_{model}_changelist')
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_post_changelist_avoids_full_scans(self):
+        """Нет выборки всех групп и DISTINCT по всем датам постов."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('admin:posts_post_changelist')
+            )
+        self.assertEqual(len(response.context['cl'].result_list), 15)
+        for query in queries:
+            sql = query['sql']
+            with self.subTest(sql=sql):
+                self.assertNotIn('DISTINCT', sql)
+                if 'FROM "posts_group"' in sql:
+                    self.assertIn('WHERE', sql)
+
+    def test_date_hierarchy_dates(self):
+        queryset = self.client.get(
+            reverse('admin:posts_post_changelist')
+        ).context['cl'].queryset
+        day = Post.objects.first().pub_date.date()
+        self.assertEqual(
+            queryset.dates('pub_date', 'year'), [day.replace(month=1, day=1)]
+        )
+        self.assertEqual(queryset.dates('pub_date', 'day'), [day])
+
+
+@mock.patch.object(jobs, 'CHUNK_PAUSE', 0)
+@mock.patch.object(tasks, 'CHUNK_SIZE', 4)
+class AdminBulkActionsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        for i in range(10):
+            post = Post.objects.create(author=cls.author, text=f'Пост {i}')
+            Comment.objects.create(post=post, author=cls.admin, text='к')
+        Post.objects.create(author=cls.admin, text='Свой пост')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:posts_post_changelist')
+
+    def run_action(self, action, pks, **data):
+        response = self.client.post(self.url, {
+            'action': action,
+            helpers.ACTION_CHECKBOX_NAME: pks,
+            **data,
+        })
+        jobs.run_pending()
+        return response
+
+    def author_pks(self):
+        return list(Post.objects.filter(
+            author=self.author
+        ).values_list('pk', flat=True))
+
+    def test_reassign_group_asks_for_group_first(self):
+        response = self.run_action('reassign_group', self.author_pks())
+        self.assertTemplateUsed(
+            response, 'admin/posts/post/reassign_group.html'
+        )
+        self.assertFalse(Job.objects.exists())
+
+    def test_reassign_group_in_chunks(self):
+        self.run_action('reassign_group', self.author_pks(),
+                        apply='1', group=self.group.pk)
+        self.assertEqual(self.group.group_list.count(), 10)
+        job_obj = Job.objects.get(name='posts.reassign_group')
+        self.assertEqual((job_obj.progress, job_obj.total), (10, 10))
+
+    def test_delete_by_author(self):
+        self.run_action('delete_by_author', self.author_pks()[:1])
+        self.assertFalse(Post.objects.filter(author=self.author).exists())
+        self.assertTrue(Post.objects.filter(author=self.admin).exists())
+
+    def test_purge_comments(self):
+        self.run_action('purge_comments', self.author_pks()[:5])
+        self.assertEqual(Comment.objects.count(), 5)
+        self.assertEqual(
+            Job.objects.get(name='posts.purge_comments').progress, 5
+        )
+
+    def test_actions_require_permissions(self):
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        staff.user_permissions.add(
+            Permission.objects.get(codename='view_post')
+        )
+        self.client.force_login(staff)
+        self.assertIsNone(self.client.get(self.url).context['action_form'])
+        self.run_action('purge_comments', self.author_pks())
+        self.run_action('reassign_group', self.author_pks(),
+                        apply='1', group=self.group.pk)
+        self.assertEqual(Comment.objects.count(), 10)
+        self.assertFalse(Job.objects.exists())
+
+        staff.user_permissions.add(
+            Permission.objects.get(codename='change_post')
+        )
+        actions = dict(self.client.get(self.url).context[
+            'action_form'
+        ].fields['action'].choices)
+        self.assertIn('reassign_group', actions)
+        self.assertNotIn('purge_comments', actions)
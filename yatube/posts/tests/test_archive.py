@@ -0,0 +1,75 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core import jobs
+from .. import archive
+from ..models import ArchivedComment, ArchivedPost, Comment, Group, Post
+
+User = get_user_model()
+
+
+@mock.patch.object(jobs, 'CHUNK_PAUSE', 0)
+class ArchiveTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(title='Группа', slug='group',
+                                          description='Описание')
+        old = timezone.now() - timedelta(days=400)
+        for i in range(5):
+            post = Post.objects.create(author=self.author, group=self.group,
+                                       text=f'Старый {i}')
+            Post.objects.filter(pk=post.pk).update(pub_date=old)
+            Comment.objects.create(post=post, author=self.author,
+                                   text=f'Комментарий {i}')
+        self.old_post = post
+        self.fresh = Post.objects.create(author=self.author, text='Свежий')
+
+    def test_old_posts_moved_with_comments(self):
+        out = StringIO()
+        call_command('archive_posts', '--days', '365', '--batch-size', '2',
+                     stdout=out)
+        self.assertIn('5', out.getvalue())
+        self.assertEqual(list(Post.objects.all()), [self.fresh])
+        self.assertEqual(ArchivedPost.objects.count(), 5)
+        self.assertEqual(ArchivedComment.objects.count(), 5)
+        self.assertFalse(Comment.objects.exists())
+        moved = ArchivedPost.objects.get(pk=self.old_post.pk)
+        self.assertEqual(moved.text, self.old_post.text)
+        self.assertEqual(moved.group, self.group)
+        self.assertEqual(moved.comments.get().text, 'Комментарий 4')
+
+    def test_dry_run_moves_nothing(self):
+        call_command('archive_posts', '--days', '365', '--dry-run',
+                     stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 6)
+        self.assertFalse(ArchivedPost.objects.exists())
+
+    def test_limit(self):
+        cutoff = archive.archive_cutoff(365)
+        self.assertEqual(archive.archive_older_than(cutoff, 2, limit=3), 3)
+        self.assertEqual(ArchivedPost.objects.count(), 3)
+
+    def test_detail_falls_back_to_archive(self):
+        archive.archive_older_than(archive.archive_cutoff(365))
+        self.client.force_login(self.author)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.old_post.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['archived'])
+        self.assertIsNone(response.context['form'])
+        self.assertContains(response, 'Комментарий 4')
+        self.assertNotContains(
+            response, reverse('posts:post_edit', args=[self.old_post.pk])
+        )
+        response = self.client.get(reverse('posts:post_detail', args=[999]))
+        self.assertEqual(response.status_code, 404)
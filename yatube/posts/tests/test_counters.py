@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import counters
+from ..forms import PostForm
+from ..models import Post
+
+User = get_user_model()
+edit_fields = Post.edit_fields
+
+
+@mock.patch.object(counters, 'FLUSH_INTERVAL', 3600)
+class ViewCounterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        counters._pending.clear()
+        self.addCleanup(counters._pending.clear)
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+        self.other = Post.objects.create(author=self.author, text='Другой')
+
+    def views(self, post):
+        return Post.objects.values_list('views', flat=True).get(pk=post.pk)
+
+    def test_views_are_buffered_until_flush(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        for _ in range(3):
+            response = self.client.get(url)
+        self.client.get(reverse('posts:post_detail', args=[self.other.pk]))
+        self.assertEqual(response.context['views'], 3)
+        self.assertEqual(self.views(self.post), 0)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(counters.flush(), 2)
+        self.assertEqual(self.views(self.post), 3)
+        self.assertEqual(self.views(self.other), 1)
+        self.assertContains(self.client.get(url), 'Просмотров: 4')
+
+    def test_flush_when_buffer_is_full(self):
+        with mock.patch.object(counters, 'MAX_PENDING', 2):
+            counters.record(self.post)
+            self.assertEqual(self.views(self.post), 0)
+            counters.record(self.other)
+        self.assertEqual(self.views(self.post), 1)
+        self.assertEqual(self.views(self.other), 1)
+
+    def test_failed_flush_keeps_counts(self):
+        counters.record(self.post)
+        with mock.patch.object(counters, '_update',
+                               side_effect=DatabaseError), \
+                self.assertLogs('posts.counters'):
+            self.assertEqual(counters.flush(), 0)
+        self.assertEqual(counters.pending(self.post), 1)
+        counters.flush()
+        self.assertEqual(self.views(self.post), 1)
+
+    def test_edit_keeps_flushed_views(self):
+        form = PostForm({'text': 'Изменённый пост'},
+                        instance=Post.objects.get(pk=self.post.pk))
+        counters.record(self.post)
+        counters.flush()
+        self.assertTrue(form.is_valid())
+        form.save()
+        self.assertEqual(self.views(self.post), 1)
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).text, 'Изменённый пост'
+        )
+
+    def test_admin_change_keeps_flushed_views(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        self.client.force_login(admin)
+        url = reverse('admin:posts_post_change', args=[self.post.pk])
+        with mock.patch.object(Post, 'edit_fields', autospec=True,
+                               side_effect=self.flush_then_fields):
+            self.client.post(url, {
+                'text': 'Изменённый пост', 'author': self.author.pk,
+                'pub_date_0': '2020-01-01', 'pub_date_1': '00:00:00',
+            })
+        self.assertEqual(self.views(self.post), 1)
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).text, 'Изменённый пост'
+        )
+
+    def flush_then_fields(self, post):
+        # Просмотр записан между загрузкой объекта и сохранением.
+        counters.record(post)
+        counters.flush()
+        return edit_fields(post)
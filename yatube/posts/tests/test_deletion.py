@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core import jobs
+from .. import deletion
+from ..models import Comment, Deletion, Follow, Group, Post
+
+User = get_user_model()
+
+
+@mock.patch.object(jobs, 'CHUNK_PAUSE', 0)
+@mock.patch.object(deletion, 'CHUNK_SIZE', 3)
+class SoftDeletionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(title='Группа', slug='group',
+                                          description='Описание')
+        for i in range(7):
+            Post.objects.create(author=self.author, group=self.group,
+                                text=f'Пост {i}')
+        self.other_post = Post.objects.create(author=self.reader,
+                                              group=self.group, text='Чужой')
+        Comment.objects.create(post=self.other_post, author=self.author,
+                               text='к')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def test_user_hidden_immediately(self):
+        deletion.schedule(Deletion.USER, self.author)
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.is_active)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.other_post])
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Post.objects.filter(author=self.author).count(), 7)
+
+    def test_user_reaped_in_background(self):
+        target = deletion.schedule(Deletion.USER, self.author)
+        jobs.run_pending()
+        target.refresh_from_db()
+        self.assertIsNotNone(target.finished)
+        self.assertEqual(target.processed, 9)
+        self.assertFalse(User.objects.filter(username='author').exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(Comment.objects.count(), 0)
+        self.assertEqual(Post.objects.get(), self.other_post)
+
+    def test_interrupted_reap_resumes(self):
+        target = deletion.schedule(Deletion.USER, self.author)
+        real_step = deletion._delete_in_chunks
+
+        def crash_on_posts(deletion_obj, stage, queryset):
+            if stage == 'posts':
+                raise RuntimeError('упал воркер')
+            real_step(deletion_obj, stage, queryset)
+
+        with mock.patch.object(deletion, '_delete_in_chunks',
+                               crash_on_posts):
+            with self.assertRaises(RuntimeError):
+                deletion.reap(target)
+        target.refresh_from_db()
+        self.assertEqual(target.stage, 'follows')
+        self.assertIsNone(target.finished)
+        deletion.reap(target)
+        target.refresh_from_db()
+        self.assertEqual(target.stage, 'done')
+        self.assertFalse(
+            Post.objects.filter(author_id=self.author.pk).exists()
+        )
+
+    def test_group_hidden_then_posts_ungrouped(self):
+        target = deletion.schedule(Deletion.GROUP, self.group)
+        response = self.client.get(
+            reverse('posts:group_posts', args=[self.group.slug])
+        )
+        self.assertEqual(response.status_code, 404)
+        jobs.run_pending()
+        target.refresh_from_db()
+        self.assertEqual(target.processed, 8)
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(Post.objects.count(), 8)
@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import directory
+from ..deletion import hidden_ids
+from ..models import Deletion, Group, Post
+
+User = get_user_model()
+
+
+class GroupDirectoryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.first = User.objects.create_user(username='first')
+        self.second = User.objects.create_user(username='second')
+        self.groups = [
+            Group.objects.create(title=f'Группа {i}', slug=f'group-{i}',
+                                 description='Описание') for i in range(3)
+        ]
+        for author in (self.first, self.first, self.second):
+            Post.objects.create(author=author, group=self.groups[0],
+                                text='Пост')
+        self.latest = Post.objects.create(author=self.second,
+                                          group=self.groups[1], text='Пост')
+
+    def test_stats_in_constant_queries(self):
+        hidden_ids(Deletion.GROUP)
+        hidden_ids(Deletion.USER)
+        with self.assertNumQueries(2):
+            groups, next_after = directory._directory_page(0, 2)
+        self.assertEqual(next_after, self.groups[1].pk)
+        self.assertEqual(
+            [(g.post_count, g.author_count) for g in groups], [(3, 2), (1, 1)]
+        )
+        self.assertEqual(groups[1].latest_post, self.latest.pub_date)
+        groups, next_after = directory._directory_page(next_after, 2)
+        self.assertEqual([(g.post_count, g.latest_post) for g in groups],
+                         [(0, None)])
+        self.assertIsNone(next_after)
+
+    def test_page_cached_until_new_post(self):
+        url = reverse('posts:group_directory')
+        response = self.client.get(url)
+        self.assertEqual(response.context['groups'][2].post_count, 0)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        Post.objects.create(author=self.first, group=self.groups[2],
+                            text='Новый')
+        response = self.client.get(url)
+        self.assertEqual(response.context['groups'][2].post_count, 1)
+        self.assertContains(response, self.groups[2].title)
+
+    def test_hidden_authors_not_counted(self):
+        Deletion.objects.create(kind=Deletion.USER, target_id=self.second.pk)
+        cache.clear()
+        groups, _ = directory.directory_page()
+        self.assertEqual(
+            [(g.post_count, g.author_count) for g in groups[:2]],
+            [(2, 1), (0, 0)],
+        )
+
+    def test_text_edit_keeps_page_cached(self):
+        url = reverse('posts:group_directory')
+        self.client.get(url)
+        self.latest.text = 'Исправленный пост'
+        self.latest.save()
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        self.latest.group = self.groups[2]
+        self.latest.save()
+        response = self.client.get(url)
+        self.assertEqual(
+            [g.post_count for g in response.context['groups']], [3, 0, 1]
+        )
@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import follow_feed
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+class FollowUnreadTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.force_login(self.reader)
+
+    def unread(self):
+        return self.client.get(reverse('posts:follow_unread')).json()
+
+    def test_counts_new_posts_until_feed_is_seen(self):
+        self.assertEqual(self.unread(), {'count': 0, 'label': ''})
+        Post.objects.create(author=self.author, text='Новый пост')
+        Post.objects.create(author=self.reader, text='Свой пост')
+        self.assertEqual(self.unread(), {'count': 1, 'label': '1'})
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['follow_unread'], '1')
+
+        # Повторный подсчёт идёт из кэша.
+        with self.assertNumQueries(0):
+            follow_feed.unread_count(self.reader.pk)
+
+        self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(self.unread()['count'], 0)
+
+    def test_unfollow_resets_count(self):
+        self.unread()
+        Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(self.unread()['count'], 1)
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(self.unread()['count'], 0)
+
+    def test_label_is_capped(self):
+        self.assertEqual(follow_feed.label(follow_feed.UNREAD_LIMIT), '99+')
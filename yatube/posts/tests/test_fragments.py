@@ -0,0 +1,86 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..fragments import decode, encode
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+POSTS: int = 25
+
+
+class FeedFragmentTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(title='Группа', slug='group',
+                                          description='Описание')
+        self.posts = [
+            Post.objects.create(author=self.author, group=self.group,
+                                text=f'Пост номер {i}')
+            for i in range(POSTS)
+        ]
+
+    def collect(self, page_url):
+        """Тексты постов страницы и всех догруженных за ней блоков."""
+        response = self.client.get(page_url)
+        texts = [post.text for post in response.context['page_obj']]
+        url = (f'{response.context["more_url"]}'
+               f'?after={response.context["next_cursor"]}')
+        while url:
+            data = self.client.get(url).json()
+            texts += re.findall(r'Пост номер \d+', data['html'])
+            url = data['next']
+        return texts
+
+    def expected(self):
+        return [post.text for post in reversed(self.posts)]
+
+    def test_cursor_round_trip(self):
+        post = self.posts[3]
+        self.assertEqual(decode(encode(post)), (post.pub_date, post.pk))
+        self.assertIsNone(decode('garbage'))
+
+    def test_fragments_continue_every_feed(self):
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        self.client.force_login(reader)
+        for url in (reverse('posts:index'),
+                    reverse('posts:group_posts', args=['group']),
+                    reverse('posts:profile', args=['author']),
+                    reverse('posts:follow_index')):
+            with self.subTest(url=url):
+                self.assertEqual(self.collect(url), self.expected())
+
+    def test_fragment_is_cached_and_invalidated(self):
+        after = encode(self.posts[-11])
+        url = reverse('posts:index_fragment') + f'?after={after}'
+        first = self.client.get(url)
+        self.assertNotIn('<html', first.json()['html'])
+        self.assertIn('max-age', first['Cache-Control'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).json(), first.json())
+        edited = self.posts[5]
+        edited.text = 'Пост номер изменён'
+        edited.save()
+        self.assertIn('Пост номер изменён',
+                      self.client.get(url).json()['html'])
+
+    def test_warm_index_skips_page_query(self):
+        """С готовым фрагментом остаётся только COUNT паджинатора."""
+        self.client.get(reverse('posts:index'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'))
+        self.assertEqual(len(queries), 1)
+        self.assertIn('COUNT', queries[0]['sql'])
+
+    def test_bad_cursor(self):
+        response = self.client.get(
+            reverse('posts:index_fragment') + '?after=oops'
+        )
+        self.assertEqual(response.status_code, 400)
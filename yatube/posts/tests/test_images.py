@@ -0,0 +1,135 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
+
+from core import jobs
+from core.thumbnails import thumbnail_key
+from ..images import THUMBNAIL_GEOMETRY, THUMBNAIL_OPTIONS, WIDTHS
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageVariantsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.client.force_login(self.author)
+
+    def create_post(self):
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'С картинкой',
+            'image': SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        })
+        return Post.objects.get()
+
+    def test_variants_built_by_job(self):
+        post = self.create_post()
+        self.assertIsNone(post.picture)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'srcset=')
+
+        jobs.run_pending()
+        post.refresh_from_db()
+        picture = post.picture
+        self.assertEqual(len(picture['sources']), 1)
+        self.assertEqual(picture['sources'][0]['type'], 'image/webp')
+        self.assertEqual(picture['srcset'].count('w,'), len(WIDTHS) - 1)
+        self.assertEqual((picture['width'], picture['height']), (1080, 444))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, picture['srcset'])
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, 'width="1080" height="444"')
+
+    def test_stale_variants_ignored(self):
+        post = self.create_post()
+        jobs.run_pending()
+        post.refresh_from_db()
+        post.image = 'posts/other.gif'
+        self.assertIsNone(post.picture)
+
+    def test_thumbnail_key_matches_tag(self):
+        post = self.create_post()
+        thumbnail = get_thumbnail(
+            post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS
+        )
+        self.assertEqual(
+            thumbnail_key(post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS),
+            thumbnail.key,
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageMetaTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.client.force_login(self.author)
+
+    def test_filled_on_upload(self):
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'С картинкой',
+            'image': SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        })
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+        self.assertTrue(
+            post.image_placeholder.startswith('data:image/jpeg;base64,')
+        )
+        self.assertRegex(post.image_color, r'^#[0-9a-f]{6}$')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, post.image_placeholder)
+
+        self.client.post(reverse('posts:post_edit', args=[post.pk]), {
+            'text': 'Без картинки', 'image-clear': 'on',
+        })
+        post.refresh_from_db()
+        self.assertIsNone(post.image_width)
+        self.assertEqual(post.image_placeholder, '')
+
+    def test_backfill_command(self):
+        stored = Post.objects.create(
+            author=self.author, text='Старый',
+            image=SimpleUploadedFile('old.gif', SMALL_GIF, 'image/gif'),
+        )
+        missing = Post.objects.create(
+            author=self.author, text='Потерян', image='posts/missing.gif'
+        )
+        Post.objects.create(author=self.author, text='Без картинки')
+        out = StringIO()
+        call_command('backfill_image_meta', '--workers', '2', stdout=out)
+        self.assertIn('заполнено 1, не прочитано 1', out.getvalue())
+        stored.refresh_from_db()
+        missing.refresh_from_db()
+        self.assertEqual(stored.image_width, 2)
+        self.assertIsNone(missing.image_width)
@@ -1,6 +1,11 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
+from ..forms import PostForm
+from ..markup import RENDER_VERSION
 from ..models import Group, Post, Comment, Follow
 
 User = get_user_model()
@@ -53,3 +58,55 @@ class FollowModelTest(TestCase):
 
     def test_model_follow_have_correct_objects_names(self):
         self.assertTrue(Follow.objects.get(user=self.user, author=self.author))
+
+
+class RenderedTextTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def test_form_save_renders_html(self):
+        """PostForm сохраняет готовый HTML вместе с текстом."""
+        form = PostForm(data={'text': '<b>жирный</b>\nвторая строка'})
+        self.assertTrue(form.is_valid())
+        post = form.save(commit=False)
+        post.author = self.user
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.text_html_version, RENDER_VERSION)
+        self.assertEqual(
+            post.text_html,
+            '<p>&lt;b&gt;жирный&lt;/b&gt;<br>вторая строка</p>'
+        )
+
+    def test_stale_html_rerendered_lazily(self):
+        """Устаревший HTML перерисовывается и сохраняется при чтении."""
+        post = Post.objects.create(author=self.user, text='текст')
+        Post.objects.filter(pk=post.pk).update(
+            text_html='старый', text_html_version=0
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.html, '<p>текст</p>')
+        post.refresh_from_db()
+        self.assertEqual(post.text_html_version, RENDER_VERSION)
+
+    def test_save_rerenders_changed_text(self):
+        """Сохранение в обход форм (админка, shell) обновляет HTML."""
+        post = Post.objects.create(author=self.user, text='первый')
+        post = Post.objects.get(pk=post.pk)
+        post.text = 'второй'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p>второй</p>')
+        post.text = 'третий'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p>третий</p>')
+
+    def test_render_html_command_backfills(self):
+        Post.objects.create(author=self.user, text='пост')
+        call_command('render_html', stdout=StringIO())
+        self.assertFalse(
+            Post.objects.exclude(text_html_version=RENDER_VERSION).exists()
+        )
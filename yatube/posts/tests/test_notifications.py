@@ -0,0 +1,85 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core import jobs
+from .. import notifications
+from ..models import Notification, Post
+
+User = get_user_model()
+
+
+class NotificationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username='author', email='author@example.com'
+        )
+        self.reader = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+        self.client.force_login(self.reader)
+
+    def test_comment_and_follow_notify_author(self):
+        self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Отличный пост'},
+        )
+        self.client.get(reverse('posts:profile_follow', args=['author']))
+        # Повторная подписка и свой комментарий уведомлений не создают.
+        self.client.get(reverse('posts:profile_follow', args=['author']))
+        self.client.force_login(self.author)
+        self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Спасибо'},
+        )
+        kinds = list(self.author.notifications.order_by('pk').values_list(
+            'kind', 'actor__username', 'post_id', 'text'
+        ))
+        self.assertEqual(kinds, [
+            (Notification.COMMENT, 'reader', self.post.pk, 'Отличный пост'),
+            (Notification.FOLLOW, 'reader', None, ''),
+        ])
+        self.assertFalse(self.reader.notifications.exists())
+
+    def test_unread_counter_in_header(self):
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['unread_notifications'], 0)
+        notifications.notify(
+            self.author.pk, self.reader.pk, Notification.FOLLOW
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['unread_notifications'], 1)
+        self.assertContains(response, 'badge')
+
+        response = self.client.get(reverse('posts:notification_list'))
+        self.assertContains(response, 'подписан(а) на вас')
+        self.assertFalse(self.author.notifications.filter(read=False))
+        self.assertEqual(notifications.unread_count(self.author.pk), 0)
+
+    @mock.patch.object(jobs, 'CHUNK_PAUSE', 0)
+    def test_digest_groups_events_per_recipient(self):
+        other = User.objects.create_user(
+            username='other', email='other@example.com'
+        )
+        for recipient in (self.author, self.author, other):
+            notifications.notify(
+                recipient.pk, self.reader.pk, Notification.COMMENT,
+                post_id=self.post.pk, text='Комментарий',
+            )
+        notifications.notify(
+            self.author.pk, self.reader.pk, Notification.FOLLOW
+        )
+        notifications.mark_read(other.pk)
+
+        self.assertEqual(notifications.send_digests(batch_size=1), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['author@example.com'])
+        self.assertIn('(3)', mail.outbox[0].subject)
+        self.assertIn('reader подписан(а) на вас', mail.outbox[0].body)
+        self.assertFalse(Notification.objects.filter(emailed=False))
+        self.assertEqual(notifications.send_digests(), 0)
@@ -0,0 +1,47 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import jobs
+from .. import orphans
+from ..models import ArchivedComment, Comment, Post
+
+User = get_user_model()
+
+
+@mock.patch.object(jobs, 'CHUNK_PAUSE', 0)
+class OrphanCommentsTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.kept = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=self.kept, author=self.author, text='к')
+        deleted = Post.objects.create(author=self.author, text='Удалённый')
+        for i in range(5):
+            Comment.objects.create(post=deleted, author=self.author,
+                                   text=f'Сирота {i}')
+        deleted.delete()
+
+    def test_collect_deletes_orphans_in_batches(self):
+        self.assertEqual(orphans.collect('default', batch_size=2), 5)
+        self.assertEqual(Comment.objects.get().post, self.kept)
+        self.assertFalse(ArchivedComment.objects.exists())
+
+    def test_collect_archives_and_limit(self):
+        self.assertEqual(
+            orphans.collect('default', batch_size=2, archive=True, limit=3), 3
+        )
+        self.assertEqual(ArchivedComment.objects.count(), 3)
+        self.assertTrue(
+            ArchivedComment.objects.filter(post__isnull=True).exists()
+        )
+        self.assertEqual(Comment.objects.filter(post=None).count(), 2)
+
+    def test_command_reports_space(self):
+        out = StringIO()
+        call_command('collect_orphan_comments', '--vacuum', '-1', stdout=out)
+        self.assertIn('собрано комментариев 5', out.getvalue())
+        self.assertIn('свободно', out.getvalue())
+        self.assertEqual(Comment.objects.count(), 1)
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from .. import reaper
+from ..models import ArchivedPost, Post
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp()
+NAMES = ('posts/used.gif', 'posts/old/orphan.gif', 'posts/fresh.gif',
+         'posts/archived.gif')
+
+
+@mock.patch.object(jobs, 'CHUNK_PAUSE', 0)
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ReapMediaTest(TestCase):
+    def setUp(self):
+        self.addCleanup(shutil.rmtree, MEDIA_ROOT, ignore_errors=True)
+        week_ago = time.time() - 7 * 24 * 60 * 60
+        for name in NAMES:
+            path = os.path.join(MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(b'GIF89a')
+            if name != 'posts/fresh.gif':
+                os.utime(path, (week_ago, week_ago))
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост',
+                            image='posts/used.gif')
+        ArchivedPost.objects.create(id=1000, author=author, text='Архив',
+                                    pub_date=timezone.now(),
+                                    image='posts/archived.gif')
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(MEDIA_ROOT, name))
+
+    def test_dry_run_reports_only(self):
+        out = StringIO()
+        call_command('reap_media', '--dry-run', stdout=out)
+        self.assertIn('posts/old/orphan.gif', out.getvalue())
+        self.assertIn('Просмотрено файлов: 4, из них свежих: 1',
+                      out.getvalue())
+        self.assertTrue(all(self.exists(name) for name in NAMES))
+
+    def test_orphans_removed_in_batches(self):
+        report = reaper.reap(batch_size=1)
+        self.assertEqual((report.orphans, report.size), (1, 6))
+        self.assertFalse(self.exists('posts/old/orphan.gif'))
+        for name in ('posts/used.gif', 'posts/fresh.gif',
+                     'posts/archived.gif'):
+            self.assertTrue(self.exists(name))
+
+    def test_quarantine(self):
+        reaper.reap(quarantine=True)
+        self.assertFalse(self.exists('posts/old/orphan.gif'))
+        self.assertTrue(self.exists('quarantine/posts/old/orphan.gif'))
+
+    def test_reference_added_during_run_is_kept(self):
+        author = User.objects.get()
+        original = reaper.NameSet.add_refs
+
+        def add_refs(names_set, names, batch_size=reaper.BATCH_SIZE):
+            original(names_set, names, batch_size)
+            Post.objects.create(author=author, text='Новый',
+                                image='posts/old/orphan.gif')
+
+        with mock.patch.object(reaper.NameSet, 'add_refs', add_refs):
+            self.assertEqual(reaper.reap().orphans, 0)
+        self.assertTrue(self.exists('posts/old/orphan.gif'))
@@ -0,0 +1,137 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import jobs
+from .. import sharding, tasks
+from ..models import AuthorShard, Comment, Group, Post
+
+User = get_user_model()
+
+# Второго шарда в settings.DATABASES нет: его тестовая БД в памяти
+# создаётся только для этих тестов.
+connections.databases.setdefault('shard1', {
+    'ENGINE': 'core.backends.sqlite_shard',
+    'NAME': ':memory:',
+})
+
+
+@override_settings(POST_SHARDS=['default', 'shard1'])
+@mock.patch.object(jobs, 'CHUNK_PAUSE', 0)
+class ShardingTest(TestCase):
+    databases = {'default', 'shard1'}
+
+    def setUp(self):
+        cache.clear()
+        self.old = User.objects.create_user(username='old')
+        self.new = User.objects.create_user(username='new')
+        self.group = Group.objects.create(title='Группа', slug='group',
+                                          description='Описание')
+        AuthorShard.objects.create(author=self.old, alias='default')
+        AuthorShard.objects.create(author=self.new, alias='shard1')
+        self.old_posts = [
+            Post.objects.create(author=self.old, group=self.group,
+                                text=f'Старый {i}') for i in range(3)
+        ]
+        self.new_posts = [
+            Post.objects.create(author=self.new, group=self.group,
+                                text=f'Новый {i}') for i in range(3)
+        ]
+
+    def test_posts_stored_on_author_shard(self):
+        self.assertEqual(Post.objects.using('default').count(), 3)
+        self.assertEqual(Post.objects.using('shard1').count(), 3)
+        ids = [post.pk for post in self.old_posts + self.new_posts]
+        self.assertEqual(len(set(ids)), 6)
+        self.assertEqual(self.new.get_posts.count(), 3)
+
+    def test_feeds_merge_shards(self):
+        expected = (self.old_posts + self.new_posts)[::-1]
+        for url in (reverse('posts:index'),
+                    reverse('posts:group_posts', args=['group'])):
+            response = self.client.get(url)
+            self.assertEqual(list(response.context['page_obj']), expected)
+            self.assertEqual(response.context['page_obj'].paginator.count, 6)
+
+    def test_detail_and_comment_on_shard(self):
+        post = self.new_posts[0]
+        self.client.force_login(self.old)
+        self.client.post(reverse('posts:add_comment', args=[post.pk]),
+                         {'text': 'Комментарий'})
+        self.assertEqual(Comment.objects.using('shard1').count(), 1)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Комментарий')
+
+    def test_bulk_jobs_reach_all_shards(self):
+        Comment.objects.create(post=self.new_posts[0], author=self.old,
+                               text='Комментарий')
+        other = Group.objects.create(title='Другая', slug='other',
+                                     description='Описание')
+        ids = [post.pk for post in self.old_posts + self.new_posts]
+        tasks.reassign_group(ids, other.pk)
+        self.assertEqual(
+            Post.objects.using('shard1').filter(group=other).count(), 3
+        )
+        tasks.purge_comments([self.new_posts[0].pk])
+        self.assertFalse(Comment.objects.using('shard1').exists())
+        tasks.delete_author_posts([self.new.pk])
+        self.assertFalse(Post.objects.using('shard1').exists())
+        self.assertEqual(Post.objects.using('default').count(), 3)
+
+    def test_move_author(self):
+        Comment.objects.create(post=self.old_posts[0], author=self.new,
+                               text='Комментарий')
+        moved = sharding.move_author(self.old.pk, 'shard1', batch_size=2,
+                                     settle=0)
+        self.assertEqual(moved, 3)
+        self.assertFalse(Post.objects.using('default').exists())
+        self.assertFalse(Comment.objects.using('default').exists())
+        self.assertEqual(Post.objects.using('shard1').count(), 6)
+        self.assertEqual(Comment.objects.using('shard1').get().post_id,
+                         self.old_posts[0].pk)
+        self.assertEqual(sharding.shard_for_author(self.old.pk), 'shard1')
+        self.assertEqual(
+            Post.objects.using('shard1').get(pk=self.old_posts[0].pk).pub_date,
+            self.old_posts[0].pub_date,
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.old_posts[0].pk])
+        )
+        self.assertContains(response, 'Комментарий')
+
+    def test_move_author_propagates_deletes(self):
+        Comment.objects.create(post=self.old_posts[1], author=self.new,
+                               text='Комментарий')
+        settle = 0.5
+
+        def delete_during_settle(seconds):
+            if seconds == settle:
+                # Удаление на старом шарде до переключения у писателя
+                # и на новом — уже после.
+                Post.objects.using('default').filter(
+                    pk=self.old_posts[0].pk
+                ).delete()
+                Post.objects.using('shard1').filter(
+                    pk=self.old_posts[1].pk
+                ).delete()
+
+        with mock.patch.object(sharding.time, 'sleep', delete_during_settle):
+            moved = sharding.move_author(self.old.pk, 'shard1',
+                                         batch_size=2, settle=settle)
+        self.assertEqual(moved, 1)
+        self.assertEqual(
+            list(Post.objects.using('shard1').filter(
+                author=self.old
+            ).values_list('pk', flat=True)),
+            [self.old_posts[2].pk],
+        )
+        # Комментарий удалённого поста остаётся сиротой до сборки.
+        self.assertIsNone(Comment.objects.using('shard1').get().post_id)
+        self.assertFalse(Post.objects.using('default').exists())
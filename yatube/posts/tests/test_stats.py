@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post
+from ..stats import _author_stats, author_stats
+
+User = get_user_model()
+
+
+class AuthorStatsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.first = Post.objects.create(author=self.author, text='Первый')
+        self.last = Post.objects.create(author=self.author, text='Второй')
+        Comment.objects.create(post=self.first, author=self.reader, text='к')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            stats = _author_stats(self.author.pk)
+        self.assertEqual(stats.posts, 2)
+        self.assertEqual(stats.comments_received, 1)
+        self.assertEqual((stats.followers, stats.following), (1, 0))
+        self.assertEqual(stats.first_post, self.first.pub_date)
+        self.assertEqual(stats.last_post, self.last.pub_date)
+        empty = _author_stats(self.reader.pk)
+        self.assertEqual((empty.posts, empty.following), (0, 1))
+        self.assertIsNone(empty.first_post)
+
+    def test_refreshed_on_writes(self):
+        self.assertEqual(author_stats(self.author.pk).comments_received, 1)
+        Comment.objects.create(post=self.last, author=self.reader, text='к')
+        self.assertEqual(author_stats(self.author.pk).comments_received, 2)
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(author_stats(self.author.pk).followers, 0)
+        self.last.delete()
+        self.assertEqual(author_stats(self.author.pk).posts, 1)
+
+    def test_shown_on_pages(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.first.pk])
+        )
+        self.assertContains(response, 'Всего постов автора: 2')
+        self.assertContains(response, 'Подписчиков: 1')
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertEqual(response.context['count_posts'], 2)
+        self.assertContains(response, 'Комментариев к постам: 1')
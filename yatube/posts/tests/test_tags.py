@@ -0,0 +1,65 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import tags
+from ..models import Post, PostTag, Tag
+
+User = get_user_model()
+
+
+class TagsTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='Reader')
+
+    def test_extract(self):
+        self.assertEqual(
+            tags.extract('Про #Django и #django, спасибо @Reader! a#b'),
+            {('#', 'django'), ('@', 'Reader')}
+        )
+
+    def test_links_follow_text(self):
+        post = Post.objects.create(author=self.author, text='#один #два')
+        self.assertEqual(
+            set(post.tag_links.values_list('tag__name', flat=True)),
+            {'один', 'два'}
+        )
+        post.text = '#два @Reader'
+        post.save()
+        self.assertEqual(
+            set(post.tag_links.values_list('tag__kind', 'tag__name')),
+            {('#', 'два'), ('@', 'Reader')}
+        )
+        self.assertEqual(post.tag_links.first().pub_date, post.pub_date)
+
+    def test_tag_and_mention_pages(self):
+        tagged = Post.objects.create(author=self.author,
+                                     text="It's #Python для @Reader")
+        Post.objects.create(author=self.author, text='без тегов')
+        response = self.client.get(reverse('posts:tag_posts',
+                                           args=['python']))
+        self.assertEqual(list(response.context['page_obj']), [tagged])
+        self.assertContains(
+            response, f'href="{reverse("posts:tag_posts", args=["python"])}"'
+        )
+        self.assertNotContains(response, '/tags/39/')
+        response = self.client.get(reverse('posts:mentions',
+                                           args=['Reader']))
+        self.assertEqual(list(response.context['page_obj']), [tagged])
+        response = self.client.get(reverse('posts:tag_posts',
+                                           args=['nothing']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_backfill(self):
+        Post.objects.bulk_create([
+            Post(author=self.author, text=f'#пачка {i}') for i in range(5)
+        ])
+        self.assertFalse(PostTag.objects.exists())
+        call_command('backfill_tags', '--batch-size', '2',
+                     stdout=StringIO())
+        tag = Tag.objects.get(name='пачка')
+        self.assertEqual(tag.post_links.count(), 5)
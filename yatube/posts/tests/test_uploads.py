@@ -0,0 +1,147 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import uploads
+from ..models import Post, UploadSession
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp()
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, UPLOAD_CHUNK_SIZE=16,
+                   UPLOAD_MAX_SIZE=60, UPLOAD_MAX_SESSIONS_PER_USER=2,
+                   UPLOAD_MAX_TOTAL_SIZE=100)
+class ChunkedUploadTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(shutil.rmtree, MEDIA_ROOT, ignore_errors=True)
+        self.user = User.objects.create_user(username='author')
+        self.client.force_login(self.user)
+
+    def start(self, data=SMALL_GIF, **extra):
+        return self.client.post(reverse('posts:upload_start'), {
+            'filename': 'small.gif', 'size': len(data),
+            'checksum': sha256(data), **extra,
+        })
+
+    def put(self, upload_id, offset, chunk, checksum=None):
+        return self.client.put(
+            reverse('posts:upload_chunk', args=[upload_id])
+            + f'?offset={offset}',
+            chunk, content_type='application/octet-stream',
+            HTTP_X_CHUNK_SHA256=checksum or sha256(chunk),
+        )
+
+    def upload(self, data=SMALL_GIF):
+        state = self.start(data).json()
+        while not state['completed']:
+            offset = state['offset']
+            state = self.put(state['id'], offset,
+                             data[offset:offset + 16]).json()
+        return state['id']
+
+    def test_upload_resume_and_create_post(self):
+        response = self.start()
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.json()['id']
+        self.assertEqual(self.put(upload_id, 0, SMALL_GIF[:16]).json()[
+            'offset'
+        ], 16)
+        # Повтор уже принятой части и битая часть не сдвигают смещение.
+        self.assertEqual(self.put(upload_id, 0, SMALL_GIF[:16]).status_code,
+                         409)
+        bad = self.put(upload_id, 16, SMALL_GIF[16:32], sha256(b'x'))
+        self.assertEqual((bad.status_code, bad.json()['offset']), (400, 16))
+        state = self.client.get(
+            reverse('posts:upload_chunk', args=[upload_id])
+        ).json()
+        self.assertEqual(state['offset'], 16)
+        self.put(upload_id, 16, SMALL_GIF[16:32])
+        state = self.put(upload_id, 32, SMALL_GIF[32:]).json()
+        self.assertTrue(state['completed'])
+
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост', 'upload': upload_id,
+        })
+        post = Post.objects.get()
+        self.assertTrue(post.image.name.startswith('posts/small'))
+        with post.image.open() as file:
+            self.assertEqual(file.read(), SMALL_GIF)
+        self.assertEqual(post.image_width, 2)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(MEDIA_ROOT, 'uploads')), [])
+
+    def test_whole_file_checksum(self):
+        state = self.start(checksum=sha256(b'other')).json()
+        for offset in range(0, len(SMALL_GIF), 16):
+            state = self.put(state['id'], offset,
+                             SMALL_GIF[offset:offset + 16]).json()
+        self.assertEqual(state['offset'], 0)
+        self.assertFalse(UploadSession.objects.get().completed)
+
+    def test_limits(self):
+        self.assertEqual(self.start().status_code, 201)
+        self.assertEqual(self.start().status_code, 201)
+        self.assertEqual(self.start().status_code, 429)
+        other = User.objects.create_user(username='other')
+        self.client.force_login(other)
+        self.assertEqual(self.start().status_code, 507)
+        self.assertEqual(self.start(b'x' * 61).status_code, 413)
+
+    def test_other_users_upload_is_ignored(self):
+        upload_id = self.upload()
+        other = User.objects.create_user(username='other')
+        self.client.force_login(other)
+        response = self.client.post(reverse('posts:post_create'), {
+            'text': 'Чужая картинка', 'upload': upload_id,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Post.objects.get().image)
+        self.assertEqual(
+            self.client.get(
+                reverse('posts:upload_chunk', args=[upload_id])
+            ).status_code, 404
+        )
+
+    def test_missing_part_file_is_404(self):
+        upload_id = self.upload()
+        os.remove(os.path.join(
+            MEDIA_ROOT, 'uploads', f'{uuid.UUID(upload_id).hex}.part'
+        ))
+        response = self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост', 'upload': upload_id,
+        })
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_expire(self):
+        self.upload()
+        self.assertEqual(uploads.expire(), 0)
+        UploadSession.objects.update(
+            updated=timezone.now() - timedelta(days=2)
+        )
+        self.assertEqual(uploads.expire(), 1)
+        self.assertEqual(os.listdir(os.path.join(MEDIA_ROOT, 'uploads')), [])
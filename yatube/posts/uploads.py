@@ -0,0 +1,194 @@
+"""Загрузка картинок поста по частям с докачкой.
+
+Клиент объявляет имя, размер и SHA-256 файла (start()), затем шлёт
+части PUT-запросами с offset и SHA-256 части (write_chunk()). Части
+пишутся по своему смещению в MEDIA_ROOT/uploads/<id>.part, поэтому
+повтор той же части безопасен; после обрыва клиент узнаёт offset
+через GET и продолжает с него. Когда получены все байты, файл целиком
+сверяется с объявленной суммой. Завершённую загрузку post_create и
+post_edit передают в PostForm вместо обычного поля image (finished()).
+
+Ограничения: не больше UPLOAD_MAX_SESSIONS_PER_USER незавершённых
+загрузок у пользователя и UPLOAD_MAX_TOTAL_SIZE байт во временном
+каталоге на всех. Брошенные загрузки удаляет задача
+posts.expire_uploads через UPLOAD_SESSION_TTL секунд.
+"""
+import hashlib
+import os
+import re
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import UploadSession
+
+UPLOAD_DIR: str = 'uploads'
+BUFFER_SIZE: int = 64 * 1024
+CHECKSUM_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+def path_for(session):
+    return os.path.join(
+        settings.MEDIA_ROOT, UPLOAD_DIR, f'{session.pk.hex}.part'
+    )
+
+
+def live(queryset=None):
+    """Загрузки, обновлявшиеся не раньше UPLOAD_SESSION_TTL назад."""
+    if queryset is None:
+        queryset = UploadSession.objects.all()
+    return queryset.filter(updated__gt=timezone.now() - timedelta(
+        seconds=settings.UPLOAD_SESSION_TTL
+    ))
+
+
+def state(session):
+    return {
+        'id': str(session.pk),
+        'offset': session.received,
+        'size': session.size,
+        'completed': session.completed,
+        'chunk_size': settings.UPLOAD_CHUNK_SIZE,
+    }
+
+
+def start(user, filename, size, checksum):
+    """Создаёт загрузку, если позволяют лимиты."""
+    filename = os.path.basename(filename or '')[:255]
+    if not filename:
+        raise UploadError('Не указано имя файла')
+    if size <= 0 or size > settings.UPLOAD_MAX_SIZE:
+        raise UploadError(
+            'Недопустимый размер файла', 413,
+            max_size=settings.UPLOAD_MAX_SIZE,
+        )
+    if not CHECKSUM_RE.match(checksum or ''):
+        raise UploadError('Нужна SHA-256 файла в hex')
+    with transaction.atomic():
+        pending = live(user.upload_sessions.filter(completed=False))
+        if pending.count() >= settings.UPLOAD_MAX_SESSIONS_PER_USER:
+            raise UploadError('Слишком много загрузок одновременно', 429)
+        used = live().aggregate(total=Sum('size'))['total'] or 0
+        if used + size > settings.UPLOAD_MAX_TOTAL_SIZE:
+            raise UploadError('Временное хранилище заполнено', 507)
+        session = UploadSession.objects.create(
+            user=user, filename=filename, size=size, checksum=checksum
+        )
+    os.makedirs(os.path.dirname(path_for(session)), exist_ok=True)
+    open(path_for(session), 'wb').close()
+    return session
+
+
+def check_chunk(session, offset, length):
+    """Проверяет, что часть можно принять по offset."""
+    if session.completed:
+        raise UploadError('Загрузка уже завершена', 409, **state(session))
+    if offset != session.received:
+        raise UploadError('Ожидается другое смещение', 409, **state(session))
+    if length <= 0 or length > settings.UPLOAD_CHUNK_SIZE:
+        raise UploadError('Недопустимый размер части', 413)
+    if offset + length > session.size:
+        raise UploadError('Часть выходит за конец файла')
+
+
+def write_chunk(session, offset, stream, length, checksum):
+    """Пишет length байт из stream по offset; возвращает session."""
+    check_chunk(session, offset, length)
+    digest = hashlib.sha256()
+    with open(path_for(session), 'r+b') as file:
+        file.seek(offset)
+        remaining = length
+        while remaining:
+            data = stream.read(min(BUFFER_SIZE, remaining))
+            if not data:
+                break
+            digest.update(data)
+            file.write(data)
+            remaining -= len(data)
+    if remaining:
+        raise UploadError('Часть получена не полностью')
+    if digest.hexdigest() != (checksum or '').lower():
+        raise UploadError('Контрольная сумма части не совпала',
+                          **state(session))
+    # Условие на received: из двух одновременных повторов засчитается один.
+    if not UploadSession.objects.filter(
+            pk=session.pk, received=offset
+    ).update(received=offset + length, updated=timezone.now()):
+        session.refresh_from_db()
+        raise UploadError('Ожидается другое смещение', 409, **state(session))
+    session.received = offset + length
+    if session.received == session.size:
+        complete(session)
+    return session
+
+
+def complete(session):
+    digest = hashlib.sha256()
+    with open(path_for(session), 'r+b') as file:
+        file.truncate(session.size)
+        for data in iter(lambda: file.read(BUFFER_SIZE), b''):
+            digest.update(data)
+    if digest.hexdigest() != session.checksum:
+        UploadSession.objects.filter(pk=session.pk).update(received=0)
+        session.received = 0
+        raise UploadError('Контрольная сумма файла не совпала, '
+                          'загрузите его заново', **state(session))
+    session.completed = True
+    UploadSession.objects.filter(pk=session.pk).update(completed=True)
+
+
+def finished(user, upload_id):
+    """Завершённая загрузка пользователя как UploadedFile или None.
+
+    UploadError, если её временный файл пропал.
+    """
+    try:
+        upload_id = uuid.UUID(upload_id or '')
+    except ValueError:
+        return None
+    session = live(user.upload_sessions.filter(
+        pk=upload_id, completed=True
+    )).first()
+    if session is None:
+        return None
+    try:
+        file = open(path_for(session), 'rb')
+    except FileNotFoundError:
+        # Временный файл удалён, а запись о загрузке осталась.
+        session.delete()
+        raise UploadError('Файл загрузки не найден, загрузите его заново',
+                          404)
+    upload = UploadedFile(file, name=session.filename, size=session.size)
+    upload.session = session
+    return upload
+
+
+def discard(session):
+    """Удаляет загрузку и её временный файл."""
+    try:
+        os.remove(path_for(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
+
+
+def expire():
+    """Удаляет брошенные загрузки; возвращает их число."""
+    stale = UploadSession.objects.exclude(pk__in=live().values('pk'))
+    count = 0
+    for session in stale.iterator():
+        discard(session)
+        count += 1
+    return count
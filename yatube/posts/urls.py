@@ -6,15 +6,46 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('fragment/', views.index_fragment, name='index_fragment'),
+    path('groups/', views.group_directory, name='group_directory'),
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
+    path(
+        'group/<slug:slug>/fragment/',
+        views.group_fragment,
+        name='group_fragment'
+    ),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/fragment/',
+        views.profile_fragment,
+        name='profile_fragment'
+    ),
+    path('tags/<str:name>/', views.tag_posts, name='tag_posts'),
+    path(
+        'profile/<str:username>/mentions/',
+        views.mentions,
+        name='mentions'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path('uploads/', views.upload_start, name='upload_start'),
+    path(
+        'uploads/<uuid:upload_id>/',
+        views.upload_chunk,
+        name='upload_chunk'
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment, name='add_comment'),
+    path(
+        'notifications/',
+        views.notification_list,
+        name='notification_list'
+    ),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/fragment/', views.follow_fragment, name='follow_fragment'),
+    path('follow/unread/', views.follow_unread, name='follow_unread'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
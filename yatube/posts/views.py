@@ -1,38 +1,138 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Group, Post, User, Follow
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_http_methods, require_POST
+from .models import (
+    ArchivedPost, Deletion, Group, Notification, Post, Tag, User, Follow
+)
 from django.contrib.auth.decorators import login_required
+from . import counters, follow_feed, fragments, notifications, uploads
 from .forms import PostForm, CommentForm
+from .tasks import schedule_thumbnail
+from .deletion import NAMESPACE as DELETIONS_NAMESPACE, hidden_ids, visible
+from .directory import directory_page
+from .markup import normalize
+from .sharding import feed, find, get_or_404, materialize
+from .signals import FEED_NAMESPACE
+from .stats import author_stats
 from users.utils import paginate
 
 RECORD: int = 10
 NUMBER_30: int = 30
 
 
+def more(page_obj, url_name, *args):
+    """Контекст для posts/includes/more.html.
+
+    Курсор ленивый: в закэшированном фрагменте страница не выбирается.
+    """
+    return {
+        'next_cursor': SimpleLazyObject(
+            lambda: fragments.next_cursor(page_obj)
+        ),
+        'more_url': reverse(url_name, args=args),
+    }
+
+
+def feed_fragment(request, posts, card, namespaces, *key):
+    after = request.GET.get('after', '')
+    if fragments.decode(after) is None:
+        return JsonResponse({'error': 'Неверный курсор'}, status=400)
+    return JsonResponse(fragments.render_block(
+        request, posts, after, RECORD, card, namespaces, *key
+    ))
+
+
 def index(request):
-    post_list = Post.objects.all()
+    post_list = feed(visible(Post.objects.all()))
     page_obj = paginate(request, post_list, RECORD)
     context = {
         'page_obj': page_obj,
+        **more(page_obj, 'posts:index_fragment'),
     }
     return render(request, 'posts/index.html', context)
 
 
+@cache_control(max_age=fragments.FRAGMENT_TIMEOUT)
+def index_fragment(request):
+    return feed_fragment(
+        request, visible(Post.objects.all()),
+        'posts/includes/post_card.html',
+        [FEED_NAMESPACE, DELETIONS_NAMESPACE], 'index',
+    )
+
+
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.group_list.all()
+    group = get_object_or_404(
+        Group.objects.exclude(pk__in=hidden_ids(Deletion.GROUP)), slug=slug
+    )
+    posts = feed(visible(group.group_list.all()))
     page_obj = paginate(request, posts, RECORD)
     context = {
         'group': group,
         'page_obj': page_obj,
+        **more(page_obj, 'posts:group_fragment', slug),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@cache_control(max_age=fragments.FRAGMENT_TIMEOUT)
+def group_fragment(request, slug):
+    group = get_object_or_404(
+        Group.objects.exclude(pk__in=hidden_ids(Deletion.GROUP)), slug=slug
+    )
+    return feed_fragment(
+        request, visible(group.group_list.all()),
+        'posts/includes/group_post_card.html',
+        [group.cache_namespace, DELETIONS_NAMESPACE], 'group', group.pk,
+    )
+
+
+def tag_feed(request, kind, name, title):
+    tag = get_object_or_404(Tag, kind=kind, name=normalize(kind, name))
+    posts = feed(visible(Post.objects.filter(
+        tag_links__tag_id=tag.pk
+    ).order_by('-tag_links__pub_date')))
+    page_obj = paginate(request, posts, RECORD)
+    context = {
+        'tag': tag,
+        'title': title,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/tag_list.html', context)
+
+
+def tag_posts(request, name):
+    return tag_feed(request, Tag.HASHTAG, name, f'#{name}')
+
+
+def mentions(request, username):
+    return tag_feed(request, Tag.MENTION, username, f'Упоминания @{username}')
+
+
+def group_directory(request):
+    after = request.GET.get('after', '')
+    after = int(after) if after.isdigit() else 0
+    groups, next_after = directory_page(after)
+    context = {
+        'groups': groups,
+        'next_after': next_after,
+        'is_first': after == 0,
+    }
+    return render(request, 'posts/group_directory.html', context)
+
+
 def profile(request, username):
     title = 'Профайл пользователя'
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.exclude(pk__in=hidden_ids(Deletion.USER)),
+        username=username
+    )
     posts = author.get_posts.all()
-    count_posts = posts.count()
+    stats = author_stats(author.pk)
+    count_posts = stats.posts
     page_obj = paginate(request, posts, RECORD)
     subscribe = request.user.is_authenticated and Follow.objects.filter(
         user=request.user,
@@ -40,90 +140,229 @@ def profile(request, username):
     context = {
         'author': author,
         'count_posts': count_posts,
+        'stats': stats,
         'page_obj': page_obj,
         'title': title,
-        'subscribe': subscribe}
+        'subscribe': subscribe,
+        **more(page_obj, 'posts:profile_fragment', username)}
     return render(request, 'posts/profile.html', context)
 
 
+@cache_control(max_age=fragments.FRAGMENT_TIMEOUT)
+def profile_fragment(request, username):
+    author = get_object_or_404(
+        User.objects.exclude(pk__in=hidden_ids(Deletion.USER)),
+        username=username
+    )
+    return feed_fragment(
+        request, Post.objects.filter(author_id=author.pk),
+        'posts/includes/profile_post_card.html',
+        [f'author:{author.pk}'], 'profile', author.pk,
+    )
+
+
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    all_posts = post.author.get_posts
-    count = all_posts.count()
+    post = find(visible(Post.objects.all()), id=post_id)
+    archived = post is None
+    if archived:
+        post = get_object_or_404(
+            visible(ArchivedPost.objects.select_related('author', 'group')),
+            id=post_id
+        )
+    if not archived:
+        counters.record(post)
+    stats = author_stats(post.author_id)
+    count = stats.posts
     short_post = post.text[:NUMBER_30]
     title = 'Пост'
     comments = post.comments.all()
-    form = CommentForm(request.POST or None)
+    form = None if archived else CommentForm(request.POST or None)
     context = {
         'post': post,
         'count': count,
+        'stats': stats,
         'short_post': short_post,
         'title': title,
         'form': form,
         'comments': comments,
-
+        'archived': archived,
+        'views': post.views + (0 if archived else counters.pending(post)),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def form_files(request):
+    """Файлы для PostForm и загрузка по частям, заменившая поле image."""
+    upload = None
+    if request.method == 'POST' and 'image' not in request.FILES:
+        try:
+            upload = uploads.finished(
+                request.user, request.POST.get('upload')
+            )
+        except uploads.UploadError as error:
+            raise Http404(str(error))
+    if upload is None:
+        return request.FILES or None, None
+    files = request.FILES.copy()
+    files['image'] = upload
+    return files, upload
+
+
+def release_upload(upload, saved):
+    if upload is not None:
+        upload.close()
+        if saved:
+            uploads.discard(upload.session)
+
+
 @login_required
 def post_create(request):
+    files, upload = form_files(request)
     form = PostForm(
         request.POST or None,
-        files=request.FILES or None,
+        files=files,
     )
-    if form.is_valid():
+    saved = form.is_valid()
+    if saved:
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        schedule_thumbnail(post)
+    release_upload(upload, saved)
+    if saved:
         return redirect('posts:profile', request.user)
-    return render(request, 'posts/create_post.html', {'form': form})
+    context = {
+        'form': form,
+        'upload': request.POST.get('upload', ''),
+    }
+    return render(request, 'posts/create_post.html', context)
 
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_or_404(Post.objects.all(), pk=post_id)
     if post.author != request.user:
         return redirect('posts:post_detail', post_id=post_id)
+    files, upload = form_files(request)
     form = PostForm(request.POST or None,
                     instance=post,
-                    files=request.FILES or None)
-    if form.is_valid():
-        form.save()
+                    files=files)
+    saved = form.is_valid()
+    if saved:
+        schedule_thumbnail(form.save())
+    release_upload(upload, saved)
+    if saved:
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'form': form,
         'is_edit': True,
         'post': post,
+        'upload': request.POST.get('upload', ''),
     }
     return render(request, 'posts/post_edit.html', context)
 
 
+def upload_error(error):
+    return JsonResponse(
+        {'error': str(error), **error.extra}, status=error.status
+    )
+
+
+@login_required
+@require_POST
+def upload_start(request):
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Не указан размер'}, status=400)
+    try:
+        session = uploads.start(
+            request.user, request.POST.get('filename'), size,
+            request.POST.get('checksum'),
+        )
+    except uploads.UploadError as error:
+        return upload_error(error)
+    return JsonResponse(uploads.state(session), status=201)
+
+
+@login_required
+@require_http_methods(['GET', 'PUT'])
+def upload_chunk(request, upload_id):
+    session = get_object_or_404(
+        uploads.live(request.user.upload_sessions.all()), pk=upload_id
+    )
+    if request.method == 'PUT':
+        try:
+            offset = int(request.GET.get('offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return JsonResponse({'error': 'Не указано смещение'}, status=400)
+        try:
+            uploads.write_chunk(
+                session, offset, request, length,
+                request.headers.get('X-Chunk-Sha256'),
+            )
+        except uploads.UploadError as error:
+            return upload_error(error)
+    return JsonResponse(uploads.state(session))
+
+
 @login_required
 def add_comment(request, post_id):
     # Получите пост и сохраните его в переменную post.
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_or_404(Post.objects.all(), pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
         comment.save()
+        notifications.notify(
+            post.author_id, request.user.pk, Notification.COMMENT,
+            post_id=post.pk, text=comment.text,
+        )
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    author_posts_following = Post.objects.filter(
-        author__following__user=request.user
+    authors = materialize(
+        Follow.objects.filter(user=request.user).values('author_id')
     )
+    author_posts_following = feed(visible(Post.objects.filter(
+        author_id__in=authors
+    )))
     page_obj = paginate(request, author_posts_following, RECORD)
+    if page_obj.number == 1:
+        follow_feed.mark_seen(request.user.pk)
     context = {
         'page_obj': page_obj,
+        **more(page_obj, 'posts:follow_fragment'),
     }
     return render(request, 'posts/follow.html', context)
 
 
+@login_required
+def follow_unread(request):
+    count = follow_feed.unread_count(request.user.pk)
+    return JsonResponse({'count': count, 'label': follow_feed.label(count)})
+
+
+@login_required
+@cache_control(private=True, max_age=fragments.FRAGMENT_TIMEOUT)
+def follow_fragment(request):
+    authors = materialize(
+        Follow.objects.filter(user=request.user).values('author_id')
+    )
+    return feed_fragment(
+        request, visible(Post.objects.filter(author_id__in=authors)),
+        'posts/includes/post_card.html',
+        # Подписки пользователя сбрасывают author:<его id>.
+        [FEED_NAMESPACE, DELETIONS_NAMESPACE, f'author:{request.user.pk}'],
+        'follow', request.user.pk,
+    )
+
+
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
@@ -135,6 +374,7 @@ def profile_follow(request, username):
             user=request.user,
             author=get_object_or_404(User, username=username)
         )
+        notifications.notify(author.pk, request.user.pk, Notification.FOLLOW)
     return redirect('posts:profile', username)
 
 
@@ -150,3 +390,18 @@ def profile_unfollow(request, username):
         author=get_object_or_404(User, username=username)
     ).delete()
     return redirect('posts:profile', username)
+
+
+@login_required
+def notification_list(request):
+    page_obj = paginate(
+        request,
+        request.user.notifications.select_related('actor'),
+        notifications.NOTIFICATIONS_PER_PAGE,
+    )
+    # Отмечаем после выборки: на странице новые ещё выделены.
+    notifications.mark_read(
+        request.user.pk,
+        [item.pk for item in page_obj if not item.read],
+    )
+    return render(request, 'posts/notifications.html', {'page_obj': page_obj})
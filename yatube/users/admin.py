@@ -0,0 +1,26 @@
+from django.contrib import admin, messages
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+
+from posts import deletion
+from posts.models import Deletion
+
+User = get_user_model()
+
+
+class UserAdmin(BaseUserAdmin):
+    actions = ('soft_delete',)
+
+    def soft_delete(self, request, queryset):
+        for user in queryset.exclude(pk=request.user.pk):
+            deletion.schedule(Deletion.USER, user)
+        messages.info(
+            request, 'Пользователи скрыты и будут удалены в фоне.'
+        )
+    soft_delete.short_description = 'Скрыть и удалить в фоне'
+    soft_delete.allowed_permissions = ('delete',)
+
+
+# Импорт django.contrib.auth.admin уже зарегистрировал User.
+admin.site.unregister(User)
+admin.site.register(User, UserAdmin)
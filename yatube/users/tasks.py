@@ -0,0 +1,11 @@
+from django.core.mail import EmailMultiAlternatives
+
+from core.jobs import job
+
+
+@job('users.send_mail', max_attempts=8)
+def send_mail(subject, body, from_email, to, html_body=None):
+    message = EmailMultiAlternatives(subject, body, from_email, to)
+    if html_body is not None:
+        message.attach_alternative(html_body, 'text/html')
+    message.send()
@@ -1,7 +1,10 @@
-from django.contrib.auth.views import LoginView, LogoutView
+from django.contrib.auth.views import (
+    LoginView, LogoutView, PasswordResetView
+)
 from django.urls import path
 
 from . import views
+from .forms import QueuedPasswordResetForm
 
 app_name = 'users'
 
@@ -11,4 +14,7 @@ urlpatterns = [
          name='logout'),
     path('login/', LoginView.as_view(template_name='users/login.html'),
          name='login'),
+    path('password_reset/',
+         PasswordResetView.as_view(form_class=QueuedPasswordResetForm),
+         name='password_reset'),
 ]
@@ -17,6 +17,14 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Как отдавать MEDIA_URL (core/media.py): None — сам Django с Range и ETag,
+# 'accel' — X-Accel-Redirect на MEDIA_ACCEL_PREFIX (nginx),
+# 'sendfile' — X-Sendfile (Apache, lighttpd).
+MEDIA_SERVE_MODE = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# Каталоги MEDIA_ROOT, доступные снаружи.
+MEDIA_PUBLIC_DIRS = ('posts/', 'cache/')
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 365
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
 
@@ -67,13 +75,24 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True, 'OPTIONS': {
+        'OPTIONS': {
+            # Cached loader задан явно, чтобы он работал и при DEBUG:
+            # в него компилирует шаблоны прогрев (core/warmup.py).
+            # Изменённые шаблоны подхватываются после перезапуска.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.notifications.notifications',
+                'core.context_processors.follow_feed.follow_feed',
             ]
         },
     }
@@ -81,6 +100,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+TEST_RUNNER = 'core.testing.TestRunner'
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -89,9 +110,16 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
 }
 
+# БД, по которым распределяются посты авторов (posts/sharding.py).
+# Новый шард: добавить алиас в DATABASES и сюда, затем
+# manage.py migrate --database <алиас>.
+POST_SHARDS = ['default']
+
+DATABASE_ROUTERS = ['posts.sharding.ShardRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -111,12 +139,36 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Файлы кэша и метаданных миниатюр. Тесты переносят их во временный
+# каталог сами (core/testing.py), а не через эту настройку.
+CACHE_DIR = os.environ.get('YATUBE_CACHE_DIR') or os.path.join(
+    BASE_DIR, 'cache'
+)
+
+# Общий для всех воркеров кэш в SQLite-файле с небольшим L1 в каждом
+# процессе, см. core/cache.py.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'default.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 5,
+        },
     }
 }
 
+# Метаданные миниатюр: LRU в процессе, файл SQLite на машине и таблица
+# sorl-thumbnail в БД, см. core/thumbnails.py.
+THUMBNAIL_KVSTORE = 'core.thumbnails.KVStore'
+THUMBNAIL_KVSTORE_PATH = os.path.join(CACHE_DIR, 'thumbnails.sqlite3')
+THUMBNAIL_LOCAL_MAX_ENTRIES = 10000
+# Секунд до перечитывания записи из БД: удаление на другой машине
+# видно не позже этого.
+THUMBNAIL_LOCAL_TIMEOUT = 60
+THUMBNAIL_KVSTORE_TIMEOUT = 10 * 60
+
 # Internationalization
 # https://docs.djangoproject.com/en/2.2/topics/i18n/
 
@@ -147,3 +199,13 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# Посты старше этого числа дней переносятся в архивные таблицы.
+POSTS_ARCHIVE_AFTER_DAYS = 365
+
+# Загрузка картинок по частям, см. posts/uploads.py.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+UPLOAD_MAX_SESSIONS_PER_USER = 3
+UPLOAD_MAX_TOTAL_SIZE = 1024 * 1024 * 1024
+UPLOAD_SESSION_TTL = 24 * 60 * 60
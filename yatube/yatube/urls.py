@@ -1,7 +1,9 @@
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core import views as core_views
+
 handler403 = 'core.views.permission_denied'
 handler404 = 'core.views.page_not_found'
 urlpatterns = [
@@ -12,7 +14,10 @@ urlpatterns = [
     path('about/', include('about.urls', namespace='about')),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
+urlpatterns += [
+    re_path(
+        r'^{}(?P<path>.+)$'.format(settings.MEDIA_URL.lstrip('/')),
+        core_views.media,
+        name='media'
+    ),
+]
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Прогрев до первого запроса: резолвер, шаблоны, БД, кэши лент.
+# Отключается через YATUBE_WARMUP=0.
+if os.environ.get('YATUBE_WARMUP', '1') != '0':
+    from core.warmup import warm_up
+
+    warm_up(application)